@@ -1,62 +1,657 @@
 import sys
 import os
-import re
 import json
-import subprocess
-from pathlib import Path
+import multiprocessing
+import time
+
+# Measured from here, so the PyQt6 import is part of the "imports" phase
+STARTUP_T0 = time.perf_counter()
+
 from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QPushButton, QLabel,
                              QLineEdit, QFileDialog, QComboBox, QTextEdit, QGridLayout,
                              QCheckBox, QMessageBox, QProgressBar, QGroupBox,
                              QTabWidget, QHBoxLayout, QInputDialog, QSystemTrayIcon, QMenu,
-                             QSplashScreen)  # Burada QSplashScreen'i ekledik
-from PyQt6.QtCore import Qt, QSize, QProcess, QTimer, QThread, pyqtSignal
-from PyQt6.QtGui import QIcon, QPixmap, QColor, QTextCursor, QPalette, QAction
+                             QSplashScreen, QSpinBox, QPlainTextEdit, QCompleter, QTableView,
+                             QHeaderView, QAbstractItemView)  # Burada QSplashScreen'i ekledik
+from PyQt6.QtCore import (Qt, QSize, QProcess, QTimer, QThread, QObject, pyqtSignal, QAbstractTableModel,
+                          QModelIndex)
+from PyQt6.QtGui import QIcon, QPixmap, QColor, QTextCursor, QPalette, QAction, QTextCharFormat
+
+import fastwex_engine
+from fastwex_archive import DownloadArchive, canonical_key, normalize_url
+import fastwex_gallery
+from fastwex_core import (AppPaths, DownloadOptions, DownloadJob, JobScheduler, available_heights,
+                          build_bandwidth_governor, build_cookie_jar, build_host_tuner, build_postprocessor,
+                          build_video_command, build_gallery_dl_command, build_playlist_command, build_ytdlp_cache,
+                          build_gallery_dl_resolve_command, fetch_info, filter_archived, CommandOutput)
+from fastwex_infocache import InfoCache
+from fastwex_instagram import InstagramDownloader, ProfileIndex, login as instagram_login
+from fastwex_jobstore import JobStore
+from fastwex_metrics import MetricsRecorder
+from fastwex_playlist import PlaylistExpander
+from fastwex_process import ENCODING as PROCESS_ENCODING
+from fastwex_engine import format_bytes, format_eta
+
+# FASTWEX_STARTUP_BENCHMARK=1: print the startup phases as JSON and quit once the window is ready
+STARTUP_BENCHMARK = os.environ.get("FASTWEX_STARTUP_BENCHMARK") == "1"
+
+
+class StartupTimer:
+    """Milliseconds since STARTUP_T0 at each named startup phase"""
+
+    def __init__(self, t0):
+        self.t0 = t0
+        self.phases = {}
+
+    def mark(self, name):
+        self.phases[name] = round((time.perf_counter() - self.t0) * 1000, 1)
+
+
+startup_timer = StartupTimer(STARTUP_T0)
+startup_timer.mark("imports")
+
+
+class DownloadProcess(QObject):
+    """A downloader QProcess read on the event loop, no thread blocks on its pipes"""
+    progress_signal = pyqtSignal(object)
+    log_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, str)
 
-class DownloadThread(QThread):
-    progress_signal = pyqtSignal(int, str)
+    def __init__(self, command, parent=None):
+        super().__init__(parent)
+        self.command = command
+        self.output = CommandOutput(self.progress_signal.emit, self.log_signal.emit)
+        self.process = QProcess(self)
+        self.process.readyReadStandardOutput.connect(lambda: self.read(QProcess.ProcessChannel.StandardOutput))
+        self.process.readyReadStandardError.connect(lambda: self.read(QProcess.ProcessChannel.StandardError))
+        self.process.finished.connect(self.handle_finished)
+        self.process.errorOccurred.connect(self.handle_error)
+
+    def start(self):
+        self.process.start(self.command[0], self.command[1:])
+
+    def kill(self):
+        if self.process.state() != QProcess.ProcessState.NotRunning:
+            self.process.kill()
+            self.process.waitForFinished(1000)
+
+    def read(self, channel, final=False):
+        self.process.setReadChannel(channel)
+        stderr = channel == QProcess.ProcessChannel.StandardError
+        lines = []
+        while self.process.canReadLine():
+            lines.append(self.process.readLine())
+        if final:
+            # A last line without a newline
+            lines.append(self.process.readAll())
+        for line in lines:
+            line = bytes(line).decode(PROCESS_ENCODING, errors="replace").strip()
+            if line:
+                self.output.feed(line, stderr)
+
+    def handle_finished(self, exit_code, exit_status):
+        self.read(QProcess.ProcessChannel.StandardOutput, final=True)
+        self.read(QProcess.ProcessChannel.StandardError, final=True)
+        crashed = exit_status == QProcess.ExitStatus.CrashExit
+        self.finished_signal.emit(*self.output.result(None if crashed else exit_code))
+
+    def handle_error(self, error):
+        # Crashes end up in handle_finished too
+        if error == QProcess.ProcessError.FailedToStart:
+            self.finished_signal.emit(*self.output.result(None, self.process.errorString()))
+
+
+class GalleryFetchThread(QThread):
+    """gallery-dl resolves media URLs, fastwex_gallery.MediaFetcher downloads them in parallel"""
+    progress_signal = pyqtSignal(int, int)
+    log_signal = pyqtSignal(str, str)
     finished_signal = pyqtSignal(bool, str)
 
-    def __init__(self, command):
+    def __init__(self, command, save_path):
         super().__init__()
         self.command = command
+        self.fetcher = fastwex_gallery.MediaFetcher(save_path, listener=self)
+
+    def run(self):
+        success, error_message = self.fetcher.run(self.command)
+        fetcher = self.fetcher
+        self.log_signal.emit(f"📦 {fetcher.done} dosya indirildi ({format_bytes(fetcher.downloaded_bytes)}), "
+                             f"{fetcher.skipped} zaten vardı, {fetcher.failed} hatalı", "info")
+        self.finished_signal.emit(success, error_message)
+
+    def on_log(self, message, level):
+        self.log_signal.emit(message, level)
+
+    def on_progress(self, finished, resolved):
+        self.progress_signal.emit(finished, resolved)
+
+
+class PlaylistExpandThread(QThread):
+    """Lists playlist / channel URLs with fastwex_playlist.PlaylistExpander, entries arrive in groups"""
+    entries_signal = pyqtSignal(list)
+    log_signal = pyqtSignal(str, str)
+    finished_signal = pyqtSignal()
+
+    def __init__(self, commands, archive=None, seen=()):
+        super().__init__()
+        self.commands = commands
+        self.expander = PlaylistExpander(archive, listener=self, seen=seen)
+
+    def run(self):
+        expander = self.expander
+        for url, command in self.commands:
+            success, error_message = expander.run(command)
+            if not success:
+                self.log_signal.emit(f"❌ Liste açılamadı: {url}: {error_message}", "error")
+        self.log_signal.emit(f"📃 {expander.listed} video listelendi: {expander.added} kuyruğa eklendi, "
+                             f"{expander.archived} daha önce indirilmiş, {expander.duplicates} tekrar", "info")
+        self.finished_signal.emit()
+
+    def on_entries(self, urls):
+        self.entries_signal.emit(urls)
+
+
+class CachePrewarm(QObject):
+    """Runs fastwex_ytcache.YtDlpCache.prewarm, its result arrives as a signal on the GUI thread"""
+    finished_signal = pyqtSignal(bool, str)
+
+    def __init__(self, cache, yt_dlp_path, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.yt_dlp_path = yt_dlp_path
+        self.process = None
+
+    def start(self):
+        """False when the cache is still fresh and nothing was started"""
+        self.process = self.cache.prewarm(self.yt_dlp_path, self.finished_signal.emit)
+        return self.process is not None
+
+    def kill(self):
+        if self.process is not None:
+            self.process.kill()
+
+
+class InfoThread(QThread):
+    """Extracts a single URL (yt-dlp -J, through the info cache) off the GUI thread"""
+    finished_signal = pyqtSignal(object, str)
+
+    def __init__(self, paths, url, cache=None):
+        super().__init__()
+        self.paths = paths
+        self.url = url
+        self.cache = cache
 
     def run(self):
         try:
-            process = subprocess.Popen(
-                self.command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    self.progress_signal.emit(0, output.strip())
-                    if "%" in output:
-                        try:
-                            progress = float(re.search(r'(\d+\.\d+)%', output).group(1))
-                            self.progress_signal.emit(int(progress), "")
-                        except:
-                            pass
-
-            stderr = process.stderr.read()
-            if stderr:
-                self.progress_signal.emit(0, stderr.strip())
-
-            self.finished_signal.emit(process.returncode == 0, "")
-            
+            info = fetch_info(self.paths, self.url, self.cache)
+            self.finished_signal.emit(available_heights(info), "")
+        except Exception as e:
+            self.finished_signal.emit([], str(e))
+
+
+class UrlImportThread(QThread):
+    """Reads a TXT list of URLs line by line off the GUI thread
+
+    URLs are normalised and deduplicated (by archive key, against the file
+    itself and the URLs already queued) while reading, and handed over in
+    chunks of (url, key) pairs, so the queue fills up as the file is read.
+    """
+    CHUNK = 2000
+    urls_signal = pyqtSignal(list)
+    finished_signal = pyqtSignal(int, int, str)
+
+    def __init__(self, file_path, known_keys=()):
+        super().__init__()
+        self.file_path = file_path
+        self.seen = set(known_keys)
+
+    def run(self):
+        chunk = []
+        added = duplicates = 0
+        error_message = ""
+        try:
+            # utf-8-sig: lists saved with Notepad start with a BOM
+            with open(self.file_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    url = normalize_url(line)
+                    key = canonical_key(url)
+                    if key in self.seen:
+                        duplicates += 1
+                        continue
+                    self.seen.add(key)
+                    chunk.append((url, key))
+                    added += 1
+                    if len(chunk) >= self.CHUNK:
+                        self.urls_signal.emit(chunk)
+                        chunk = []
+        except Exception as e:
+            error_message = str(e)
+        if chunk:
+            self.urls_signal.emit(chunk)
+        self.finished_signal.emit(added, duplicates, error_message)
+
+
+class UrlQueueModel(QAbstractTableModel):
+    """URL list of the video tab and the download state of every row
+
+    Rows live in plain lists and the view only asks for the visible ones,
+    so lists of 50k+ URLs stay cheap. State changes are collected and
+    reported with a single dataChanged per flush interval.
+    """
+    URL_COLUMN = 0
+    STATE_COLUMN = 1
+    HEADERS = ("URL", "Durum")
+    STATES = {
+        DownloadJob.PENDING: ("Bekliyor", "#ffffff"),
+        DownloadJob.RUNNING: ("İndiriliyor", "#ffff44"),
+        DownloadJob.PAUSED: ("Duraklatıldı", "#ffaa44"),
+        DownloadJob.DONE: ("Tamamlandı", "#44ff44"),
+        DownloadJob.FAILED: ("Hatalı", "#ff4444"),
+    }
+
+    def __init__(self, flush_interval=200, parent=None):
+        super().__init__(parent)
+        self.urls = []
+        self.keys = set()
+        self.states = []
+        self.progress = []
+        self._pending = {}
+        self._colors = {state: QColor(color) for state, (_, color) in UrlQueueModel.STATES.items()}
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(flush_interval)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.urls)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(UrlQueueModel.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if index.column() == UrlQueueModel.URL_COLUMN:
+            if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+                return self.urls[row]
+            return None
+        state = self.states[row]
+        if role == Qt.ItemDataRole.DisplayRole:
+            label = UrlQueueModel.STATES[state][0]
+            return f"{label} %{self.progress[row]}" if state == DownloadJob.RUNNING else label
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self._colors[state]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return UrlQueueModel.HEADERS[section]
+        return None
+
+    def append_entries(self, entries):
+        """Append (url, key) pairs whose key is not queued yet, returns how many were added"""
+        new = []
+        for url, key in entries:
+            if key and key not in self.keys:
+                self.keys.add(key)
+                new.append(url)
+        self.append_rows(new)
+        return len(new)
+
+    def append_rows(self, urls):
+        """Append urls as they are, e.g. the jobs a running batch was extended with"""
+        if not urls:
+            return
+        self.keys.update(canonical_key(url) for url in urls)
+        first = len(self.urls)
+        self.beginInsertRows(QModelIndex(), first, first + len(urls) - 1)
+        self.urls.extend(urls)
+        self.states.extend([DownloadJob.PENDING] * len(urls))
+        self.progress.extend([0] * len(urls))
+        self.endInsertRows()
+
+    def append_urls(self, urls):
+        return self.append_entries((normalize_url(url), canonical_key(url)) for url in urls)
+
+    def set_urls(self, urls, states=None):
+        """Replace the whole list, e.g. with the URLs of a batch that is about to start"""
+        self.beginResetModel()
+        self.urls = list(urls)
+        self.keys = {canonical_key(url) for url in self.urls}
+        self.states = list(states) if states is not None else [DownloadJob.PENDING] * len(self.urls)
+        self.progress = [0] * len(self.urls)
+        self._pending = {}
+        self.endResetModel()
+
+    def clear(self):
+        self.set_urls([])
+
+    def set_state(self, row, state, progress=0):
+        # Only the newest state per row survives until the next flush
+        self._pending[row] = (state, progress)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+        rows = [row for row in pending if row < len(self.urls)]
+        if not rows:
+            return
+        for row in rows:
+            self.states[row], self.progress[row] = pending[row]
+        column = UrlQueueModel.STATE_COLUMN
+        self.dataChanged.emit(self.index(min(rows), column), self.index(max(rows), column))
+
+
+class LogView(QPlainTextEdit):
+    """Bounded log widget with coalesced, timer driven flushes
+
+    Lines are buffered and written to the document at most once per
+    flush interval. Only max_lines blocks are kept. Progress lines are
+    keyed (one key per job) and rewrite their own block instead of
+    appending a new one.
+    """
+    COLORS = {
+        "error": "#ff4444",    # Kırmızı
+        "success": "#44ff44",  # Yeşil
+        "warning": "#ffff44",  # Sarı
+        "info": "#ffffff",     # Beyaz
+    }
+
+    def __init__(self, max_lines=5000, flush_interval=100, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)
+        self.formats = {}
+        for msg_type, color in LogView.COLORS.items():
+            char_format = QTextCharFormat()
+            char_format.setForeground(QColor(color))
+            self.formats[msg_type] = char_format
+
+        self._pending_lines = []
+        self._pending_progress = {}
+        self._progress_blocks = {}
+        self._next_progress_id = 0
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(flush_interval)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def append_line(self, message, msg_type="info"):
+        self._pending_lines.append((message, msg_type))
+        self._schedule_flush()
+
+    def set_progress(self, key, message, msg_type="info"):
+        # Only the newest progress line per key survives until the next flush
+        self._pending_progress[key] = (message, msg_type)
+        self._schedule_flush()
+
+    def clear(self):
+        self._pending_lines = []
+        self._pending_progress = {}
+        self._progress_blocks = {}
+        super().clear()
+
+    def _schedule_flush(self):
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _format(self, msg_type):
+        return self.formats.get(msg_type, self.formats["info"])
+
+    def _insert_line(self, cursor, message, msg_type):
+        if not self.document().isEmpty():
+            cursor.insertBlock()
+        cursor.insertText(message, self._format(msg_type))
+
+    def flush(self):
+        if not self._pending_lines and not self._pending_progress:
+            return
+
+        scrollbar = self.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        # Lines that would be trimmed right away are never inserted
+        for message, msg_type in self._pending_lines[-self.maximumBlockCount():]:
+            self._insert_line(cursor, message, msg_type)
+
+        for key, (message, msg_type) in self._pending_progress.items():
+            block, progress_id = self._progress_blocks.get(key, (None, None))
+            # Blocks trimmed by maximumBlockCount lose their user state
+            if block is not None and block.isValid() and block.userState() == progress_id:
+                line_cursor = QTextCursor(block)
+                line_cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
+                line_cursor.insertText(message, self._format(msg_type))
+            else:
+                cursor.movePosition(QTextCursor.MoveOperation.End)
+                self._insert_line(cursor, message, msg_type)
+                self._next_progress_id += 1
+                cursor.block().setUserState(self._next_progress_id)
+                self._progress_blocks[key] = (cursor.block(), self._next_progress_id)
+        cursor.endEditBlock()
+
+        self._pending_lines = []
+        self._pending_progress = {}
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+
+class DownloadScheduler(QObject):
+    """Qt side of fastwex_core.JobScheduler
+
+    The core calls the on_* listener methods from its worker threads, they
+    are re-emitted as signals so the slots run on the GUI thread.
+    """
+    SUBPROCESS = JobScheduler.SUBPROCESS
+    INPROCESS = JobScheduler.INPROCESS
+    BATCH = JobScheduler.BATCH
+
+    job_started = pyqtSignal(int, str)
+    job_progress = pyqtSignal(int, int)
+    job_log = pyqtSignal(int, str)
+    job_finished = pyqtSignal(int, bool, str)
+    batch_finished = pyqtSignal(int, int)
+    engine_fallback = pyqtSignal(str)
+    job_retry = pyqtSignal(int, float, str)
+    job_paused = pyqtSignal(int, str)
+
+    def __init__(self, base_command, urls, max_workers=3, engine=SUBPROCESS, archive=None, tuner=None,
+                 info_cache=None, governor=None, postprocessor=None, metrics=None, expanding=False,
+                 ytdlp_cache=None, cookie_jar=None, parent=None):
+        super().__init__(parent)
+        self.core = JobScheduler(base_command, urls, max_workers, engine, listener=self, archive=archive,
+                                 tuner=tuner, info_cache=info_cache, governor=governor,
+                                 postprocessor=postprocessor, metrics=metrics, expanding=expanding,
+                                 ytdlp_cache=ytdlp_cache, cookie_jar=cookie_jar)
+        self.max_workers = self.core.max_workers
+
+    def start(self):
+        self.core.start()
+
+    @property
+    def total(self):
+        return self.core.total
+
+    def extend(self, urls):
+        self.core.extend(urls)
+
+    def end_expansion(self):
+        self.core.end_expansion()
+
+    @property
+    def finished(self):
+        return self.core.finished
+
+    @property
+    def stopped(self):
+        return self.core.stopped
+
+    def add(self, urls, priority=JobScheduler.URGENT):
+        return self.core.add(urls, priority)
+
+    def set_priority(self, index, priority):
+        return self.core.set_priority(index, priority)
+
+    def pause(self, index):
+        return self.core.pause(index)
+
+    def resume(self, index):
+        return self.core.resume(index)
+
+    def cancel(self, index):
+        return self.core.cancel(index)
+
+    def stop(self):
+        self.core.stop()
+
+    def count(self, state):
+        return self.core.count(state)
+
+    def job(self, index):
+        return self.core.job(index)
+
+    def running_jobs(self):
+        return self.core.running_jobs()
+
+    def aggregate_progress(self):
+        return self.core.aggregate_progress()
+
+    def on_job_started(self, job):
+        self.job_started.emit(job.index, job.url)
+
+    def on_job_progress(self, job):
+        self.job_progress.emit(job.index, job.progress)
+
+    def on_job_log(self, job, message):
+        self.job_log.emit(job.index, message)
+
+    def on_job_finished(self, job):
+        self.job_finished.emit(job.index, job.state == DownloadJob.DONE, job.error)
+
+    def on_batch_finished(self, done, failed):
+        self.batch_finished.emit(done, failed)
+
+    def on_engine_fallback(self, reason):
+        self.engine_fallback.emit(reason)
+
+    def on_job_retry(self, job, delay):
+        self.job_retry.emit(job.index, delay, job.error)
+
+    def on_job_paused(self, job):
+        self.job_paused.emit(job.index, job.state)
+
+
+class InstagramLoginThread(QThread):
+    """Logs in to Instagram and saves the session file off the GUI thread"""
+    finished_signal = pyqtSignal(bool, str)
+
+    def __init__(self, session_dir, username, password):
+        super().__init__()
+        self.session_dir = session_dir
+        self.username = username
+        self.password = password
+
+    def run(self):
+        try:
+            instagram_login(self.session_dir, self.username, self.password)
+            self.finished_signal.emit(True, "")
         except Exception as e:
             self.finished_signal.emit(False, str(e))
 
+
+class InstagramTask(QObject):
+    """Qt bridge for fastwex_instagram.InstagramDownloader, like DownloadScheduler for videos"""
+    log = pyqtSignal(str, str)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(int, int)
+
+    def __init__(self, options, workers, index=None, parent=None):
+        super().__init__(parent)
+        self.core = InstagramDownloader(options, workers, listener=self, index=index)
+
+    def configure(self, options, workers, index=None):
+        self.core.configure(options, workers)
+        self.core.index = index
+
+    def start(self, url):
+        self.core.start(url)
+
+    def cancel(self):
+        self.core.cancel()
+
+    def close(self):
+        self.core.close()
+
+    def on_log(self, message, level):
+        self.log.emit(message, level)
+
+    def on_progress(self, done, total):
+        self.progress.emit(done, total)
+
+    def on_finished(self, done, failed):
+        self.finished.emit(done, failed)
+
+
 class FastweXDownloader(QWidget):
+    # config key -> (widget attribute, default) for widgets that are built on first use
+    ADVANCED_SETTINGS = {
+        'embed_thumb': ('embed_thumbnail_checkbox', False),
+        'write_thumb': ('write_thumbnail_checkbox', False),
+        'subtitles': ('subtitles_checkbox', False),
+        'metadata': ('metadata_checkbox', False),
+        'unique_names': ('unique_names_checkbox', True),
+        'max_workers': ('max_workers_spin', 3),
+        'inprocess_engine': ('inprocess_engine_checkbox', False),
+        'batch_mode': ('batch_mode_checkbox', False),
+        'use_archive': ('archive_checkbox', True),
+        'turbo': ('turbo_checkbox', False),
+        'use_aria2c': ('aria2c_checkbox', False),
+        'info_cache': ('info_cache_checkbox', True),
+        'rate_limit': ('rate_limit_input', ""),
+        'rate_schedule': ('rate_schedule_input', ""),
+        'host_limits': ('host_limits_checkbox', True),
+        'separate_postprocess': ('separate_postprocess_checkbox', True),
+        'compatible_codecs': ('compatible_codecs_checkbox', False),
+        'expand_playlists': ('expand_playlists_checkbox', False),
+        'share_cookies': ('share_cookies_checkbox', True),
+        'prewarm_cache': ('prewarm_cache_checkbox', True),
+    }
+    INSTAGRAM_SETTINGS = {
+        'insta_save_path': ('insta_path_input', ""),
+        'insta_high_quality': ('insta_high_quality_check', True),
+        'insta_captions': ('insta_captions_check', False),
+        'insta_stories': ('insta_stories_check', False),
+        'insta_igtv': ('insta_igtv_check', False),
+        'insta_alternative': ('insta_alternative_checkbox', False),
+        'insta_workers': ('insta_workers_spin', 3),
+        'insta_incremental': ('insta_incremental_check', True),
+        'insta_session_user': ('insta_session_input', ""),
+    }
+
     def __init__(self):
         super().__init__()
         self.setup_paths()
-        self.check_dependencies()
+        # Filled by load_config after the first paint, holds the values of widgets not built yet
+        self.config = {}
+        self.first_paint_done = False
+        self.insta_task = None
+        # InstagramTask whose loader processes are kept between downloads
+        self.insta_loader = None
+        self.gallery_thread = None
+        self.playlist_thread = None
+        self.download_process = None
+        self.scheduler = None
+        self.cache_prewarm = None
+        startup_timer.mark("paths")
         
         self.setWindowTitle("FastweX İndirici v4.1")
         self.setWindowIcon(QIcon(self.logo_path))
@@ -80,35 +675,71 @@ class FastweXDownloader(QWidget):
         self.tray_icon.show()
         
         self.setup_ui_theme()
+        startup_timer.mark("theme")
         self.init_ui()
-        self.load_config()
+        startup_timer.mark("ui")
 
     def setup_paths(self):
-        self.base_dir = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
-        self.data_dir = os.path.join(self.base_dir, "datas")
-        self.downloads_path = str(Path.home() / "Downloads")
-        self.logo_path = os.path.join(self.data_dir, "logo", "fastwex.png")
-        self.yt_dlp_path = os.path.join(self.data_dir, "yt-dlp", "yt-dlp.exe")
-        self.gallery_dl_path = os.path.join(self.data_dir, "gallery-dl", "gallery-dl.exe")
-        self.ffmpeg_dir = os.path.join(self.data_dir, "ffmpeg-codec", "bin")
-        self.ffmpeg_path = os.path.join(self.ffmpeg_dir, "ffmpeg.exe")
-        self.config_path = os.path.join(self.base_dir, "config.json")
+        self.paths = AppPaths()
+        self.base_dir = self.paths.base_dir
+        self.data_dir = self.paths.data_dir
+        self.downloads_path = self.paths.downloads_path
+        self.logo_path = self.paths.logo_path
+        self.yt_dlp_path = self.paths.yt_dlp_path
+        self.gallery_dl_path = self.paths.gallery_dl_path
+        self.ffmpeg_dir = self.paths.ffmpeg_dir
+        self.ffmpeg_path = self.paths.ffmpeg_path
+        self.config_path = self.paths.config_path
+        self.archive = None
+        self.info_cache = None
+        self.metrics = None
+        self.ytdlp_cache = None
+        self.job_store = None
+        self.instagram_index = None
 
         os.makedirs(self.data_dir, exist_ok=True)
         os.makedirs(self.downloads_path, exist_ok=True)
 
     def check_dependencies(self):
-        missing = []
-        if not os.path.exists(self.yt_dlp_path):
-            missing.append("yt-dlp.exe")
-        if not os.path.exists(self.gallery_dl_path):
-            missing.append("gallery-dl.exe")
-        if not os.path.exists(self.ffmpeg_path):
-            missing.append("ffmpeg.exe")
-        
+        missing = self.paths.missing_tools()
         if missing:
             QMessageBox.critical(self, "Hata", f"Eksik bağımlılıklar: {', '.join(missing)}")
-            sys.exit(1)
+            QApplication.exit(1)
+            return False
+        return True
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            startup_timer.mark("first_paint")
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Work deferred until the window is on screen"""
+        self.load_config()
+        startup_timer.mark("ready")
+        if STARTUP_BENCHMARK:
+            print(json.dumps(startup_timer.phases), flush=True)
+            QApplication.quit()
+            return
+        if self.check_dependencies():
+            if self.setting('prewarm_cache'):
+                self.start_cache_prewarm()
+            self.resume_unfinished_batch()
+
+    def start_cache_prewarm(self):
+        """Fill the yt-dlp cache in the background, the first YouTube jobs find the player solved"""
+        self.cache_prewarm = CachePrewarm(self.get_ytdlp_cache(), self.yt_dlp_path, self)
+        self.cache_prewarm.finished_signal.connect(self.handle_cache_prewarmed)
+        if self.cache_prewarm.start():
+            self.append_log("🔥 yt-dlp önbelleği arka planda ısıtılıyor", "info")
+
+    def handle_cache_prewarmed(self, success, error_message):
+        if success:
+            self.append_log("🔥 yt-dlp önbelleği hazır", "info")
+        else:
+            self.append_log(f"⚠️ yt-dlp önbelleği ısıtılamadı: {error_message}", "warning")
 
     def setup_ui_theme(self):
         """Modern dark theme setup"""
@@ -282,7 +913,7 @@ class FastweXDownloader(QWidget):
             }
             
             /* OTHER ELEMENTS */
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: #1e1e1e;
                 color: #e0e0e0;
                 font-family: Consolas;
@@ -290,6 +921,22 @@ class FastweXDownloader(QWidget):
                 border: 1px solid #3e3e42;
                 border-radius: 4px;
             }
+            QTableView {
+                background-color: #1e1e1e;
+                color: #e0e0e0;
+                font-family: Consolas;
+                font-size: 9pt;
+                border: 1px solid #3e3e42;
+                border-radius: 4px;
+                gridline-color: #2d2d30;
+                selection-background-color: #094771;
+            }
+            QHeaderView::section {
+                background-color: #2d2d30;
+                color: #f0f0f0;
+                border: none;
+                padding: 3px;
+            }
             QProgressBar {
                 height: 20px;
                 text-align: center;
@@ -340,28 +987,30 @@ class FastweXDownloader(QWidget):
         # Video Tab
         self.init_video_tab()
         
-        # Instagram Tab
+        # Instagram Tab (built when first selected)
         self.init_instagram_tab()
+        self.tabs.currentChanged.connect(self.handle_tab_changed)
 
         # Progress Bar
         self.progress_bar = QProgressBar()
         layout.addWidget(self.progress_bar, 2, 0, 1, 4)
 
+        # Batch Status
+        self.batch_status_label = QLabel("")
+        layout.addWidget(self.batch_status_label, 3, 0, 1, 4)
+
         # Log Output
-        self.log_output = QTextEdit()
+        self.log_output = LogView()
         self.log_output.setPlaceholderText("İndirme logları burada görünecek...")
-        layout.addWidget(self.log_output, 3, 0, 1, 4)
+        layout.addWidget(self.log_output, 4, 0, 1, 4)
 
         # Download Button
         self.download_button = QPushButton("🚀 İNDİRMEYİ BAŞLAT")
         self.download_button.setObjectName("download_button")
         self.download_button.clicked.connect(self.start_download)
-        layout.addWidget(self.download_button, 4, 0, 1, 4)
+        layout.addWidget(self.download_button, 5, 0, 1, 4)
 
         self.setLayout(layout)
-        
-        # Startup optimization
-        QTimer.singleShot(100, self.load_config)
 
     def init_logo(self, layout):
         self.logo_label = QLabel(self)
@@ -382,10 +1031,34 @@ class FastweXDownloader(QWidget):
         self.url_label = QLabel("📌 Video URL(ler):")
         video_layout.addWidget(self.url_label, 0, 0)
         
+        url_list_layout = QVBoxLayout()
         self.url_input = QTextEdit()
         self.url_input.setPlaceholderText("Her satıra bir URL girin\nVeya TXT dosyası seçin")
-        self.url_input.setMaximumHeight(80)
-        video_layout.addWidget(self.url_input, 0, 1, 1, 3)
+        self.url_input.setMaximumHeight(60)
+        url_list_layout.addWidget(self.url_input)
+
+        # Kuyruk: TXT'den ve URL Ekle ile gelenler, indirme durumlarıyla
+        self.url_model = UrlQueueModel(parent=self)
+        self.queue_view = QTableView()
+        self.queue_view.setModel(self.url_model)
+        self.queue_view.setMaximumHeight(140)
+        self.queue_view.setWordWrap(False)
+        self.queue_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.queue_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        # Öne alma, duraklatma ve iptal, indirme sürerken
+        self.queue_view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.queue_view.customContextMenuRequested.connect(self.show_queue_menu)
+        # Fixed row heights and column widths: nothing is measured across all rows
+        self.queue_view.verticalHeader().setVisible(False)
+        self.queue_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.queue_view.verticalHeader().setDefaultSectionSize(20)
+        header = self.queue_view.horizontalHeader()
+        header.setSectionResizeMode(UrlQueueModel.URL_COLUMN, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(UrlQueueModel.STATE_COLUMN, QHeaderView.ResizeMode.Fixed)
+        header.resizeSection(UrlQueueModel.STATE_COLUMN, 130)
+        url_list_layout.addWidget(self.queue_view)
+        video_layout.addLayout(url_list_layout, 0, 1, 1, 3)
+        self.import_thread = None
 
         # URL Buttons
         url_button_layout = QHBoxLayout()
@@ -440,7 +1113,12 @@ class FastweXDownloader(QWidget):
         self.manual_quality_input = QLineEdit()
         self.manual_quality_input.setPlaceholderText("Örn: 720, 1080, 4K")
         self.manual_quality_input.setEnabled(False)
-        video_layout.addWidget(self.manual_quality_input, 5, 1, 1, 3)
+        video_layout.addWidget(self.manual_quality_input, 5, 1, 1, 2)
+
+        self.resolutions_button = QPushButton("🔎 Çözünürlükler")
+        self.resolutions_button.setToolTip("İlk URL'nin mevcut çözünürlüklerini getirir")
+        self.resolutions_button.clicked.connect(self.fetch_resolutions)
+        video_layout.addWidget(self.resolutions_button, 5, 3)
 
         # Alternative Download Option
         self.alternative_download_layout = QHBoxLayout()
@@ -449,7 +1127,26 @@ class FastweXDownloader(QWidget):
         self.alternative_download_layout.addWidget(self.alternative_download_checkbox)
         video_layout.addLayout(self.alternative_download_layout, 6, 0, 1, 4)
 
-        # Advanced Settings
+        # Advanced Settings (built on first open)
+        self.advanced_toggle = QPushButton("⚙️ Gelişmiş Ayarlar ▸")
+        self.advanced_toggle.setObjectName("advanced_toggle")
+        self.advanced_toggle.setCheckable(True)
+        self.advanced_toggle.toggled.connect(self.toggle_advanced_settings)
+        video_layout.addWidget(self.advanced_toggle, 7, 0, 1, 4)
+        self.advanced_group = None
+        self.video_layout = video_layout
+
+        video_tab.setLayout(video_layout)
+        self.tabs.addTab(video_tab, "🎥 Video İndir")
+
+    def toggle_advanced_settings(self, checked):
+        if checked and self.advanced_group is None:
+            self.build_advanced_settings()
+        if self.advanced_group is not None:
+            self.advanced_group.setVisible(checked)
+        self.advanced_toggle.setText("⚙️ Gelişmiş Ayarlar " + ("▾" if checked else "▸"))
+
+    def build_advanced_settings(self):
         self.advanced_group = QGroupBox("⚙️ Gelişmiş Ayarlar")
         advanced_layout = QGridLayout()
         
@@ -472,15 +1169,126 @@ class FastweXDownloader(QWidget):
         self.unique_names_checkbox.setChecked(True)
         self.unique_names_checkbox.setToolTip("Aynı isimli dosyaların üzerine yazılmasını engeller")
         advanced_layout.addWidget(self.unique_names_checkbox, 2, 0, 1, 2)
+
+        # Parallel Downloads
+        self.max_workers_label = QLabel("Eşzamanlı indirme:")
+        advanced_layout.addWidget(self.max_workers_label, 3, 0)
+
+        self.max_workers_spin = QSpinBox()
+        self.max_workers_spin.setRange(1, 16)
+        self.max_workers_spin.setValue(3)
+        self.max_workers_spin.setToolTip("Aynı anda çalışacak yt-dlp işlemi sayısı")
+        advanced_layout.addWidget(self.max_workers_spin, 3, 1)
+
+        # In-process Engine
+        self.inprocess_engine_checkbox = QCheckBox("Dahili motor (yt-dlp modülü)")
+        if fastwex_engine.is_available():
+            self.inprocess_engine_checkbox.setToolTip("yt-dlp'yi süreç içinde çalıştırır, her URL için yeniden başlatmaz")
+        else:
+            self.inprocess_engine_checkbox.setEnabled(False)
+            self.inprocess_engine_checkbox.setToolTip("yt_dlp Python modülü bulunamadı")
+        advanced_layout.addWidget(self.inprocess_engine_checkbox, 4, 0, 1, 2)
+
+        # Batch Mode
+        self.batch_mode_checkbox = QCheckBox("Toplu mod (tek yt-dlp işlemi)")
+        self.batch_mode_checkbox.setToolTip("Kuyruğu --batch-file ile tek işlemde indirir, kısa videolarda daha hızlıdır")
+        advanced_layout.addWidget(self.batch_mode_checkbox, 5, 0, 1, 2)
+
+        # Download Archive
+        self.archive_checkbox = QCheckBox("Daha önce indirilenleri atla")
+        self.archive_checkbox.setChecked(True)
+        self.archive_checkbox.setToolTip("İndirme arşivindeki videolar yt-dlp başlatılmadan atlanır")
+        advanced_layout.addWidget(self.archive_checkbox, 6, 0, 1, 2)
+
+        # Turbo Mode
+        self.turbo_checkbox = QCheckBox("Turbo (çoklu bağlantı)")
+        self.turbo_checkbox.setToolTip("DASH/HLS parçalarını paralel indirir, bağlantı sayısı siteye göre ayarlanır")
+        advanced_layout.addWidget(self.turbo_checkbox, 7, 0)
+
+        self.aria2c_checkbox = QCheckBox("aria2c kullan")
+        if self.paths.missing_tools(("aria2c",)):
+            self.aria2c_checkbox.setEnabled(False)
+            self.aria2c_checkbox.setToolTip("datas/aria2c/aria2c.exe bulunamadı")
+        else:
+            self.aria2c_checkbox.setToolTip("Turbo modda indirmeyi aria2c ile yapar")
+        advanced_layout.addWidget(self.aria2c_checkbox, 7, 1)
+
+        # Info Cache
+        self.info_cache_checkbox = QCheckBox("Video bilgisini önbellekle")
+        self.info_cache_checkbox.setChecked(True)
+        self.info_cache_checkbox.setToolTip("Tekrar indirmede sayfa yeniden çözümlenmez (--load-info-json)")
+        advanced_layout.addWidget(self.info_cache_checkbox, 8, 0, 1, 2)
+
+        # Bandwidth Governor
+        advanced_layout.addWidget(QLabel("Hız sınırı:"), 9, 0)
+        self.rate_limit_input = QLineEdit()
+        self.rate_limit_input.setPlaceholderText("örn. 8M veya 80%")
+        self.rate_limit_input.setToolTip("Tüm indirmelerin toplam hızı, eşzamanlı işlemler arasında paylaştırılır.\n"
+                                         "80% gibi bir değer ölçülen bağlantı hızının yüzdesidir. Boş: sınırsız\n"
+                                         "yt-dlp işlemleri paylarını başlarken alır, işler bitip başladıkça yeniden "
+                                         "paylaştırma sadece dahili motorda yapılır")
+        advanced_layout.addWidget(self.rate_limit_input, 9, 1)
+
+        advanced_layout.addWidget(QLabel("Saat planı:"), 10, 0)
+        self.rate_schedule_input = QLineEdit()
+        self.rate_schedule_input.setPlaceholderText("örn. 09-18=2M, 01-07=0")
+        self.rate_schedule_input.setToolTip("Bu saatlerde hız sınırının yerine geçer, 0 sınırı kaldırır")
+        advanced_layout.addWidget(self.rate_schedule_input, 10, 1)
+
+        self.host_limits_checkbox = QCheckBox("Site başına eşzamanlı indirme sınırı")
+        self.host_limits_checkbox.setChecked(True)
+        self.host_limits_checkbox.setToolTip("Aynı anda en fazla 3 YouTube, 2 Instagram, 2 TikTok indirmesi; "
+                                             "sitenin hızı düşürmesini önler")
+        advanced_layout.addWidget(self.host_limits_checkbox, 11, 0, 1, 2)
+
+        # Post-processing
+        self.separate_postprocess_checkbox = QCheckBox("Dönüştürmeyi indirmeden ayır")
+        self.separate_postprocess_checkbox.setChecked(True)
+        self.separate_postprocess_checkbox.setToolTip("Birleştirme, MP3 dönüştürme ve küçük resim ekleme çekirdek sayısı "
+                                                      "kadar ffmpeg ile yapılır, sıradaki indirme beklemez")
+        advanced_layout.addWidget(self.separate_postprocess_checkbox, 12, 0, 1, 2)
+
+        self.compatible_codecs_checkbox = QCheckBox("MP4'ü her oynatıcıyla uyumlu yap")
+        self.compatible_codecs_checkbox.setToolTip("AV1, VP9, Opus ve FLAC akışları kopyalanmaz, H.264/AAC'ye "
+                                                   "dönüştürülür; eski oynatıcılar ve TV'ler açabilir ama daha yavaştır")
+        advanced_layout.addWidget(self.compatible_codecs_checkbox, 13, 0, 1, 2)
+
+        # Playlists
+        self.expand_playlists_checkbox = QCheckBox("Oynatma listelerini ve kanalları aç")
+        self.expand_playlists_checkbox.setToolTip("Liste/kanal URL'lerindeki videolar listelendikçe kuyruğa eklenir, "
+                                                  "ilk videolar liste bitmeden inmeye başlar")
+        advanced_layout.addWidget(self.expand_playlists_checkbox, 14, 0, 1, 2)
+
+        # yt-dlp cache and cookies
+        self.share_cookies_checkbox = QCheckBox("Çerezleri indirmeler arasında paylaş")
+        self.share_cookies_checkbox.setChecked(True)
+        self.share_cookies_checkbox.setToolTip("Tüm indirmeler uygulama klasöründeki cookies.txt dosyasını kullanır, "
+                                               "bir indirmenin aldığı çerezler sonrakilere kalır")
+        advanced_layout.addWidget(self.share_cookies_checkbox, 15, 0, 1, 2)
+
+        self.prewarm_cache_checkbox = QCheckBox("Açılışta yt-dlp önbelleğini ısıt")
+        self.prewarm_cache_checkbox.setChecked(True)
+        self.prewarm_cache_checkbox.setToolTip("YouTube oynatıcısı arka planda bir kez çözülür, "
+                                               "ilk indirmeler bunu beklemez")
+        advanced_layout.addWidget(self.prewarm_cache_checkbox, 16, 0, 1, 2)
         
         self.advanced_group.setLayout(advanced_layout)
-        video_layout.addWidget(self.advanced_group, 7, 0, 1, 4)
-
-        video_tab.setLayout(video_layout)
-        self.tabs.addTab(video_tab, "🎥 Video İndir")
+        self.video_layout.addWidget(self.advanced_group, 8, 0, 1, 4)
+        self.apply_settings(self.ADVANCED_SETTINGS)
 
     def init_instagram_tab(self):
-        insta_tab = QWidget()
+        self.insta_tab = QWidget()
+        self.insta_tab_built = False
+        self.tabs.addTab(self.insta_tab, "📷 Instagram İndir")
+
+    def handle_tab_changed(self, index):
+        if self.tabs.widget(index) is self.insta_tab:
+            self.build_instagram_tab()
+
+    def build_instagram_tab(self):
+        if self.insta_tab_built:
+            return
+        self.insta_tab_built = True
         insta_layout = QGridLayout()
 
         # URL Input
@@ -519,6 +1327,29 @@ class FastweXDownloader(QWidget):
         
         self.insta_igtv_check = QCheckBox("IGTV indir")
         options_layout.addWidget(self.insta_igtv_check, 1, 1)
+
+        self.insta_workers_label = QLabel("Eşzamanlı gönderi:")
+        options_layout.addWidget(self.insta_workers_label, 2, 0)
+        self.insta_workers_spin = QSpinBox()
+        self.insta_workers_spin.setRange(1, 8)
+        self.insta_workers_spin.setValue(3)
+        self.insta_workers_spin.setToolTip("Bir profilin aynı anda indirilecek gönderi sayısı")
+        options_layout.addWidget(self.insta_workers_spin, 2, 1)
+
+        self.insta_incremental_check = QCheckBox("Sadece yeni gönderiler")
+        self.insta_incremental_check.setChecked(True)
+        self.insta_incremental_check.setToolTip("Profilin son eşitlemeden sonraki gönderilerini indirir")
+        options_layout.addWidget(self.insta_incremental_check, 3, 0)
+
+        # Oturum: giriş yapılınca dosyaya kaydedilir, sonraki indirmelerde tekrar kullanılır
+        session_layout = QHBoxLayout()
+        self.insta_session_input = QLineEdit()
+        self.insta_session_input.setPlaceholderText("Oturum kullanıcı adı (isteğe bağlı)")
+        session_layout.addWidget(self.insta_session_input)
+        self.insta_login_button = QPushButton("Giriş Yap")
+        self.insta_login_button.clicked.connect(self.instagram_login)
+        session_layout.addWidget(self.insta_login_button)
+        options_layout.addLayout(session_layout, 3, 1)
         
         self.insta_options_group.setLayout(options_layout)
         insta_layout.addWidget(self.insta_options_group, 2, 0, 1, 4)
@@ -530,82 +1361,185 @@ class FastweXDownloader(QWidget):
         self.insta_alternative_layout.addWidget(self.insta_alternative_checkbox)
         insta_layout.addLayout(self.insta_alternative_layout, 3, 0, 1, 4)
 
-        insta_tab.setLayout(insta_layout)
-        self.tabs.addTab(insta_tab, "📷 Instagram İndir")
+        self.insta_tab.setLayout(insta_layout)
+        self.apply_settings(self.INSTAGRAM_SETTINGS)
+
+    def get_archive(self):
+        if self.archive is None:
+            self.archive = DownloadArchive(self.paths.archive_db_path, self.paths.ytdlp_archive_path)
+        return self.archive
+
+    def get_job_store(self):
+        if self.job_store is None:
+            self.job_store = JobStore(self.paths.job_store_path)
+        return self.job_store
+
+    def get_instagram_index(self):
+        if self.instagram_index is None:
+            self.instagram_index = ProfileIndex(self.paths.instagram_index_path)
+        return self.instagram_index
+
+    def get_info_cache(self):
+        if self.info_cache is None:
+            self.info_cache = InfoCache(self.paths.info_cache_dir)
+        return self.info_cache
+
+    def get_metrics(self):
+        if self.metrics is None:
+            self.metrics = MetricsRecorder(self.paths.metrics_path)
+        return self.metrics
+
+    def get_ytdlp_cache(self):
+        if self.ytdlp_cache is None:
+            self.ytdlp_cache = build_ytdlp_cache(self.paths)
+        return self.ytdlp_cache
+
+    def setting(self, key):
+        """Value of an advanced / Instagram setting, read from config when its widget is not built yet"""
+        attr, default = {**self.ADVANCED_SETTINGS, **self.INSTAGRAM_SETTINGS}[key]
+        widget = getattr(self, attr, None)
+        if widget is None:
+            return self.config.get(key, default)
+        if isinstance(widget, QSpinBox):
+            return widget.value()
+        if isinstance(widget, QLineEdit):
+            return widget.text()
+        return widget.isChecked()
+
+    def apply_settings(self, settings):
+        """Push loaded config values into freshly built widgets"""
+        for key, (attr, _) in settings.items():
+            widget = getattr(self, attr, None)
+            if widget is None or key not in self.config:
+                continue
+            value = self.config[key]
+            if isinstance(widget, QSpinBox):
+                widget.setValue(value)
+            elif isinstance(widget, QLineEdit):
+                widget.setText(value or (self.downloads_path if key.endswith('_path') else ""))
+            else:
+                widget.setChecked(value)
 
     def load_config(self):
         if os.path.exists(self.config_path):
             try:
                 with open(self.config_path, 'r') as f:
-                    config = json.load(f)
-                    # Video ayarları
-                    self.path_input.setText(config.get('video_save_path', self.downloads_path))
-                    self.format_combo.setCurrentIndex(config.get('format_index', 0))
-                    self.quality_combo.setCurrentIndex(config.get('quality_index', 0))
-                    self.manual_quality_input.setText(config.get('manual_quality', ''))
-                    self.embed_thumbnail_checkbox.setChecked(config.get('embed_thumb', False))
-                    self.write_thumbnail_checkbox.setChecked(config.get('write_thumb', False))
-                    self.subtitles_checkbox.setChecked(config.get('subtitles', False))
-                    self.metadata_checkbox.setChecked(config.get('metadata', False))
-                    self.unique_names_checkbox.setChecked(config.get('unique_names', True))
-                    self.alternative_download_checkbox.setChecked(config.get('alternative_download', False))
-                    
-                    # Instagram ayarları
-                    self.insta_path_input.setText(config.get('insta_save_path', self.downloads_path))
-                    self.insta_high_quality_check.setChecked(config.get('insta_high_quality', True))
-                    self.insta_captions_check.setChecked(config.get('insta_captions', False))
-                    self.insta_stories_check.setChecked(config.get('insta_stories', False))
-                    self.insta_igtv_check.setChecked(config.get('insta_igtv', False))
-                    self.insta_alternative_checkbox.setChecked(config.get('insta_alternative', False))
+                    self.config = json.load(f)
             except Exception as e:
                 print(f"Config yüklenirken hata: {str(e)}")
+                return
+        config = self.config
+        # Video ayarları
+        self.path_input.setText(config.get('video_save_path', self.downloads_path))
+        self.format_combo.setCurrentIndex(config.get('format_index', 0))
+        self.quality_combo.setCurrentIndex(config.get('quality_index', 0))
+        self.manual_quality_input.setText(config.get('manual_quality', ''))
+        self.alternative_download_checkbox.setChecked(config.get('alternative_download', False))
+
+        # Gelişmiş ve Instagram ayarları, widget'lar oluşturulduysa
+        self.apply_settings(self.ADVANCED_SETTINGS)
+        self.apply_settings(self.INSTAGRAM_SETTINGS)
 
     def save_config(self):
-        config = {
+        config = dict(self.config)
+        config.update({
             # Video ayarları
             'video_save_path': self.path_input.text(),
             'format_index': self.format_combo.currentIndex(),
             'quality_index': self.quality_combo.currentIndex(),
             'manual_quality': self.manual_quality_input.text(),
-            'embed_thumb': self.embed_thumbnail_checkbox.isChecked(),
-            'write_thumb': self.write_thumbnail_checkbox.isChecked(),
-            'subtitles': self.subtitles_checkbox.isChecked(),
-            'metadata': self.metadata_checkbox.isChecked(),
-            'unique_names': self.unique_names_checkbox.isChecked(),
             'alternative_download': self.alternative_download_checkbox.isChecked(),
-            
-            # Instagram ayarları
-            'insta_save_path': self.insta_path_input.text(),
-            'insta_high_quality': self.insta_high_quality_check.isChecked(),
-            'insta_captions': self.insta_captions_check.isChecked(),
-            'insta_stories': self.insta_stories_check.isChecked(),
-            'insta_igtv': self.insta_igtv_check.isChecked(),
-            'insta_alternative': self.insta_alternative_checkbox.isChecked()
-        }
+        })
+        # Gelişmiş ve Instagram ayarları
+        for key in {**self.ADVANCED_SETTINGS, **self.INSTAGRAM_SETTINGS}:
+            config[key] = self.setting(key)
+        self.config = config
         try:
             with open(self.config_path, 'w') as f:
                 json.dump(config, f)
         except Exception as e:
             print(f"Config kaydedilirken hata: {str(e)}")
 
+    def batch_running(self):
+        return self.scheduler is not None and not self.scheduler.finished
+
     def add_url(self):
         url, ok = QInputDialog.getText(self, "URL Ekle", "İndirilecek URL'yi girin:")
-        if ok and url:
-            self.url_input.append(url.strip())
+        if not ok or not url.strip():
+            return
+        url = normalize_url(url.strip())
+        if canonical_key(url) in self.url_model.keys:
+            self.append_log("⏭️ URL zaten kuyrukta", "info")
+        elif self.batch_running():
+            # Rows are added before the jobs, so row and job numbers stay the same
+            self.url_model.append_rows([url])
+            self.scheduler.add([url])
+            self.append_log(f"⚡ Öncelikli olarak eklendi: {url}", "info")
+            self.update_batch_status()
+        else:
+            self.url_model.append_urls([url])
+
+    def show_queue_menu(self, position):
+        if not self.batch_running():
+            return
+        rows = sorted({index.row() for index in self.queue_view.selectionModel().selectedRows()})
+        if not rows:
+            return
+        menu = QMenu(self)
+        actions = {
+            menu.addAction("⚡ Hemen indir"): lambda row: self.scheduler.set_priority(row, JobScheduler.URGENT),
+            menu.addAction("⏸️ Duraklat"): self.scheduler.pause,
+            menu.addAction("▶️ Devam et"): self.scheduler.resume,
+            menu.addAction("✖️ İptal et"): self.scheduler.cancel,
+        }
+        action = menu.exec(self.queue_view.viewport().mapToGlobal(position))
+        if action is None:
+            return
+        changed = sum(1 for row in rows if actions[action](row))
+        if changed < len(rows):
+            self.append_log(f"⚠️ {len(rows) - changed} iş için uygulanamadı (bitmiş, dönüştürülüyor "
+                            f"ya da motor işi bırakmıyor)", "warning")
+        self.update_batch_status()
 
     def load_urls_from_txt(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "TXT Dosyası Seç", "", "Text Files (*.txt);;All Files (*)")
-        if file_path:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    urls = [line.strip() for line in f if line.strip()]
-                    self.url_input.setPlainText('\n'.join(urls))
-                self.append_log(f"✅ {len(urls)} URL TXT dosyasından yüklendi", "success")
-            except Exception as e:
-                QMessageBox.warning(self, "Hata", f"Dosya okunurken hata oluştu:\n{str(e)}")
+        if not file_path:
+            return
+        if self.import_thread is not None and self.import_thread.isRunning():
+            QMessageBox.warning(self, "Uyarı", "Önceki TXT dosyası hâlâ okunuyor!")
+            return
+        self.load_txt_button.setEnabled(False)
+        self.import_added = 0
+        self.import_thread = UrlImportThread(file_path, self.url_model.keys)
+        self.import_thread.urls_signal.connect(self.handle_imported_urls)
+        self.import_thread.finished_signal.connect(self.handle_import_finished)
+        self.import_thread.start()
+
+    def handle_imported_urls(self, entries):
+        self.import_added += self.url_model.append_entries(entries)
+
+    def handle_import_finished(self, read, duplicates, error_message):
+        self.load_txt_button.setEnabled(True)
+        if error_message:
+            QMessageBox.warning(self, "Hata", f"Dosya okunurken hata oluştu:\n{error_message}")
+        # URLs added by hand while the file was read are dropped here, not in the thread
+        duplicates += read - self.import_added
+        self.append_log(f"✅ {self.import_added} URL TXT dosyasından yüklendi", "success")
+        if duplicates:
+            self.append_log(f"⏭️ {duplicates} tekrarlanan URL çıkarıldı", "info")
+
+    def queued_urls(self):
+        """Move URLs typed into url_input to the queue, returns every queued URL"""
+        typed = [line.strip() for line in self.url_input.toPlainText().split('\n')
+                 if line.strip() and not line.strip().startswith('#')]
+        if typed:
+            self.url_model.append_urls(typed)
+            self.url_input.clear()
+        return self.url_model.urls
 
     def clear_urls(self):
         self.url_input.clear()
+        self.url_model.clear()
 
     def browse_folder(self, target_input):
         folder = QFileDialog.getExistingDirectory(self, "Klasör Seç", self.downloads_path)
@@ -615,11 +1549,50 @@ class FastweXDownloader(QWidget):
     def toggle_manual_quality(self):
         self.manual_quality_input.setEnabled(self.quality_combo.currentText() == "Manuel Seçim")
 
+    def fetch_resolutions(self):
+        urls = self.queued_urls()
+        if not urls:
+            QMessageBox.warning(self, "Uyarı", "Lütfen en az bir URL girin!")
+            return
+
+        cache = None
+        if self.setting('info_cache'):
+            try:
+                cache = self.get_info_cache()
+            except Exception as e:
+                self.append_log(f"⚠️ Bilgi önbelleği kullanılamadı: {str(e)}", "warning")
+
+        self.resolutions_button.setEnabled(False)
+        self.append_log(f"🔎 Çözünürlükler alınıyor: {urls[0]}", "info")
+        self.info_thread = InfoThread(self.paths, urls[0], cache)
+        self.info_thread.finished_signal.connect(self.handle_resolutions)
+        self.info_thread.start()
+
+    def handle_resolutions(self, heights, error_message):
+        self.resolutions_button.setEnabled(True)
+        if error_message:
+            self.append_log(f"❌ Hata: {error_message}", "error")
+            return
+        if not heights:
+            self.append_log("⚠️ Video çözünürlüğü bulunamadı (sadece ses olabilir)", "warning")
+            return
+
+        values = [str(height) for height in heights]
+        self.append_log(f"📐 Mevcut çözünürlükler: {', '.join(values)}", "success")
+        self.manual_quality_input.setCompleter(QCompleter(values, self))
+        self.manual_quality_input.setPlaceholderText("Mevcut: " + ", ".join(values))
+        self.quality_combo.setCurrentText("Manuel Seçim")
+        if not self.manual_quality_input.text().strip():
+            self.manual_quality_input.setText(values[0])
+
     def start_download(self):
         current_tab = self.tabs.currentIndex()
         
         if current_tab == 0:  # Video sekmesi
-            urls = [url.strip() for url in self.url_input.toPlainText().split('\n') if url.strip()]
+            if self.import_thread is not None and self.import_thread.isRunning():
+                QMessageBox.warning(self, "Uyarı", "TXT dosyası hâlâ okunuyor, lütfen bekleyin!")
+                return
+            urls = list(self.queued_urls())
             if not urls:
                 QMessageBox.warning(self, "Uyarı", "Lütfen en az bir URL girin!")
                 return
@@ -628,6 +1601,7 @@ class FastweXDownloader(QWidget):
             self.download_videos(urls)
             
         elif current_tab == 1:  # Instagram sekmesi
+            self.build_instagram_tab()
             url = self.insta_url_input.text().strip()
             if not url:
                 QMessageBox.warning(self, "Uyarı", "Lütfen bir URL veya kullanıcı adı girin!")
@@ -648,61 +1622,175 @@ class FastweXDownloader(QWidget):
             QMessageBox.warning(self, "Uyarı", "Lütfen bir kayıt klasörü seçin!")
             return
 
-        # Çıktı şablonunu ayarla (benzersiz isimler için)
-        output_template = f"{save_path}/%(title)s.%(ext)s"
-        if self.unique_names_checkbox.isChecked():
-            output_template = f"{save_path}/%(title)s-%(id)s.%(ext)s"
-
-        base_command = [
-            self.yt_dlp_path,
-            "-o", output_template,
-            "--ffmpeg-location", self.ffmpeg_dir,
-            "--no-warnings",
-            "--newline",
-            "--no-colors",
-            "--no-playlist"
-        ]
-
-        # Alternatif indirme seçeneği
-        if self.alternative_download_checkbox.isChecked():
-            base_command.extend(["-f", "best"])
-        else:
-            # Format Seçimi
-            format_choice = self.format_combo.currentText()
-            if format_choice == "MP4 (Video+Ses)":
-                if self.quality_combo.currentText() == "Manuel Seçim" and self.manual_quality_input.text().strip().isdigit():
-                    base_command.extend(["-f", f"bestvideo[height<={self.manual_quality_input.text().strip()}]+bestaudio"])
-                else:
-                    base_command.extend(["-f", "bestvideo+bestaudio"])
-                base_command.extend(["--merge-output-format", "mp4"])
-            elif format_choice == "MP3 (Sadece Ses)":
-                base_command.extend(["-x", "--audio-format", "mp3", "--audio-quality", "0"])
-            elif format_choice == "M4A (Yüksek Kalite Ses)":
-                base_command.extend(["-f", "bestaudio[ext=m4a]", "--audio-quality", "0"])
-
-            # Diğer Ayarlar
-            if self.embed_thumbnail_checkbox.isChecked():
-                base_command.append("--embed-thumbnail")
-            if self.write_thumbnail_checkbox.isChecked():
-                base_command.extend(["--write-thumbnail", "--convert-thumbnails", "jpg"])
-            if self.subtitles_checkbox.isChecked():
-                base_command.extend(["--write-subs", "--sub-langs", "all", "--convert-subs", "srt"])
-            if self.metadata_checkbox.isChecked():
-                base_command.append("--embed-metadata")
+        options = self.collect_video_options(save_path)
+
+        # Arşivde olanları yt-dlp başlatmadan ele
+        archive = None
+        if options.use_archive:
+            try:
+                archive = self.get_archive()
+                # Playlist entries are checked against the archive as they are listed
+                if not options.expand_playlists:
+                    urls, skipped, duplicates = filter_archived(archive, urls)
+                    if skipped:
+                        self.append_log(f"⏭️ {skipped} URL daha önce indirilmiş, atlandı", "info")
+                    if duplicates:
+                        self.append_log(f"⏭️ {duplicates} tekrarlanan URL çıkarıldı", "info")
+            except Exception as e:
+                archive = None
+                self.append_log(f"⚠️ İndirme arşivi kullanılamadı: {str(e)}", "warning")
+
+        if not urls:
+            self.append_log("✅ İndirilecek yeni URL yok", "success")
+            self.progress_bar.setValue(100)
+            return
+        # The queue starts empty and fills as the playlists are listed
+        playlists = None
+        if options.expand_playlists:
+            playlists, urls = urls, []
+        # Kuyruk satırları iş numaralarıyla eşleşsin
+        self.url_model.set_urls(urls)
 
         # URL'leri işle
-        self.total_urls = len(urls)
-        self.current_url_index = 0
-        self.urls = urls
-        self.base_command = base_command
-        
-        # RAM optimizasyonu için thread kullan
-        self.download_thread = DownloadThread(base_command + [urls[0]])
-        self.download_thread.progress_signal.connect(self.handle_download_progress)
-        self.download_thread.finished_signal.connect(self.handle_download_finished)
-        self.download_thread.start()
-        
-        self.append_log(f"🔍 İndiriliyor: {urls[0]} (1/{self.total_urls})", "info")
+        engine = DownloadScheduler.SUBPROCESS
+        if self.setting('batch_mode'):
+            engine = DownloadScheduler.BATCH
+        elif self.setting('inprocess_engine') and fastwex_engine.is_available():
+            engine = DownloadScheduler.INPROCESS
+        max_workers = self.setting('max_workers')
+
+        # Kuyruğu diske yaz, çökme veya tepsiden çıkıştan sonra kaldığı yerden devam edilebilsin
+        queue = urls
+        try:
+            store = self.get_job_store()
+            queue = store.queue(store.create_batch(urls, options.to_dict(), engine, max_workers))
+        except Exception as e:
+            self.append_log(f"⚠️ İndirme kuyruğu kaydedilemedi: {str(e)}", "warning")
+
+        self.start_scheduler(options, queue, engine, max_workers, archive, playlists)
+
+    def start_scheduler(self, options, queue, engine, max_workers, archive=None, playlists=None):
+        base_command = build_video_command(options, self.paths)
+
+        info_cache = None
+        if options.use_info_cache:
+            try:
+                info_cache = self.get_info_cache()
+            except Exception as e:
+                self.append_log(f"⚠️ Bilgi önbelleği kullanılamadı: {str(e)}", "warning")
+
+        governor = None
+        try:
+            governor = build_bandwidth_governor(options)
+        except ValueError as e:
+            self.append_log(f"⚠️ Hız sınırı kullanılamadı: {str(e)}", "warning")
+
+        metrics = self.get_metrics()
+        metrics.start_batch()
+        ytdlp_cache = self.get_ytdlp_cache()
+        ytdlp_cache.start_batch()
+        self.scheduler = DownloadScheduler(base_command, queue, max_workers, engine, archive,
+                                           build_host_tuner(options, self.paths), info_cache, governor,
+                                           build_postprocessor(options, self.paths), metrics, bool(playlists),
+                                           ytdlp_cache, build_cookie_jar(options, self.paths), self)
+        self.scheduler.job_started.connect(self.handle_job_started)
+        self.scheduler.job_progress.connect(self.handle_job_progress)
+        self.scheduler.job_log.connect(self.handle_job_log)
+        self.scheduler.job_finished.connect(self.handle_job_finished)
+        self.scheduler.batch_finished.connect(self.handle_batch_finished)
+        self.scheduler.engine_fallback.connect(self.handle_engine_fallback)
+        self.scheduler.job_retry.connect(self.handle_job_retry)
+        self.scheduler.job_paused.connect(self.handle_job_paused)
+
+        self.download_button.setEnabled(False)
+        if playlists:
+            self.append_log(f"📃 {len(playlists)} liste açılıyor, videolar {self.scheduler.max_workers} eşzamanlı "
+                            f"işlemle indirilecek", "info")
+        else:
+            pending = self.scheduler.count(DownloadJob.PENDING)
+            self.append_log(f"🚀 {pending} URL, {self.scheduler.max_workers} eşzamanlı işlemle indirilecek", "info")
+        self.scheduler.start()
+
+        if playlists:
+            commands = [(url, build_playlist_command(self.paths, url)) for url in playlists]
+            self.playlist_thread = PlaylistExpandThread(commands, archive)
+            self.playlist_thread.entries_signal.connect(self.handle_playlist_entries)
+            self.playlist_thread.log_signal.connect(self.append_log)
+            self.playlist_thread.finished_signal.connect(self.scheduler.end_expansion)
+            self.playlist_thread.start()
+
+    def handle_playlist_entries(self, urls):
+        # Rows are added before the jobs, so row and job numbers stay the same
+        self.url_model.append_rows(urls)
+        self.scheduler.extend(urls)
+        self.update_batch_status()
+
+    def resume_unfinished_batch(self):
+        """Offer to continue the newest batch a crash or a quit left unfinished"""
+        try:
+            store = self.get_job_store()
+            batches = store.unfinished_batches()
+        except Exception as e:
+            self.append_log(f"⚠️ İndirme kuyruğu okunamadı: {str(e)}", "warning")
+            return
+        if not batches:
+            return
+
+        batch = batches[0]
+        answer = QMessageBox.question(
+            self, "Yarım kalan indirme",
+            f"Önceki oturumdan {batch['remaining']}/{batch['total']} URL indirilmeyi bekliyor.\n"
+            "Kaldığı yerden devam edilsin mi?"
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            store.delete_batch(batch['id'])
+            return
+
+        options = DownloadOptions.from_dict(batch['options'])
+        archive = None
+        if options.use_archive:
+            try:
+                archive = self.get_archive()
+            except Exception as e:
+                self.append_log(f"⚠️ İndirme arşivi kullanılamadı: {str(e)}", "warning")
+
+        self.progress_bar.setValue(0)
+        self.log_output.clear()
+        queue = store.queue(batch['id'])
+        urls, states = [], []
+        for url, state in store.jobs(batch['id']):
+            urls.append(url)
+            states.append(state)
+        self.url_model.set_urls(urls, states)
+        self.append_log(f"♻️ Yarım kalan indirmeye devam ediliyor ({options.save_path})", "info")
+        self.start_scheduler(options, queue, batch['engine'], batch['max_workers'], archive)
+
+    def collect_video_options(self, save_path):
+        quality = ""
+        if self.quality_combo.currentText() == "Manuel Seçim":
+            quality = self.manual_quality_input.text().strip()
+        return DownloadOptions(
+            save_path=save_path,
+            format=DownloadOptions.FORMATS[self.format_combo.currentIndex()],
+            quality=quality,
+            alternative=self.alternative_download_checkbox.isChecked(),
+            embed_thumbnail=self.setting('embed_thumb'),
+            write_thumbnail=self.setting('write_thumb'),
+            subtitles=self.setting('subtitles'),
+            metadata=self.setting('metadata'),
+            unique_names=self.setting('unique_names'),
+            use_archive=self.setting('use_archive'),
+            turbo=self.setting('turbo'),
+            use_aria2c=self.setting('use_aria2c'),
+            use_info_cache=self.setting('info_cache'),
+            rate_limit=self.setting('rate_limit').strip(),
+            rate_schedule=self.setting('rate_schedule').strip(),
+            host_limits=self.setting('host_limits'),
+            separate_postprocess=self.setting('separate_postprocess'),
+            compatible_codecs=self.setting('compatible_codecs'),
+            expand_playlists=self.setting('expand_playlists'),
+            share_cookies=self.setting('share_cookies'),
+        )
 
     def download_instagram(self, url):
         self.progress_bar.setValue(0)
@@ -713,57 +1801,75 @@ class FastweXDownloader(QWidget):
             QMessageBox.warning(self, "Uyarı", "Lütfen bir kayıt klasörü seçin!")
             return
 
+        if self.insta_stories_check.isChecked():
+            self.append_log("⚠️ Hikaye indirmek için giriş yapmalısınız", "warning")
+
+        # Instaloader işlem havuzunda çalışır, pencere donmaz
+        options = {
+            "save_path": save_path,
+            "captions": self.insta_captions_check.isChecked(),
+            "igtv": self.insta_igtv_check.isChecked(),
+            "incremental": self.insta_incremental_check.isChecked(),
+            "session_user": self.insta_session_input.text().strip(),
+            "session_dir": self.paths.instagram_session_dir,
+        }
+        index = None
         try:
-            import instaloader
-            self.append_log("🔍 Instagram içeriği indiriliyor...", "info")
-            
-            L = instaloader.Instaloader(
-                dirname_pattern=os.path.join(save_path, "{profile}", "{target}"),
-                save_metadata=self.insta_captions_check.isChecked(),
-                download_video_thumbnails=False,
-                download_geotags=False,
-                download_comments=False,
-                compress_json=False
-            )
-
-            # İndirme seçenekleri
-            options = {
-                "profile": None,
-                "fast_update": True,
-                "download_videos": True,
-                "download_pictures": True,
-                "download_video_thumbnails": False,
-                "download_geotags": False,
-                "download_comments": False,
-                "post_filter": None
-            }
-
-            if "/p/" in url:  # Tek gönderi
-                post = instaloader.Post.from_shortcode(L.context, url.split("/p/")[1].split("/")[0])
-                L.download_post(post, target=post.owner_username)
-                self.append_log(f"✅ Gönderi indirildi: {post.shortcode}", "success")
-            elif "/stories/" in url:  # Hikaye
-                self.append_log("⚠️ Hikaye indirmek için giriş yapmalısınız", "warning")
-                return
-            else:  # Profil
-                profile = instaloader.Profile.from_username(L.context, url.split("/")[-1])
-                
-                if self.insta_stories_check.isChecked():
-                    self.append_log("⚠️ Hikaye indirmek için giriş yapmalısınız", "warning")
-                
-                if self.insta_igtv_check.isChecked():
-                    L.download_igtv(profile)
-                    self.append_log(f"✅ IGTV indirildi: {profile.username}", "success")
-                
-                L.download_profile(profile, profile_pic_only=False)
-                self.append_log(f"✅ Profil indirildi: {profile.username}", "success")
-            
+            index = self.get_instagram_index()
+        except Exception as e:
+            self.append_log(f"⚠️ Instagram profil dizini kullanılamadı: {str(e)}", "warning")
+        self.append_log("🔍 Instagram içeriği indiriliyor...", "info")
+        self.download_button.setEnabled(False)
+        if self.insta_loader is None:
+            self.insta_loader = InstagramTask(options, self.setting('insta_workers'), index, self)
+            self.insta_loader.log.connect(self.append_log)
+            self.insta_loader.progress.connect(self.handle_instagram_progress)
+            self.insta_loader.finished.connect(self.handle_instagram_finished)
+        else:
+            self.insta_loader.configure(options, self.setting('insta_workers'), index)
+        self.insta_task = self.insta_loader
+        self.insta_task.start(url)
+
+    def instagram_login(self):
+        username = self.insta_session_input.text().strip()
+        if not username:
+            QMessageBox.warning(self, "Uyarı", "Lütfen bir kullanıcı adı girin!")
+            return
+        password, ok = QInputDialog.getText(self, "Instagram Giriş", f"{username} için şifre:",
+                                            QLineEdit.EchoMode.Password)
+        if not ok or not password:
+            return
+        self.insta_login_button.setEnabled(False)
+        self.append_log(f"🔑 Instagram'a giriş yapılıyor: {username}", "info")
+        self.login_thread = InstagramLoginThread(self.paths.instagram_session_dir, username, password)
+        self.login_thread.finished_signal.connect(self.handle_instagram_login)
+        self.login_thread.start()
+
+    def handle_instagram_login(self, success, error_message):
+        self.insta_login_button.setEnabled(True)
+        if success:
+            self.append_log("✅ Giriş yapıldı, oturum kaydedildi", "success")
+            self.save_config()
+            if self.insta_loader is not None and self.insta_task is None:
+                # The loader processes hold the old session, the next download starts new ones
+                self.insta_loader.close()
+        else:
+            self.append_log(f"❌ Giriş başarısız: {error_message}", "error")
+
+    def handle_instagram_progress(self, done, total):
+        if total:
+            self.progress_bar.setValue(int(done * 100 / total))
+            self.progress_bar.setFormat(f"%p% ({done}/{total})")
+
+    def handle_instagram_finished(self, done, failed):
+        self.insta_task = None
+        self.download_button.setEnabled(True)
+        if failed:
+            self.append_log(f"⚠️ Instagram indirme bitti: {done} başarılı, {failed} hatalı", "warning")
+            QMessageBox.warning(self, "Hata", f"Instagram indirmesinde {failed} hata oluştu, ayrıntılar logda.")
+        elif done:
             self.progress_bar.setValue(100)
             self.append_log("🎉 Instagram indirme tamamlandı!", "success")
-            
-        except Exception as e:
-            self.append_log(f"❌ Hata: {str(e)}", "error")
-            QMessageBox.warning(self, "Hata", f"Instagram indirme hatası:\n{str(e)}")
 
     def download_instagram_with_gallery_dl(self, url):
         self.progress_bar.setValue(0)
@@ -774,99 +1880,138 @@ class FastweXDownloader(QWidget):
             QMessageBox.warning(self, "Uyarı", "Lütfen bir kayıt klasörü seçin!")
             return
 
-        command = [
-            self.gallery_dl_path,
-            "--directory", save_path,
-            "--no-check-certificate",
-            "--filename", "%(title)s.%(ext)s"
-        ]
-
-        if self.insta_captions_check.isChecked():
-            command.append("--write-metadata")
+        self.download_button.setEnabled(False)
+        # Açıklamalar -g ile alınamaz, o durumda gallery-dl dosyaları kendisi indirir
+        if not self.insta_captions_check.isChecked() and fastwex_gallery.is_available():
+            self.append_log("🔍 Instagram medyaları çözülüyor, paralel indiriliyor (gallery-dl)...", "info")
+            self.gallery_thread = GalleryFetchThread(build_gallery_dl_resolve_command(self.paths, url), save_path)
+            self.gallery_thread.progress_signal.connect(self.handle_instagram_progress)
+            self.gallery_thread.log_signal.connect(self.append_log)
+            self.gallery_thread.finished_signal.connect(self.handle_download_finished)
+            self.gallery_thread.start()
+            return
 
-        command.append(url)
+        command = build_gallery_dl_command(self.paths, save_path, url, self.insta_captions_check.isChecked())
 
         self.append_log("🔍 Instagram içeriği indiriliyor (gallery-dl)...", "info")
         
-        # RAM optimizasyonu için thread kullan
-        self.download_thread = DownloadThread(command)
-        self.download_thread.progress_signal.connect(self.handle_download_progress)
-        self.download_thread.finished_signal.connect(self.handle_download_finished)
-        self.download_thread.start()
+        self.download_process = DownloadProcess(command, self)
+        self.download_process.progress_signal.connect(self.handle_download_progress)
+        self.download_process.log_signal.connect(self.handle_download_log)
+        self.download_process.finished_signal.connect(self.handle_download_finished)
+        self.download_process.start()
+
+    def handle_download_progress(self, event):
+        if event.percent is not None:
+            self.progress_bar.setValue(int(event.percent))
 
-    def handle_download_progress(self, progress, message):
-        if progress > 0:
-            self.progress_bar.setValue(progress)
-        if message:
-            self.append_log(message, "info")
+    def handle_download_log(self, message):
+        self.append_log(message, "info")
 
     def handle_download_finished(self, success, error_message):
         if success:
             self.append_log("✅ İndirme tamamlandı", "success")
-            if hasattr(self, 'current_url_index') and hasattr(self, 'total_urls'):
-                self.current_url_index += 1
-                if self.current_url_index < self.total_urls:
-                    # Next URL in queue
-                    next_url = self.urls[self.current_url_index]
-                    self.append_log(f"\n🔍 İndiriliyor: {next_url} ({self.current_url_index + 1}/{self.total_urls})", "info")
-                    
-                    # Update command with next URL
-                    command = self.base_command.copy()
-                    command.append(next_url)
-                    
-                    # Start next download
-                    self.download_thread = DownloadThread(command)
-                    self.download_thread.progress_signal.connect(self.handle_download_progress)
-                    self.download_thread.finished_signal.connect(self.handle_download_finished)
-                    self.download_thread.start()
-                else:
-                    # All downloads completed
-                    self.append_log("\n🎉 TÜM İNDİRMELER BAŞARIYLA TAMAMLANDI!", "success")
-                    QMessageBox.information(self, "Başarılı", "Tüm indirmeler tamamlandı!")
-                    self.progress_bar.setValue(100)
-                    self.download_button.setEnabled(True)
+            self.progress_bar.setValue(100)
         else:
             if error_message:
                 self.append_log(f"❌ Hata: {error_message}", "error")
             else:
                 self.append_log("❌ İndirme başarısız oldu!", "error")
-            
-            if hasattr(self, 'current_url_index') and hasattr(self, 'total_urls'):
-                self.current_url_index += 1
-                if self.current_url_index < self.total_urls:
-                    # Continue with next URL despite error
-                    next_url = self.urls[self.current_url_index]
-                    self.append_log(f"\n⏭️ Bir sonraki URL'ye geçiliyor: {next_url}", "warning")
-                    
-                    command = self.base_command.copy()
-                    command.append(next_url)
-                    
-                    self.download_thread = DownloadThread(command)
-                    self.download_thread.progress_signal.connect(self.handle_download_progress)
-                    self.download_thread.finished_signal.connect(self.handle_download_finished)
-                    self.download_thread.start()
-                else:
-                    self.append_log("\n⚠️ Tüm URL'ler denendi ancak bazı hatalar oluştu!", "warning")
-                    self.download_button.setEnabled(True)
+        self.download_button.setEnabled(True)
 
-    def append_log(self, message, msg_type="info"):
-        cursor = self.log_output.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        
-        if msg_type == "error":
-            color = "#ff4444"  # Kırmızı
-        elif msg_type == "success":
-            color = "#44ff44"  # Yeşil
-        elif msg_type == "warning":
-            color = "#ffff44"  # Sarı
+    def job_tag(self, index):
+        return f"[{index + 1}/{self.scheduler.total}]"
+
+    def handle_job_started(self, index, url):
+        self.append_log(f"🔍 İndiriliyor: {url} {self.job_tag(index)}", "info")
+        self.url_model.set_state(index, DownloadJob.RUNNING)
+        self.update_batch_status()
+
+    def handle_job_progress(self, index, progress):
+        job = self.scheduler.job(index)
+        if job is None:
+            # Finished before this queued signal arrived
+            return
+        self.url_model.set_state(index, DownloadJob.RUNNING, progress)
+        self.log_output.set_progress(index, f"{self.job_tag(index)} ⬇️ {self.format_job_status(job)}")
+        self.update_batch_status()
+
+    def handle_job_log(self, index, message):
+        self.append_log(f"{self.job_tag(index)} {message}", "info")
+
+    def handle_job_finished(self, index, success, error_message):
+        tag = self.job_tag(index)
+        if success:
+            self.append_log(f"✅ İndirme tamamlandı {tag}", "success")
+        elif error_message:
+            self.append_log(f"❌ Hata {tag}: {error_message}", "error")
         else:
-            color = "#ffffff"  # Beyaz
-        
-        self.log_output.setTextColor(QColor(color))
-        cursor.insertText(message + "\n")
-        self.log_output.setTextColor(QColor("#e0e0e0"))
-        
-        self.log_output.ensureCursorVisible()
+            self.append_log(f"❌ İndirme başarısız oldu! {tag}", "error")
+        self.url_model.set_state(index, DownloadJob.DONE if success else DownloadJob.FAILED)
+        self.update_batch_status()
+
+    def handle_job_retry(self, index, delay, error_message):
+        self.append_log(f"🔁 {error_message} {self.job_tag(index)}, {delay:.0f} sn sonra tekrar denenecek", "warning")
+        self.url_model.set_state(index, DownloadJob.PENDING)
+        self.update_batch_status()
+
+    def handle_job_paused(self, index, state):
+        if state == DownloadJob.PAUSED:
+            self.append_log(f"⏸️ Duraklatıldı {self.job_tag(index)}", "warning")
+        else:
+            self.append_log(f"⏸️ Öncelikli bir işe yer açmak için durduruldu {self.job_tag(index)}", "warning")
+        self.url_model.set_state(index, state)
+        self.update_batch_status()
+
+    def handle_engine_fallback(self, reason):
+        self.append_log(f"⚠️ Dahili motor başlatılamadı, yt-dlp kullanılacak: {reason}", "warning")
+
+    def handle_batch_finished(self, done, failed):
+        self.update_batch_status()
+        if self.scheduler.stopped:
+            # Uygulama kapanıyor, kalan işler sonraki açılışta devam eder
+            self.download_button.setEnabled(True)
+            return
+        summary = self.get_metrics().format_summary()
+        if summary:
+            self.append_log(f"\n📊 İndirme özeti:\n{summary}", "info")
+        cache_summary = self.get_ytdlp_cache().format_summary()
+        if cache_summary:
+            self.append_log(cache_summary, "info")
+        if failed == 0:
+            self.append_log("\n🎉 TÜM İNDİRMELER BAŞARIYLA TAMAMLANDI!", "success")
+            QMessageBox.information(self, "Başarılı", "Tüm indirmeler tamamlandı!")
+            self.progress_bar.setValue(100)
+        else:
+            self.append_log(f"\n⚠️ Tüm URL'ler denendi ancak {failed} tanesinde hata oluştu!", "warning")
+        self.download_button.setEnabled(True)
+
+    def format_job_status(self, job):
+        status = f"#{job.index + 1} %{job.progress}"
+        if job.speed is not None:
+            status += f" {format_bytes(job.speed)}/s ETA {format_eta(job.eta)}"
+        return status
+
+    def update_batch_status(self):
+        """Aggregate progress on the bar, per-job progress on the status label"""
+        scheduler = self.scheduler
+        total = scheduler.total
+        finished = scheduler.count(DownloadJob.DONE) + scheduler.count(DownloadJob.FAILED)
+        self.progress_bar.setValue(scheduler.aggregate_progress())
+        self.progress_bar.setFormat(f"%p% ({finished}/{total})")
+
+        running = " · ".join(self.format_job_status(job) for job in scheduler.running_jobs())
+        self.batch_status_label.setText(
+            f"Bekleyen: {scheduler.count(DownloadJob.PENDING)} | "
+            f"Çalışan: {scheduler.count(DownloadJob.RUNNING)} | "
+            f"Tamamlanan: {scheduler.count(DownloadJob.DONE)} | "
+            f"Hatalı: {scheduler.count(DownloadJob.FAILED)}"
+            + (f" | Duraklatılan: {scheduler.count(DownloadJob.PAUSED)}" if scheduler.count(DownloadJob.PAUSED) else "")
+            + (f"\n{running}" if running else "")
+        )
+
+    def append_log(self, message, msg_type="info"):
+        self.log_output.append_line(message, msg_type)
 
     def show_normal(self):
         """Restore window from system tray"""
@@ -877,6 +2022,19 @@ class FastweXDownloader(QWidget):
     def quit_app(self):
         """Clean exit from system tray"""
         self.save_config()
+        if self.insta_loader is not None:
+            self.insta_loader.close()
+        if self.gallery_thread is not None and self.gallery_thread.isRunning():
+            self.gallery_thread.fetcher.cancel()
+        if self.playlist_thread is not None and self.playlist_thread.isRunning():
+            self.playlist_thread.expander.cancel()
+        if self.download_process is not None:
+            self.download_process.kill()
+        if self.cache_prewarm is not None:
+            self.cache_prewarm.kill()
+        if self.batch_running():
+            # yt-dlp ve ffmpeg süreçleri kapatılır, .part dosyaları sonraki açılışta devam eder
+            self.scheduler.stop()
         self.tray_icon.hide()
         QApplication.quit()
 
@@ -906,6 +2064,8 @@ class FastweXDownloader(QWidget):
         )
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
     # Optimize application startup
     app = QApplication(sys.argv)
     app.setStyle('Fusion')  # Use Fusion style for better performance
@@ -914,11 +2074,12 @@ if __name__ == "__main__":
     splash_pix = QPixmap(os.path.join(os.path.dirname(__file__), "datas", "logo", "fastwex.png"))
     splash = QSplashScreen(splash_pix, Qt.WindowType.WindowStaysOnTopHint)
     splash.show()
+    app.processEvents()
+    startup_timer.mark("app")
     
-    # Initialize main window in background
-    QTimer.singleShot(100, lambda: splash.close())
-    
+    # Splash stays up until the window is shown, config is loaded after the first paint
     window = FastweXDownloader()
     window.show()
+    splash.finish(window)
     
     sys.exit(app.exec())
@@ -0,0 +1,82 @@
+"""Per-URL yt-dlp spawning vs a single --batch-file run.
+
+Usage:
+    python benchmarks/batch_vs_per_url.py urls.txt [--yt-dlp PATH] [--download DIR] [--repeat N]
+
+Without --download every run uses --simulate, so only process startup and
+extraction are measured. With --download the files are written to DIR
+(cleared between runs) and the transfer is included.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_YT_DLP = os.path.join(BASE_DIR, "datas", "yt-dlp", "yt-dlp.exe")
+
+
+def base_command(yt_dlp, output_dir):
+    command = [yt_dlp] if os.path.exists(yt_dlp) else yt_dlp.split()
+    command += ["--no-warnings", "--newline", "--no-colors", "--no-playlist", "--ignore-errors"]
+    if output_dir:
+        command += ["-o", os.path.join(output_dir, "%(title)s-%(id)s.%(ext)s")]
+    else:
+        command.append("--simulate")
+    return command
+
+
+def run(command):
+    started = time.perf_counter()
+    subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def per_url(urls, command):
+    return sum(run(command + [url]) for url in urls)
+
+
+def batch(urls, command):
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".txt", delete=False) as f:
+        f.write("\n".join(urls) + "\n")
+    try:
+        return run(command + ["--batch-file", f.name])
+    finally:
+        os.remove(f.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("urls", help="TXT file, one URL per line")
+    parser.add_argument("--yt-dlp", default=DEFAULT_YT_DLP, help="yt-dlp command (default: bundled exe)")
+    parser.add_argument("--download", metavar="DIR", help="download into DIR instead of --simulate")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.urls, encoding="utf-8") as f:
+        urls = [line.strip() for line in f if line.strip()]
+    if not urls:
+        sys.exit("URL listesi boş")
+
+    results = {"per-url": [], "batch": []}
+    for _ in range(args.repeat):
+        for mode, runner in (("per-url", per_url), ("batch", batch)):
+            if args.download:
+                shutil.rmtree(args.download, ignore_errors=True)
+            results[mode].append(runner(urls, base_command(args.yt_dlp, args.download)))
+
+    print(f"{len(urls)} URL, {args.repeat} tekrar")
+    print(f"{'mod':<10}{'toplam (s)':>12}{'URL başına (ms)':>18}")
+    for mode, timings in results.items():
+        median = statistics.median(timings)
+        print(f"{mode:<10}{median:>12.2f}{median * 1000 / len(urls):>18.0f}")
+    speedup = statistics.median(results["per-url"]) / statistics.median(results["batch"])
+    print(f"batch hızlanma: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
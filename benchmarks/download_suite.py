@@ -0,0 +1,357 @@
+"""Offline benchmark suite of the download path.
+
+Usage:
+    python benchmarks/download_suite.py [--scenarios throughput,per_url,gui_latency,memory,startup]
+                                        [--urls N] [--size-kib K] [--latency-ms L] [--rate-kib R]
+                                        [--progress-hz H] [--log-lines N] [--engines subprocess,batch]
+                                        [--workers N] [--repeat N] [--yt-dlp PATH]
+                                        [--results FILE] [--label TEXT]
+
+Everything runs against benchmarks/media_server.py on 127.0.0.1, with
+benchmarks/fake_yt_dlp.py standing in for yt-dlp unless --yt-dlp names a
+real one. The scenarios drive the same code as the app:
+
+    throughput   N URLs through JobScheduler per engine with --workers workers
+    per_url      the same with one worker: seconds per URL and its overhead
+                 (everything but the transfer, from fastwex_metrics.job_phases)
+    gui_latency  the window downloads N URLs while the stand-in floods the log,
+                 a 10 ms QTimer measures how late the event loop runs it
+    memory       --memory-rounds batches of --memory-urls URLs in a row, Python
+                 heap (tracemalloc) after every batch and its growth per batch
+    startup      benchmarks/startup_benchmark.py, time to first paint
+
+With --results every run is appended to FILE as one JSON line (commit,
+machine, settings and figures) and compared with the last run of FILE that
+used the same settings, so a change to the scheduler, the engines or the
+log view can be judged against the commit before it.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+FAKE_YT_DLP = os.path.join(BENCH_DIR, "fake_yt_dlp.py")
+SCENARIOS = ("throughput", "per_url", "gui_latency", "memory", "startup")
+sys.path.insert(0, BASE_DIR)
+
+from fastwex_core import (AppPaths, DownloadJob, DownloadOptions, JobScheduler, SchedulerListener,  # noqa: E402
+                          build_video_command)
+from fastwex_metrics import job_phases  # noqa: E402
+from media_server import MediaServer  # noqa: E402
+
+
+def yt_dlp_command(yt_dlp):
+    if yt_dlp:
+        return [yt_dlp] if os.path.exists(yt_dlp) else yt_dlp.split()
+    return [sys.executable, FAKE_YT_DLP]
+
+
+def media_urls(server, count, size):
+    # Every fourth URL is an HLS stream of 4 segments of the same total size
+    return [server.url(f"hls/v{index}.m3u8?segments=4&segment_size={size // 4}") if index % 4 == 3
+            else server.url(f"video/v{index}.mp4?size={size}") for index in range(count)]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+class Collector(SchedulerListener):
+    def __init__(self):
+        self.jobs = []
+        self.lock = threading.Lock()
+
+    def on_job_finished(self, job):
+        with self.lock:
+            self.jobs.append(job)
+
+
+def run_scheduler(urls, engine, workers, yt_dlp, output_dir):
+    """Download urls with JobScheduler, returns (seconds, finished jobs)"""
+    shutil.rmtree(output_dir, ignore_errors=True)
+    options = DownloadOptions(output_dir, alternative=True, use_archive=False, use_info_cache=False,
+                              host_limits=False, separate_postprocess=False)
+    command = yt_dlp_command(yt_dlp) + build_video_command(options, AppPaths(output_dir))[1:]
+    listener = Collector()
+    scheduler = JobScheduler(command, urls, workers, engine, listener=listener)
+    started = time.perf_counter()
+    scheduler.start()
+    scheduler.wait()
+    return time.perf_counter() - started, listener.jobs
+
+
+def throughput(args, server, work_dir):
+    urls = media_urls(server, args.urls, args.size_kib * 1024)
+    results = {}
+    for engine in args.engines:
+        runs = [run_scheduler(urls, engine, args.workers, args.yt_dlp, os.path.join(work_dir, "out"))
+                for _ in range(args.repeat)]
+        seconds = statistics.median(elapsed for elapsed, _ in runs)
+        jobs = runs[-1][1]
+        results[engine] = {
+            "seconds": round(seconds, 3),
+            "urls_per_s": round(len(urls) / seconds, 2),
+            "mib_per_s": round(sum(job.downloaded_bytes for job in jobs) / seconds / 1024 ** 2, 2),
+            "failed": sum(job.state == DownloadJob.FAILED for job in jobs),
+        }
+    return results
+
+
+def per_url(args, server, work_dir):
+    urls = media_urls(server, min(args.urls, 10), args.size_kib * 1024)
+    results = {}
+    for engine in args.engines:
+        totals, overheads = [], []
+        for _ in range(args.repeat):
+            _, jobs = run_scheduler(urls, engine, 1, args.yt_dlp, os.path.join(work_dir, "out"))
+            for job in jobs:
+                phases = job_phases(job)
+                total = job.finished_at - job.started_at
+                totals.append(total)
+                overheads.append(total - phases["transfer"])
+        results[engine] = {
+            "p50_ms": round(statistics.median(totals) * 1000, 1),
+            "p95_ms": round(percentile(totals, 0.95) * 1000, 1),
+            "overhead_p50_ms": round(statistics.median(overheads) * 1000, 1),
+        }
+    return results
+
+
+def memory(args, server, work_dir):
+    urls = media_urls(server, args.memory_urls, 16 * 1024)
+    engine = args.engines[0]
+    tracemalloc.start()
+    try:
+        heap = []
+        for _ in range(args.memory_rounds):
+            run_scheduler(urls, engine, args.workers, args.yt_dlp, os.path.join(work_dir, "out"))
+            gc.collect()
+            heap.append(tracemalloc.get_traced_memory()[0])
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # The first batch fills caches and imports lazily, growth is counted from there
+    growth = (heap[-1] - heap[0]) / (len(heap) - 1) if len(heap) > 1 else 0
+    return {engine: {
+        "heap_kib": round(heap[-1] / 1024),
+        "peak_kib": round(peak / 1024),
+        "growth_per_batch_kib": round(growth / 1024, 1),
+    }}
+
+
+def gui_latency(args, server, work_dir):
+    urls = media_urls(server, args.urls, args.size_kib * 1024)
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", FASTWEX_FAKE_LOG_LINES=str(args.gui_log_lines))
+    results = {}
+    for engine in args.engines:
+        runs = []
+        for _ in range(args.repeat):
+            child = {"urls": urls, "engine": engine, "workers": args.workers, "yt_dlp": args.yt_dlp,
+                     "work_dir": os.path.join(work_dir, "gui")}
+            shutil.rmtree(child["work_dir"], ignore_errors=True)
+            result = subprocess.run([args.python, os.path.abspath(__file__), "--gui-child", json.dumps(child)],
+                                    env=env, cwd=BASE_DIR, capture_output=True, text=True, timeout=args.timeout)
+            lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+            if not lines:
+                raise RuntimeError(f"arayüz ölçümü sonuç vermedi: {result.stderr.strip()[-500:]}")
+            runs.append(json.loads(lines[-1]))
+        results[engine] = {key: round(statistics.median(run[key] for run in runs), 1) for key in runs[0]}
+    return results
+
+
+def gui_child(child):
+    """Runs in its own process: the window downloads child["urls"], prints the timer lateness as JSON"""
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication, QMessageBox
+
+    import FastweXDownloader
+
+    app = QApplication([])
+    # Dialogs would block the event loop until someone clicks them
+    for name in ("information", "warning", "critical", "question"):
+        setattr(QMessageBox, name, staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.No))
+    original_command = FastweXDownloader.build_video_command
+    FastweXDownloader.build_video_command = \
+        lambda options, paths: yt_dlp_command(child["yt_dlp"]) + original_command(options, paths)[1:]
+    FastweXDownloader.FastweXDownloader.check_dependencies = lambda self: False
+
+    # Settings come from a config.json of our own, the user's config and queue are not touched
+    os.makedirs(child["work_dir"], exist_ok=True)
+    paths = AppPaths(child["work_dir"])
+    with open(paths.config_path, "w", encoding="utf-8") as f:
+        json.dump({"video_save_path": os.path.join(child["work_dir"], "out"), "alternative_download": True,
+                   "use_archive": False, "info_cache": False, "separate_postprocess": False,
+                   "host_limits": False, "max_workers": child["workers"],
+                   "batch_mode": child["engine"] == JobScheduler.BATCH,
+                   "inprocess_engine": child["engine"] == JobScheduler.INPROCESS}, f)
+    window = FastweXDownloader.FastweXDownloader()
+    window.paths = paths
+    window.config_path = paths.config_path
+    window.show()
+
+    interval = 0.010
+    gaps = []
+    state = {"last": 0.0, "started": 0.0}
+
+    def tick():
+        now = time.perf_counter()
+        if state["last"]:
+            gaps.append(now - state["last"] - interval)
+        state["last"] = now
+        if state["started"] and window.download_button.isEnabled():
+            finish(now)
+
+    def finish(now):
+        probe.stop()
+        print(json.dumps({
+            "seconds": now - state["started"],
+            "late_p50_ms": statistics.median(gaps) * 1000,
+            "late_p95_ms": percentile(gaps, 0.95) * 1000,
+            "late_p99_ms": percentile(gaps, 0.99) * 1000,
+            "late_max_ms": max(gaps) * 1000,
+        }), flush=True)
+        app.quit()
+
+    def start():
+        if not window.first_paint_done:
+            QTimer.singleShot(50, start)
+            return
+        window.url_input.setPlainText("\n".join(child["urls"]))
+        gaps.clear()
+        state["started"] = time.perf_counter()
+        window.start_download()
+
+    probe = QTimer()
+    probe.timeout.connect(tick)
+    probe.start(int(interval * 1000))
+    # After finish_startup, which the first paint queues
+    QTimer.singleShot(50, start)
+    app.exec()
+
+
+def startup(args, server, work_dir):
+    import startup_benchmark
+
+    env = dict(os.environ, FASTWEX_STARTUP_BENCHMARK="1", QT_QPA_PLATFORM="offscreen")
+    startup_benchmark.run_once(args.python, env, args.timeout)
+    runs = [startup_benchmark.run_once(args.python, env, args.timeout) for _ in range(args.startup_runs)]
+    return {"window": {phase: round(statistics.median(run[phase] for run in runs), 1)
+                       for phase in ("imports", "first_paint", "ready", "spawn")}}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except OSError:
+        return ""
+
+
+def previous_run(path, settings):
+    """Last record of the results file made with the same settings, or None"""
+    if not path or not os.path.exists(path):
+        return None
+    previous = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("settings") == settings:
+                previous = record
+    return previous
+
+
+def print_results(results, previous):
+    print(f"{'senaryo':<14}{'motor':<12}{'ölçü':<24}{'değer':>12}{'önceki':>12}{'fark':>9}")
+    for scenario, engines in results.items():
+        for engine, figures in engines.items():
+            for name, value in figures.items():
+                before = (previous or {}).get("results", {}).get(scenario, {}).get(engine, {}).get(name)
+                change = f"{(value - before) / before * 100:+.0f}%" if before else ""
+                before = "" if before is None else before
+                print(f"{scenario:<14}{engine:<12}{name:<24}{value:>12}{before:>12}{change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--urls", type=int, default=40)
+    parser.add_argument("--size-kib", type=int, default=512, help="size of every media file")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="server delay before every response")
+    parser.add_argument("--rate-kib", type=int, default=4096, help="per-connection limit, KiB/s (0: none)")
+    parser.add_argument("--progress-hz", type=float, default=10.0, help="progress lines per second of the stand-in")
+    parser.add_argument("--log-lines", type=int, default=0, help="extra log lines per progress line")
+    parser.add_argument("--gui-log-lines", type=int, default=20, help="--log-lines of gui_latency")
+    parser.add_argument("--engines", default=f"{JobScheduler.SUBPROCESS},{JobScheduler.BATCH}")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--memory-urls", type=int, default=200)
+    parser.add_argument("--memory-rounds", type=int, default=5)
+    parser.add_argument("--startup-runs", type=int, default=5)
+    parser.add_argument("--yt-dlp", help="real yt-dlp command instead of benchmarks/fake_yt_dlp.py")
+    parser.add_argument("--python", default=sys.executable, help="interpreter with PyQt6 installed")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--results", metavar="FILE", help="append the run to FILE and compare with the last one")
+    parser.add_argument("--label", default="", help="note stored with the run")
+    parser.add_argument("--gui-child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.gui_child:
+        gui_child(json.loads(args.gui_child))
+        return 0
+
+    args.engines = args.engines.split(",")
+    scenarios = args.scenarios.split(",")
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"bilinmeyen senaryo: {', '.join(unknown)}")
+    # Read by the stand-in yt-dlp processes the scheduler starts
+    os.environ["FASTWEX_FAKE_PROGRESS_HZ"] = str(args.progress_hz)
+    os.environ["FASTWEX_FAKE_LOG_LINES"] = str(args.log_lines)
+
+    settings = {name: getattr(args, name) for name in (
+        "urls", "size_kib", "latency_ms", "rate_kib", "progress_hz", "log_lines", "gui_log_lines",
+        "engines", "workers", "memory_urls", "memory_rounds", "yt_dlp")}
+    runners = {"throughput": throughput, "per_url": per_url, "gui_latency": gui_latency,
+               "memory": memory, "startup": startup}
+    server = MediaServer(latency=args.latency_ms / 1000, rate=args.rate_kib * 1024)
+    work_dir = tempfile.mkdtemp(prefix="fastwex-suite-")
+    results = {}
+    try:
+        for name in scenarios:
+            print(f"⏳ {name}", flush=True)
+            try:
+                results[name] = runners[name](args, server, work_dir)
+            except (RuntimeError, OSError, subprocess.TimeoutExpired) as e:
+                print(f"{name}: hata: {e}", file=sys.stderr)
+    finally:
+        server.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    previous = previous_run(args.results, settings)
+    print_results(results, previous)
+    if args.results:
+        record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "label": args.label, "commit": git_commit(),
+                  "python": platform.python_version(), "machine": f"{platform.system()} {platform.machine()}",
+                  "cpus": os.cpu_count(), "settings": settings, "results": results}
+        with open(args.results, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
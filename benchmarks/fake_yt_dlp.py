@@ -0,0 +1,188 @@
+"""Stand-in for yt-dlp in the offline benchmarks.
+
+Usage (in place of the yt-dlp executable):
+    python benchmarks/fake_yt_dlp.py [yt-dlp options] URL... [--batch-file FILE]
+
+Takes the command line FastweX builds for yt-dlp, downloads every URL
+over plain HTTP (MP4 files and HLS playlists of benchmarks/media_server.py)
+into the -o template and prints what yt-dlp would with --newline: the
+Destination line, one progress line per update (the --progress-template
+when one is given, yt-dlp's text format otherwise), --print templates and
+ERROR: lines. Options it does not know are ignored. Behaviour is set from
+the environment so it survives being started by the scheduler:
+
+    FASTWEX_FAKE_PROGRESS_HZ   progress lines per second (default 10, 0: every chunk)
+    FASTWEX_FAKE_LOG_LINES     extra log lines printed with every progress line (default 0)
+    FASTWEX_FAKE_STARTUP_MS    delay before the first URL, yt-dlp's own startup (default 0)
+"""
+import json
+import os
+import re
+import sys
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import unquote, urljoin, urlsplit
+
+# yt-dlp options of FastweX's commands that take a value
+VALUE_OPTIONS = {
+    "-o", "--output", "-f", "--format", "-P", "--paths", "--ffmpeg-location", "--progress-template",
+    "--retries", "--fragment-retries", "--retry-sleep", "--socket-timeout", "--sub-langs", "--print",
+    "--batch-file", "-a", "--load-info-json", "--limit-rate", "-r", "--concurrent-fragments", "-N",
+    "--downloader", "--downloader-args", "--download-archive", "--merge-output-format", "--audio-format",
+    "--audio-quality", "--convert-thumbnails", "--convert-subs", "--cookies", "--cache-dir",
+    "--postprocessor-args", "--ppa", "--extractor-args", "--parse-metadata", "--remux-video",
+}
+TEMPLATE_FIELD = re.compile(r"%\((?P<key>[\w.]+)(?:\|(?P<default>[^)]*))?\)(?P<conversion>[sdj])")
+CHUNK = 64 * 1024
+
+
+def parse_arguments(argv):
+    options = {"output": "%(title)s [%(id)s].%(ext)s", "progress": None, "before": [], "after": [], "urls": []}
+    arguments = iter(argv)
+    for argument in arguments:
+        if argument in VALUE_OPTIONS:
+            value = next(arguments, "")
+            if argument in ("-o", "--output") and not re.match(r"^[a-z]+:", value):
+                options["output"] = value
+            elif argument == "--progress-template" and value.startswith("download:"):
+                options["progress"] = value[len("download:"):]
+            elif argument == "--print":
+                when, _, template = value.partition(":") if re.match(r"^[a-z_]+:", value) else ("video", "", value)
+                options["before" if when in ("video", "before_dl") else "after"].append(template)
+            elif argument in ("--batch-file", "-a"):
+                with open(value, encoding="utf-8") as f:
+                    options["urls"] += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        elif not argument.startswith("-"):
+            options["urls"].append(argument)
+    return options
+
+
+def render(template, fields):
+    def replace(match):
+        value = fields.get(match.group("key"))
+        if value is None:
+            return match.group("default") if match.group("default") is not None else "NA"
+        return json.dumps(value) if match.group("conversion") == "j" else str(value)
+    return TEMPLATE_FIELD.sub(replace, template)
+
+
+def format_size(size):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.2f}{unit}"
+        size /= 1024
+
+
+class Progress:
+    """Prints the progress lines of one download at most hz times a second"""
+
+    def __init__(self, template, hz, log_lines):
+        self.template = template
+        self.interval = 1 / hz if hz > 0 else 0
+        self.log_lines = log_lines
+        self.started = time.perf_counter()
+        self.last = 0.0
+
+    def update(self, downloaded, total, fragment=None, final=False):
+        now = time.perf_counter()
+        if not final and now - self.last < self.interval:
+            return
+        self.last = now
+        elapsed = max(now - self.started, 1e-6)
+        speed = downloaded / elapsed
+        eta = int((total - downloaded) / speed) if total and speed else 0
+        status = "finished" if final else "downloading"
+        if self.template:
+            fields = {"progress.status": status, "progress.downloaded_bytes": downloaded,
+                      "progress.total_bytes": total, "progress.speed": speed, "progress.eta": eta}
+            if fragment:
+                fields["progress.fragment_index"], fields["progress.fragment_count"] = fragment
+            line = render(self.template, fields)
+        else:
+            percent = downloaded * 100 / total if total else 0
+            line = (f"[download] {percent:5.1f}% of {format_size(total):>10} at {format_size(speed):>10}/s "
+                    f"ETA {eta // 60:02d}:{eta % 60:02d}")
+        print(line)
+        for index in range(self.log_lines):
+            print(f"[debug] fake log line {index} at {downloaded} bytes")
+
+
+def fetch(url):
+    with urllib.request.urlopen(url, timeout=20) as response:
+        return response.read()
+
+
+def download(url, options, progress):
+    """Download url into the output template, returns the path written"""
+    path = unquote(urlsplit(url).path)
+    name = os.path.basename(path)
+    video_id, ext = os.path.splitext(name)
+    fields = {"title": video_id, "id": video_id, "ext": "mp4" if ext == ".m3u8" else ext.lstrip(".") or "mp4",
+              "format_id": "hls" if ext == ".m3u8" else "http", "original_url": url, "webpage_url": url}
+    # The page is "extracted" before anything is printed, a failing URL leaves no files
+    if ext == ".m3u8":
+        playlist = fetch(url).decode()
+        segments = [urljoin(url, line) for line in playlist.splitlines() if line and not line.startswith("#")]
+        response = None
+    else:
+        response = urllib.request.urlopen(url, timeout=20)
+    for template in options["before"]:
+        print(render(template, fields))
+    output_path = render(options["output"], fields)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    print(f"[download] Destination: {output_path}")
+
+    with open(output_path + ".part", "wb") as f:
+        downloaded = 0
+        if response is None:
+            for index, segment in enumerate(segments, 1):
+                data = fetch(segment)
+                f.write(data)
+                downloaded += len(data)
+                # Total estimated from the segments so far, like yt-dlp's HLS downloader
+                progress.update(downloaded, downloaded * len(segments) // index, (index, len(segments)))
+            progress.update(downloaded, downloaded, (len(segments), len(segments)), final=True)
+        else:
+            with response:
+                total = int(response.headers.get("Content-Length") or 0)
+                while True:
+                    chunk = response.read(CHUNK)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    progress.update(downloaded, total)
+            progress.update(downloaded, total or downloaded, final=True)
+    os.replace(output_path + ".part", output_path)
+    for template in options["after"]:
+        print(render(template, fields))
+    return output_path
+
+
+def main(argv=None):
+    # yt-dlp flushes every line, a pipe would otherwise hold the progress back
+    sys.stdout.reconfigure(line_buffering=True)
+    options = parse_arguments(sys.argv[1:] if argv is None else argv)
+    hz = float(os.environ.get("FASTWEX_FAKE_PROGRESS_HZ", "10"))
+    log_lines = int(os.environ.get("FASTWEX_FAKE_LOG_LINES", "0"))
+    time.sleep(float(os.environ.get("FASTWEX_FAKE_STARTUP_MS", "0")) / 1000)
+    if not options["urls"]:
+        print("ERROR: You must provide at least one URL.", file=sys.stderr)
+        return 2
+
+    failed = 0
+    for url in options["urls"]:
+        try:
+            download(url, options, Progress(options["progress"], hz, log_lines))
+        except urllib.error.HTTPError as e:
+            failed += 1
+            print(f"ERROR: [generic] {url}: Unable to download webpage: HTTP Error {e.code}: {e.reason}", file=sys.stderr)
+        except (OSError, ValueError) as e:
+            failed += 1
+            print(f"ERROR: [generic] {url}: {e}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
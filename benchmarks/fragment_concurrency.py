@@ -0,0 +1,135 @@
+"""Single vs multi-connection fragment downloads against a local HLS stand-in.
+
+Usage:
+    python benchmarks/fragment_concurrency.py [--yt-dlp PATH] [--segments N] [--segment-kib K]
+                                              [--rate-kib R] [--connections 1,4,8,16] [--aria2c PATH]
+
+The server serves an HLS playlist of N segments and caps every connection
+at R KiB/s, like the per-connection throttling some hosts apply. Each run
+downloads the whole stream with --concurrent-fragments set to one of the
+--connections values (and once through aria2c when --aria2c is given), and
+reports throughput. Nothing leaves 127.0.0.1.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_YT_DLP = os.path.join(BASE_DIR, "datas", "yt-dlp", "yt-dlp.exe")
+
+
+def make_handler(segments, segment_size, rate):
+    payload = os.urandom(segment_size)
+    playlist = "#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:2\n#EXT-X-MEDIA-SEQUENCE:0\n"
+    playlist += "".join(f"#EXTINF:2.0,\nseg{index}.ts\n" for index in range(segments))
+    playlist += "#EXT-X-ENDLIST\n"
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.endswith(".m3u8"):
+                self.send_body(playlist.encode(), "application/vnd.apple.mpegurl")
+            elif self.path.startswith("/seg") and self.path.endswith(".ts"):
+                self.send_body(payload, "video/mp2t", throttled=True)
+            else:
+                self.send_error(404)
+
+        def send_body(self, body, content_type, throttled=False):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not throttled:
+                self.wfile.write(body)
+                return
+            # Per-connection cap: 16 KiB chunks paced to `rate` bytes/s
+            chunk = 16 * 1024
+            started = time.perf_counter()
+            for offset in range(0, len(body), chunk):
+                self.wfile.write(body[offset:offset + chunk])
+                delay = started + (offset + chunk) / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    return Handler
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # yt-dlp drops keep-alive connections when it is done, that is not an error here
+        pass
+
+
+def download(command, url, output_dir, extra):
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    started = time.perf_counter()
+    result = subprocess.run(
+        command + ["--no-warnings", "--fixup", "never", "--no-part",
+                   "-o", os.path.join(output_dir, "stream.%(ext)s")] + extra + [url],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "yt-dlp hata verdi")
+    size = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir))
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--yt-dlp", default=DEFAULT_YT_DLP, help="yt-dlp command (default: bundled exe)")
+    parser.add_argument("--segments", type=int, default=32)
+    parser.add_argument("--segment-kib", type=int, default=256)
+    parser.add_argument("--rate-kib", type=int, default=1024, help="per-connection limit, KiB/s")
+    parser.add_argument("--connections", default="1,4,8,16")
+    parser.add_argument("--aria2c", help="also run through this aria2c binary")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    handler = make_handler(args.segments, args.segment_kib * 1024, args.rate_kib * 1024)
+    server = QuietServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/stream.m3u8"
+
+    command = [args.yt_dlp] if os.path.exists(args.yt_dlp) else args.yt_dlp.split()
+    runs = [(f"-N {n}", ["--concurrent-fragments", n]) for n in args.connections.split(",")]
+    if args.aria2c:
+        n = args.connections.split(",")[-1]
+        runs.append((f"aria2c -N {n}", ["--concurrent-fragments", n, "--downloader", args.aria2c]))
+
+    output_dir = tempfile.mkdtemp(prefix="fastwex-bench-")
+    try:
+        print(f"{args.segments} x {args.segment_kib} KiB, bağlantı başına {args.rate_kib} KiB/s, "
+              f"{args.repeat} tekrar")
+        print(f"{'mod':<16}{'süre (s)':>10}{'MiB/s':>10}{'hızlanma':>10}")
+        baseline = None
+        for name, extra in runs:
+            try:
+                results = [download(command, url, output_dir, extra) for _ in range(args.repeat)]
+            except RuntimeError as e:
+                print(f"{name:<16}hata: {e}")
+                continue
+            elapsed = statistics.median(elapsed for elapsed, _ in results)
+            throughput = results[0][1] / elapsed / 1024 ** 2
+            baseline = baseline or elapsed
+            print(f"{name:<16}{elapsed:>10.2f}{throughput:>10.2f}{baseline / elapsed:>9.1f}x")
+    finally:
+        server.shutdown()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
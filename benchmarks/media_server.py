@@ -0,0 +1,150 @@
+"""Local HTTP server with synthetic MP4 and HLS media for the benchmarks.
+
+Usage:
+    python benchmarks/media_server.py [--port P] [--latency-ms L] [--rate-kib R]
+
+Routes (sizes in bytes, query parameters optional):
+    /video/<name>.mp4?size=N             one progressive MP4 file
+    /hls/<name>.m3u8?segments=N&segment_size=K
+                                         HLS playlist, segments under /hls/<name>/seg<i>.ts
+    /status/<code>/<name>                an HTTP error, e.g. /status/404/x.mp4
+
+Every response waits L ms before its headers and every connection is
+capped at R KiB/s, like a distant or throttling host. The bodies are
+generated from the name and size, so nothing is read from disk and the
+same URL always returns the same bytes. Nothing leaves 127.0.0.1.
+"""
+import argparse
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_SIZE = 1024 ** 2
+DEFAULT_SEGMENTS = 8
+DEFAULT_SEGMENT_SIZE = 256 * 1024
+CHUNK = 16 * 1024
+
+
+def synthetic_mp4(name, size):
+    """size bytes starting with an ftyp box, the rest derived from name"""
+    header = b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2"
+    block = hashlib.sha256(name.encode()).digest() * (CHUNK // 32)
+    body = header + block * (size // len(block) + 1)
+    return body[:size]
+
+
+def hls_playlist(name, segments):
+    playlist = "#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:2\n#EXT-X-MEDIA-SEQUENCE:0\n"
+    playlist += "".join(f"#EXTINF:2.0,\n{name}/seg{index}.ts\n" for index in range(segments))
+    return playlist + "#EXT-X-ENDLIST\n"
+
+
+def make_handler(latency, rate):
+    # Bodies of recently asked sizes, a benchmark asks for the same few over and over
+    bodies = {}
+    lock = threading.Lock()
+
+    def body_of(name, size):
+        with lock:
+            if (name, size) not in bodies:
+                if len(bodies) > 64:
+                    bodies.clear()
+                bodies[(name, size)] = synthetic_mp4(name, size)
+            return bodies[(name, size)]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_HEAD(self):
+            self.do_GET(head=True)
+
+        def do_GET(self, head=False):
+            if latency:
+                time.sleep(latency)
+            url = urlsplit(self.path)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            parts = url.path.strip("/").split("/")
+            try:
+                if parts[0] == "video" and len(parts) == 2:
+                    size = int(query.get("size", DEFAULT_SIZE))
+                    self.send_body(body_of(parts[1], size), "video/mp4", head)
+                elif parts[0] == "hls" and len(parts) == 2 and parts[1].endswith(".m3u8"):
+                    segments = int(query.get("segments", DEFAULT_SEGMENTS))
+                    # Segment URLs are relative, they lose the query: the size travels in the path
+                    name = f"{parts[1][:-len('.m3u8')]}-{int(query.get('segment_size', DEFAULT_SEGMENT_SIZE))}"
+                    self.send_body(hls_playlist(name, segments).encode(), "application/vnd.apple.mpegurl", head)
+                elif parts[0] == "hls" and len(parts) == 3 and parts[2].startswith("seg"):
+                    size = int(parts[1].rsplit("-", 1)[-1])
+                    self.send_body(body_of(parts[1] + parts[2], size), "video/mp2t", head)
+                elif parts[0] == "status" and len(parts) >= 2:
+                    self.send_error(int(parts[1]))
+                else:
+                    self.send_error(404)
+            except ValueError:
+                self.send_error(400)
+
+        def send_body(self, body, content_type, head=False):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if head:
+                return
+            if not rate:
+                self.wfile.write(body)
+                return
+            # Per-connection cap: CHUNK sized writes paced to `rate` bytes/s
+            started = time.perf_counter()
+            for offset in range(0, len(body), CHUNK):
+                self.wfile.write(body[offset:offset + CHUNK])
+                delay = started + (offset + CHUNK) / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    return Handler
+
+
+class MediaServer(ThreadingHTTPServer):
+    """The server on a background thread, latency in seconds and rate in bytes/s (0: none)"""
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, rate=0):
+        super().__init__(("127.0.0.1", port), make_handler(latency, rate))
+        self.port = self.server_address[1]
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def handle_error(self, request, client_address):
+        # Downloaders drop keep-alive connections when they are done, that is not an error here
+        pass
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.port}/{path.lstrip('/')}"
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before every response")
+    parser.add_argument("--rate-kib", type=int, default=0, help="per-connection limit, KiB/s (0: none)")
+    args = parser.parse_args()
+
+    server = MediaServer(args.port, args.latency_ms / 1000, args.rate_kib * 1024)
+    print(f"{server.url('video/ornek.mp4?size=1048576')} (Ctrl+C ile çıkış)", flush=True)
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Startup time of the FastweX window.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs N] [--python PATH] [--offscreen]
+
+Every run starts FastweXDownloader.py with FASTWEX_STARTUP_BENCHMARK=1, so
+the app prints its startup phases (ms since the first import line) as JSON
+and quits once the first paint and the deferred config load are done. The
+"first_paint" row is time-to-first-paint; "spawn" is the wall time from
+starting the interpreter until the phases line arrived.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(BASE_DIR, "FastweXDownloader.py")
+PHASES = ("imports", "app", "paths", "theme", "ui", "first_paint", "ready")
+
+
+def run_once(python, env, timeout):
+    started = time.perf_counter()
+    process = subprocess.Popen([python, APP], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               env=env, text=True, cwd=BASE_DIR)
+    # An app that never prints its phases would block the read loop forever
+    watchdog = threading.Timer(timeout, process.kill)
+    watchdog.start()
+    try:
+        for line in process.stdout:
+            line = line.strip()
+            if line.startswith("{"):
+                phases = json.loads(line)
+                phases["spawn"] = round((time.perf_counter() - started) * 1000, 1)
+                process.wait(timeout)
+                return phases
+    finally:
+        watchdog.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    raise RuntimeError(f"uygulama başlangıç süresini yazdırmadı (çıkış kodu {process.returncode})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--python", default=sys.executable, help="interpreter with PyQt6 installed")
+    parser.add_argument("--offscreen", action="store_true", help="QT_QPA_PLATFORM=offscreen (CI / headless)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    env = dict(os.environ, FASTWEX_STARTUP_BENCHMARK="1")
+    if args.offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+
+    # The first start warms the OS file cache, it is not counted
+    run_once(args.python, env, args.timeout)
+    runs = [run_once(args.python, env, args.timeout) for _ in range(args.runs)]
+
+    print(f"{args.runs} çalıştırma")
+    print(f"{'aşama':<14}{'medyan (ms)':>14}{'min (ms)':>12}{'max (ms)':>12}")
+    for phase in PHASES + ("spawn",):
+        timings = [run[phase] for run in runs if phase in run]
+        if timings:
+            print(f"{phase:<14}{statistics.median(timings):>14.1f}{min(timings):>12.1f}{max(timings):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""FastweX command line / daemon mode.
+
+Runs the same download core as the window without importing PyQt6:
+
+    python fastwex.py https://youtu.be/... liste.txt -f mp3 -j 4
+    python fastwex.py --watch kuyruk/          # daemon: process every new .txt in kuyruk/
+    python fastwex.py --watch kuyruk/ --metrics-port 9464   # + Prometheus metrics on localhost
+    python fastwex.py --playlist https://www.youtube.com/@kanal/videos
+
+Positional arguments are URLs or TXT files with one URL per line ("-" reads
+stdin). Defaults come from the GUI's config.json when it exists. Every
+finished job is logged to metrics.jsonl. The yt-dlp cache (yt-dlp-cache/)
+and the cookie jar (cookies.txt) are shared with the window.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import fastwex_engine
+from fastwex_archive import DownloadArchive
+from fastwex_core import (AppPaths, DownloadOptions, DownloadJob, JobScheduler, SchedulerListener,
+                          build_bandwidth_governor, build_cookie_jar, build_host_tuner, build_info_cache,
+                          build_playlist_command, build_postprocessor, build_video_command, build_ytdlp_cache,
+                          filter_archived)
+from fastwex_engine import format_bytes, format_eta
+from fastwex_jobstore import JobStore
+from fastwex_metrics import MetricsRecorder, MetricsServer
+from fastwex_playlist import ExpandListener, PlaylistExpander
+
+
+class PlaylistFeeder(ExpandListener):
+    """Adds the entries a PlaylistExpander lists to the running scheduler"""
+
+    def __init__(self, scheduler, console):
+        self.scheduler = scheduler
+        self.console = console
+
+    def on_entries(self, urls):
+        self.console.total += len(urls)
+        self.scheduler.extend(urls)
+
+
+class ConsoleListener(SchedulerListener):
+    """Prints scheduler events, one line each"""
+
+    def __init__(self, total, verbose=False):
+        self.total = total
+        self.verbose = verbose
+        self.lock = threading.Lock()
+
+    def tag(self, job):
+        return f"[{job.index + 1}/{self.total}]"
+
+    def write(self, line):
+        with self.lock:
+            print(line, flush=True)
+
+    def on_job_started(self, job):
+        self.write(f"🔍 İndiriliyor: {job.url} {self.tag(job)}")
+
+    def on_job_progress(self, job):
+        if self.verbose:
+            self.write(f"{self.tag(job)} %{job.progress} {format_bytes(job.speed)}/s ETA {format_eta(job.eta)}")
+
+    def on_job_log(self, job, message):
+        if self.verbose or message.startswith("ERROR:"):
+            self.write(f"{self.tag(job)} {message}")
+
+    def on_job_finished(self, job):
+        if job.state == DownloadJob.DONE:
+            self.write(f"✅ İndirme tamamlandı {self.tag(job)}")
+        else:
+            self.write(f"❌ Hata {self.tag(job)}: {job.error or 'İndirme başarısız oldu!'}")
+
+    def on_batch_finished(self, done, failed):
+        self.write(f"🎉 Bitti: {done} başarılı, {failed} hatalı")
+
+    def on_job_retry(self, job, delay):
+        self.write(f"🔁 {job.error} {self.tag(job)}, {delay:.0f} sn sonra tekrar denenecek")
+
+    def on_engine_fallback(self, reason):
+        self.write(f"⚠️ Dahili motor başlatılamadı, yt-dlp kullanılacak: {reason}")
+
+    def on_job_paused(self, job):
+        if job.state == DownloadJob.PAUSED:
+            self.write(f"⏸️ Duraklatıldı {self.tag(job)}")
+        else:
+            self.write(f"⏸️ Öncelikli bir işe yer açmak için durduruldu {self.tag(job)}")
+
+
+def read_urls(sources):
+    urls = []
+    for source in sources:
+        if source == "-":
+            lines = sys.stdin
+        elif "://" not in source and os.path.isfile(source):
+            with open(source, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        else:
+            lines = [source]
+        urls.extend(line.strip() for line in lines if line.strip() and not line.strip().startswith("#"))
+    return urls
+
+
+def load_config(paths):
+    if os.path.exists(paths.config_path):
+        try:
+            with open(paths.config_path, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Config yüklenirken hata: {str(e)}", file=sys.stderr)
+    return {}
+
+
+def build_parser(config):
+    parser = argparse.ArgumentParser(
+        prog="fastwex", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="*", help="URL, TXT dosyası veya - (stdin)")
+    parser.add_argument("-o", "--output", help="kayıt klasörü")
+    parser.add_argument("-f", "--format", choices=DownloadOptions.FORMATS)
+    parser.add_argument("-q", "--quality", help="en fazla video yüksekliği, örn. 720 (boş: en iyi)")
+    parser.add_argument("--alternative", action=argparse.BooleanOptionalAction, help="sadece -f best")
+    parser.add_argument("--embed-thumbnail", action=argparse.BooleanOptionalAction)
+    parser.add_argument("--write-thumbnail", action=argparse.BooleanOptionalAction)
+    parser.add_argument("--subs", action=argparse.BooleanOptionalAction, help="altyazıları indir")
+    parser.add_argument("--metadata", action=argparse.BooleanOptionalAction)
+    parser.add_argument("--unique-names", action=argparse.BooleanOptionalAction)
+    parser.add_argument("--archive", action=argparse.BooleanOptionalAction, help="indirilmişleri atla")
+    parser.add_argument("--turbo", action=argparse.BooleanOptionalAction,
+                        help="parçaları çoklu bağlantıyla indir, bağlantı sayısı siteye göre ayarlanır")
+    parser.add_argument("--aria2c", action=argparse.BooleanOptionalAction, help="turbo modda aria2c kullan")
+    parser.add_argument("--info-cache", action=argparse.BooleanOptionalAction,
+                        help="çözümlenen video bilgisini önbellekten kullan (--load-info-json)")
+    parser.add_argument("--limit-rate", metavar="RATE",
+                        help="tüm indirmelerin toplam hız sınırı, örn. 8M veya bağlantının %%80'i için 80%%; "
+                             "yt-dlp işlemleri paylarını başlarken alır, sadece dahili motorda yeniden paylaştırılır")
+    parser.add_argument("--rate-schedule", metavar="PLAN",
+                        help="saate göre hız sınırı, örn. \"09-18=2M, 01-07=0\" (0: sınırsız)")
+    parser.add_argument("--host-limits", action=argparse.BooleanOptionalAction,
+                        help="site başına eşzamanlı indirme sınırı (YouTube 3, Instagram 2, TikTok 2)")
+    parser.add_argument("--separate-postprocess", action=argparse.BooleanOptionalAction,
+                        help="birleştirme/dönüştürmeyi indirmeden ayrı, çekirdek sayısı kadar ffmpeg ile yap")
+    parser.add_argument("--compatible-codecs", action=argparse.BooleanOptionalAction,
+                        help="MP4'e AV1/VP9/Opus/FLAC kopyalama, her oynatıcı için H.264/AAC'ye dönüştür")
+    parser.add_argument("--playlist", action=argparse.BooleanOptionalAction,
+                        help="oynatma listesi ve kanal URL'lerini açıp videolarını listelendikçe indir")
+    parser.add_argument("--share-cookies", action=argparse.BooleanOptionalAction,
+                        help="tüm indirmeler tek çerez dosyasını paylaşıp günceller (cookies.txt)")
+    parser.add_argument("--prewarm-cache", action=argparse.BooleanOptionalAction,
+                        default=config.get('prewarm_cache', True),
+                        help="başlangıçta yt-dlp önbelleğini arka planda doldur (YouTube oynatıcısı)")
+    parser.add_argument("-j", "--workers", type=int, default=config.get('max_workers', 3),
+                        help="eşzamanlı indirme sayısı")
+    parser.add_argument("--engine", choices=(JobScheduler.SUBPROCESS, JobScheduler.INPROCESS, JobScheduler.BATCH))
+    parser.add_argument("--resume", action="store_true",
+                        help="yarım kalan indirme listelerine kaldığı yerden devam et")
+    parser.add_argument("--watch", metavar="DIR", help="daemon modu: DIR içindeki yeni .txt dosyalarını indir")
+    parser.add_argument("--interval", type=float, default=5.0, help="--watch yoklama aralığı (sn)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="Prometheus metriklerini http://127.0.0.1:PORT/metrics adresinde sun")
+    parser.add_argument("--no-config", action="store_true", help="config.json'u yok say")
+    parser.add_argument("-v", "--verbose", action="store_true", help="yt-dlp çıktısını ve ilerlemeyi göster")
+    return parser
+
+
+def resolve_options(args, config, paths):
+    options = DownloadOptions.from_config(config, paths.downloads_path)
+    overrides = {
+        "save_path": args.output, "format": args.format, "quality": args.quality,
+        "alternative": args.alternative, "embed_thumbnail": args.embed_thumbnail,
+        "write_thumbnail": args.write_thumbnail, "subtitles": args.subs, "metadata": args.metadata,
+        "unique_names": args.unique_names, "use_archive": args.archive,
+        "turbo": args.turbo, "use_aria2c": args.aria2c, "use_info_cache": args.info_cache,
+        "rate_limit": args.limit_rate, "rate_schedule": args.rate_schedule, "host_limits": args.host_limits,
+        "separate_postprocess": args.separate_postprocess, "expand_playlists": args.playlist,
+        "share_cookies": args.share_cookies, "compatible_codecs": args.compatible_codecs,
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(options, name, value)
+    return options
+
+
+def resolve_engine(args, config):
+    if args.engine:
+        return args.engine
+    if config.get('batch_mode'):
+        return JobScheduler.BATCH
+    if config.get('inprocess_engine') and fastwex_engine.is_available():
+        return JobScheduler.INPROCESS
+    return JobScheduler.SUBPROCESS
+
+
+def run_batch(urls, options, paths, workers, engine, verbose, metrics=None):
+    """Download urls, returns the number of failed jobs"""
+    archive = None
+    if options.use_archive:
+        archive = DownloadArchive(paths.archive_db_path, paths.ytdlp_archive_path)
+    if archive is not None and not options.expand_playlists:
+        urls, skipped, duplicates = filter_archived(archive, urls)
+        if skipped:
+            print(f"⏭️ {skipped} URL daha önce indirilmiş, atlandı")
+        if duplicates:
+            print(f"⏭️ {duplicates} tekrarlanan URL çıkarıldı")
+
+    store = None
+    try:
+        if not urls:
+            print("✅ İndirilecek yeni URL yok")
+            return 0
+
+        # The batch is on disk before the first download, --resume continues it after a crash
+        store = JobStore(paths.job_store_path)
+        if options.expand_playlists:
+            # Entries are stored as they are listed
+            queue = store.queue(store.create_batch([], options.to_dict(), engine, workers))
+            return run_queue(queue, options, paths, workers, engine, verbose, archive, metrics, playlists=urls)
+        queue = store.queue(store.create_batch(urls, options.to_dict(), engine, workers))
+        return run_queue(queue, options, paths, workers, engine, verbose, archive, metrics)
+    finally:
+        if archive is not None:
+            archive.close()
+        if store is not None:
+            store.close()
+
+
+def run_queue(queue, options, paths, workers, engine, verbose, archive=None, metrics=None, playlists=None):
+    """Run the pending jobs of queue, returns the number of failed jobs
+
+    With playlists the entries of those playlist / channel URLs are listed
+    into the queue while the first ones download.
+    """
+    os.makedirs(options.save_path, exist_ok=True)
+    info_cache = build_info_cache(options, paths)
+    ytdlp_cache = build_ytdlp_cache(paths)
+    try:
+        scheduler = JobScheduler(build_video_command(options, paths), queue, workers, engine, archive=archive,
+                                 tuner=build_host_tuner(options, paths), info_cache=info_cache,
+                                 governor=build_bandwidth_governor(options),
+                                 postprocessor=build_postprocessor(options, paths), metrics=metrics,
+                                 expanding=bool(playlists), ytdlp_cache=ytdlp_cache,
+                                 cookie_jar=build_cookie_jar(options, paths))
+        if playlists:
+            print(f"📃 {len(playlists)} liste açılıyor, videolar {scheduler.max_workers} eşzamanlı işlemle indirilecek",
+                  flush=True)
+        else:
+            print(f"🚀 {scheduler.count(DownloadJob.PENDING)} URL, {scheduler.max_workers} eşzamanlı işlemle "
+                  f"indirilecek", flush=True)
+        scheduler.listener = ConsoleListener(scheduler.total, verbose)
+        if metrics is not None:
+            metrics.start_batch()
+        try:
+            scheduler.start()
+            if playlists:
+                expand_playlists(scheduler, playlists, paths, archive)
+            scheduler.wait()
+        except KeyboardInterrupt:
+            # yt-dlp runs in its own process group and does not see the Ctrl+C
+            scheduler.stop()
+            print("⏸️ İndirmeler durduruldu, --resume ile kaldıkları yerden devam eder", flush=True)
+            raise
+        summary = metrics.format_summary() if metrics is not None else ""
+        for line in (summary, ytdlp_cache.format_summary()):
+            if line:
+                print(line, flush=True)
+        return scheduler.count(DownloadJob.FAILED)
+    finally:
+        if info_cache is not None:
+            info_cache.close()
+
+
+def expand_playlists(scheduler, urls, paths, archive=None):
+    """List every playlist of urls into the running scheduler, then let its batch finish"""
+    expander = PlaylistExpander(archive, PlaylistFeeder(scheduler, scheduler.listener))
+    try:
+        for url in urls:
+            success, error_message = expander.run(build_playlist_command(paths, url))
+            if not success:
+                scheduler.listener.write(f"❌ Liste açılamadı: {url}: {error_message}")
+        scheduler.listener.write(f"📃 {expander.listed} video listelendi: {expander.added} kuyruğa eklendi, "
+                                 f"{expander.archived} daha önce indirilmiş, {expander.duplicates} tekrar")
+    finally:
+        expander.cancel()
+        scheduler.end_expansion()
+
+
+def resume(paths, verbose, metrics=None):
+    """Continue every unfinished stored batch with the options it was started with"""
+    store = JobStore(paths.job_store_path)
+    failed = 0
+    try:
+        for batch in reversed(store.unfinished_batches()):
+            options = DownloadOptions.from_dict(batch["options"])
+            print(f"♻️ Yarım kalan liste #{batch['id']}: {batch['remaining']}/{batch['total']} URL", flush=True)
+            archive = DownloadArchive(paths.archive_db_path, paths.ytdlp_archive_path) if options.use_archive else None
+            try:
+                failed += run_queue(store.queue(batch["id"]), options, paths, batch["max_workers"],
+                                    batch["engine"], verbose, archive, metrics)
+            finally:
+                if archive is not None:
+                    archive.close()
+    finally:
+        store.close()
+    return failed
+
+
+def watch(directory, options, paths, workers, engine, verbose, interval, metrics=None):
+    """Daemon loop: every new .txt in directory is downloaded, then renamed to .done / .failed"""
+    print(f"👀 {directory} izleniyor (Ctrl+C ile çıkış)", flush=True)
+    while True:
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not name.endswith(".txt") or not os.path.isfile(path):
+                continue
+            print(f"📄 {name}", flush=True)
+            failed = run_batch(read_urls([path]), options, paths, workers, engine, verbose, metrics)
+            os.replace(path, path + (".failed" if failed else ".done"))
+        time.sleep(interval)
+
+
+def prewarm_cache(paths):
+    """Fill the yt-dlp cache in the background, returns the running process or None"""
+    def on_done(success, error):
+        if success:
+            print("🔥 yt-dlp önbelleği hazır", flush=True)
+        else:
+            print(f"⚠️ yt-dlp önbelleği ısıtılamadı: {error}", file=sys.stderr, flush=True)
+
+    process = build_ytdlp_cache(paths).prewarm(paths.yt_dlp_path, on_done)
+    if process is not None:
+        print("🔥 yt-dlp önbelleği arka planda ısıtılıyor", flush=True)
+    return process
+
+
+def main(argv=None):
+    paths = AppPaths()
+    config = {} if "--no-config" in (argv if argv is not None else sys.argv[1:]) else load_config(paths)
+    args = build_parser(config).parse_args(argv)
+
+    options = resolve_options(args, config, paths)
+    try:
+        build_bandwidth_governor(options)
+    except ValueError as e:
+        print(f"Hız sınırı: {e}", file=sys.stderr)
+        return 2
+    engine = resolve_engine(args, config)
+    if paths.missing_tools(("yt-dlp",)) and engine != JobScheduler.INPROCESS:
+        print("Eksik bağımlılık: yt-dlp", file=sys.stderr)
+        return 2
+
+    metrics = MetricsRecorder(paths.metrics_path)
+    server = None
+    prewarm = None
+    try:
+        if args.prewarm_cache and not paths.missing_tools(("yt-dlp",)):
+            prewarm = prewarm_cache(paths)
+        if args.metrics_port is not None:
+            try:
+                server = MetricsServer(metrics, args.metrics_port)
+            except OSError as e:
+                print(f"Metrik sunucusu başlatılamadı: {e}", file=sys.stderr)
+                return 2
+            print(f"📊 Metrikler: http://127.0.0.1:{server.port}/metrics", flush=True)
+
+        failed = resume(paths, args.verbose, metrics) if args.resume else 0
+        if args.watch:
+            watch(args.watch, options, paths, args.workers, engine, args.verbose, args.interval, metrics)
+            return 0
+
+        urls = read_urls(args.sources)
+        if not urls:
+            if args.resume:
+                return 1 if failed else 0
+            print("Lütfen en az bir URL girin!", file=sys.stderr)
+            return 2
+        failed += run_batch(urls, options, paths, args.workers, engine, args.verbose, metrics)
+        return 1 if failed else 0
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if prewarm is not None:
+            # A prewarm still running would outlive the command
+            prewarm.kill()
+            prewarm.wait(2)
+        if server is not None:
+            server.close()
+        metrics.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Persistent download archive.
+
+Downloaded videos are indexed in SQLite by "<extractor> <video id>", the
+same key format yt-dlp writes to its --download-archive file. URLs are
+canonicalised first, so youtu.be, youtube.com/watch and /shorts links of
+the same video map to one key and can be filtered out before any
+yt-dlp process is started.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
+
+YOUTUBE_ID = r"(?P<id>[A-Za-z0-9_-]{11})"
+URL_PATTERNS = [
+    ("youtube", re.compile(r"^(?:www\.|m\.|music\.)?youtube(?:-nocookie)?\.com/(?:shorts|embed|live|v)/" + YOUTUBE_ID)),
+    ("youtube", re.compile(r"^youtu\.be/" + YOUTUBE_ID)),
+    ("tiktok", re.compile(r"^(?:www\.|m\.)?tiktok\.com/@[^/]+/video/(?P<id>\d+)")),
+    ("instagram", re.compile(r"^(?:www\.)?instagram\.com/(?:[^/]+/)?(?:p|reels?|tv)/(?P<id>[A-Za-z0-9_-]+)")),
+    ("vimeo", re.compile(r"^(?:www\.)?vimeo\.com/(?P<id>\d+)")),
+    ("twitter", re.compile(r"^(?:www\.|mobile\.)?(?:twitter|x)\.com/[^/]+/status/(?P<id>\d+)")),
+]
+YOUTUBE_WATCH_HOSTS = ("youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com")
+
+
+def normalize_url(url):
+    """Trimmed URL with a scheme, lowercase host and no fragment"""
+    url = url.strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    normalized = f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path}"
+    if parts.query:
+        normalized += "?" + parts.query
+    return normalized
+
+
+def canonical_key(url):
+    """Archive key for url: "<extractor> <id>" when known, "url <normalized url>" otherwise"""
+    normalized = normalize_url(url)
+    if not normalized:
+        return ""
+    parts = urlsplit(normalized)
+    location = parts.netloc + parts.path
+
+    if parts.netloc in YOUTUBE_WATCH_HOSTS and parts.path == "/watch":
+        video_id = parse_qs(parts.query).get("v", [""])[0]
+        if re.fullmatch(YOUTUBE_ID, video_id):
+            return f"youtube {video_id}"
+
+    for extractor, pattern in URL_PATTERNS:
+        match = pattern.match(location)
+        if match:
+            return f"{extractor} {match.group('id')}"
+    return f"url {normalized}"
+
+
+class DownloadArchive:
+    """SQLite index of finished downloads, kept in sync with yt-dlp's archive file
+
+    The connection is shared by the scheduler's worker threads, every access
+    goes through self.lock.
+    """
+
+    def __init__(self, db_path, ytdlp_archive_path):
+        self.db_path = db_path
+        self.ytdlp_archive_path = ytdlp_archive_path
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS archive (key TEXT PRIMARY KEY, url TEXT, added_at REAL)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def _meta(self, name, default=None):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def sync(self):
+        """Import lines yt-dlp appended to its archive file since the last sync"""
+        if not os.path.exists(self.ytdlp_archive_path):
+            return 0
+        offset = int(self._meta("ytdlp_archive_offset", "0"))
+        if offset > os.path.getsize(self.ytdlp_archive_path):
+            # File was replaced or truncated, read it again from the start
+            offset = 0
+
+        now = time.time()
+        with open(self.ytdlp_archive_path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # Keep a partially written last line for the next sync
+        complete = data[:data.rfind(b"\n") + 1]
+        rows = [(line.strip(), None, now) for line in complete.decode("utf-8", "replace").splitlines() if line.strip()]
+        with self.lock:
+            self.db.executemany("INSERT OR IGNORE INTO archive VALUES (?, ?, ?)", rows)
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('ytdlp_archive_offset', ?)",
+                            (str(offset + len(complete)),))
+            self.db.commit()
+        return len(rows)
+
+    def add(self, url):
+        key = canonical_key(url)
+        if key:
+            with self.lock:
+                self.db.execute("INSERT OR IGNORE INTO archive VALUES (?, ?, ?)", (key, url, time.time()))
+                self.db.commit()
+
+    def archived_keys(self, keys):
+        """The keys of keys that are in the archive, as a set"""
+        archived = set()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self.lock:
+                archived.update(row[0] for row in self.db.execute(
+                    f"SELECT key FROM archive WHERE key IN ({placeholders})", chunk))
+        return archived
+
+    def filter(self, urls):
+        """Split urls into (to download, already archived); duplicates keep their first occurrence"""
+        keyed = []
+        seen = set()
+        for url in urls:
+            key = canonical_key(url)
+            if key and key not in seen:
+                seen.add(key)
+                keyed.append((key, url))
+
+        archived = self.archived_keys([key for key, _ in keyed])
+        pending = [url for key, url in keyed if key not in archived]
+        skipped = [url for key, url in keyed if key in archived]
+        return pending, skipped
@@ -0,0 +1,1893 @@
+"""GUI-free download core of FastweX.
+
+Paths, command building, yt-dlp output parsing and the job scheduler live
+here so they can be used by both the PyQt window and the headless CLI
+(fastwex.py) without importing PyQt6.
+"""
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import fastwex_engine
+from fastwex_infocache import InfoCache
+from fastwex_playlist import ENTRY_TEMPLATE
+from fastwex_process import default_reactor
+from fastwex_ytcache import CookieJar, YtDlpCache, parse_extractor
+from fastwex_postprocess import POSTPROCESS_TEMPLATE, MediaProbe, PostProcessor, parse_moved_files
+from fastwex_engine import ProgressEvent, ProgressThrottle, PROGRESS_TEMPLATE, parse_progress_template
+
+# Hide the console window of child processes on Windows
+NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+def find_tool(bundled_path, name):
+    """Bundled binary under datas/ when usable on this OS, otherwise the one on PATH"""
+    if os.path.exists(bundled_path) and (os.name == "nt" or not bundled_path.endswith(".exe")):
+        return bundled_path
+    return shutil.which(name) or bundled_path
+
+
+class AppPaths:
+    """Locations of the bundled tools and the app's data files"""
+
+    def __init__(self, base_dir=None):
+        self.base_dir = base_dir or getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+        self.data_dir = os.path.join(self.base_dir, "datas")
+        self.downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
+        self.logo_path = os.path.join(self.data_dir, "logo", "fastwex.png")
+        self.yt_dlp_path = find_tool(os.path.join(self.data_dir, "yt-dlp", "yt-dlp.exe"), "yt-dlp")
+        self.gallery_dl_path = find_tool(os.path.join(self.data_dir, "gallery-dl", "gallery-dl.exe"), "gallery-dl")
+        self.ffmpeg_path = find_tool(os.path.join(self.data_dir, "ffmpeg-codec", "bin", "ffmpeg.exe"), "ffmpeg")
+        self.ffmpeg_dir = os.path.dirname(self.ffmpeg_path)
+        self.ffprobe_path = find_tool(os.path.join(self.data_dir, "ffmpeg-codec", "bin", "ffprobe.exe"), "ffprobe")
+        self.aria2c_path = find_tool(os.path.join(self.data_dir, "aria2c", "aria2c.exe"), "aria2c")
+        self.config_path = os.path.join(self.base_dir, "config.json")
+        self.archive_db_path = os.path.join(self.base_dir, "archive.sqlite")
+        self.ytdlp_archive_path = os.path.join(self.base_dir, "download-archive.txt")
+        self.host_tuning_path = os.path.join(self.base_dir, "host-tuning.json")
+        self.info_cache_dir = os.path.join(self.base_dir, "info-cache")
+        self.job_store_path = os.path.join(self.base_dir, "queue.sqlite")
+        self.instagram_index_path = os.path.join(self.base_dir, "instagram.sqlite")
+        self.instagram_session_dir = os.path.join(self.base_dir, "instagram-sessions")
+        self.gallery_dl_archive_path = os.path.join(self.base_dir, "gallery-dl-archive.sqlite3")
+        self.metrics_path = os.path.join(self.base_dir, "metrics.jsonl")
+        self.ytdlp_cache_dir = os.path.join(self.base_dir, "yt-dlp-cache")
+        self.cookie_jar_path = os.path.join(self.base_dir, "cookies.txt")
+
+    def missing_tools(self, names=("yt-dlp", "gallery-dl", "ffmpeg")):
+        paths = {"yt-dlp": self.yt_dlp_path, "gallery-dl": self.gallery_dl_path, "ffmpeg": self.ffmpeg_path,
+                 "aria2c": self.aria2c_path}
+        return [name for name in names if not os.path.exists(paths[name])]
+
+
+class DownloadOptions:
+    """Video download settings, independent of any widget"""
+    FORMATS = ("mp4", "mp3", "m4a")
+    FIELDS = ("save_path", "format", "quality", "alternative", "embed_thumbnail", "write_thumbnail",
+              "subtitles", "metadata", "unique_names", "use_archive", "turbo", "use_aria2c",
+              "use_info_cache", "rate_limit", "rate_schedule", "host_limits", "separate_postprocess",
+              "expand_playlists", "share_cookies", "compatible_codecs")
+
+    def __init__(self, save_path, format="mp4", quality="", alternative=False, embed_thumbnail=False,
+                 write_thumbnail=False, subtitles=False, metadata=False, unique_names=True, use_archive=True,
+                 turbo=False, use_aria2c=False, use_info_cache=True, rate_limit="", rate_schedule="",
+                 host_limits=True, separate_postprocess=True, expand_playlists=False, share_cookies=True,
+                 compatible_codecs=False):
+        self.save_path = save_path
+        self.format = format
+        # Maximum video height as text ("720"), empty for the best available
+        self.quality = quality
+        self.alternative = alternative
+        self.embed_thumbnail = embed_thumbnail
+        self.write_thumbnail = write_thumbnail
+        self.subtitles = subtitles
+        self.metadata = metadata
+        self.unique_names = unique_names
+        self.use_archive = use_archive
+        # Multi-connection fragment downloads, concurrency tuned per host (see HostTuner)
+        self.turbo = turbo
+        self.use_aria2c = use_aria2c
+        # Reuse extracted info JSON through --load-info-json (see InfoCache)
+        self.use_info_cache = use_info_cache
+        # Bandwidth cap shared by all jobs ("8M" or "80%") and its time-of-day plan, see BandwidthGovernor
+        self.rate_limit = rate_limit
+        self.rate_schedule = rate_schedule
+        # Concurrent jobs per site limited to BandwidthGovernor.HOST_LIMITS
+        self.host_limits = host_limits
+        # ffmpeg steps run in PostProcessor's pool instead of the yt-dlp process
+        self.separate_postprocess = separate_postprocess
+        # Playlist and channel URLs are listed into the queue entry by entry, see fastwex_playlist
+        self.expand_playlists = expand_playlists
+        # Every job reads and updates one cookie jar under base_dir, see fastwex_ytcache.CookieJar
+        self.share_cookies = share_cookies
+        # PostProcessor transcodes AV1, VP9, Opus and FLAC for MP4 instead of copying them, see
+        # fastwex_postprocess.COMPATIBLE_COPY_CODECS
+        self.compatible_codecs = compatible_codecs
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in DownloadOptions.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data[name] for name in DownloadOptions.FIELDS if name in data})
+
+    @classmethod
+    def from_config(cls, config, default_save_path):
+        """Options from the GUI's config.json"""
+        format_index = config.get('format_index', 0)
+        quality = ""
+        if config.get('quality_index', 0) == 1:
+            quality = config.get('manual_quality', '').strip()
+        return cls(
+            save_path=config.get('video_save_path', default_save_path),
+            format=cls.FORMATS[format_index] if 0 <= format_index < len(cls.FORMATS) else "mp4",
+            quality=quality,
+            alternative=config.get('alternative_download', False),
+            embed_thumbnail=config.get('embed_thumb', False),
+            write_thumbnail=config.get('write_thumb', False),
+            subtitles=config.get('subtitles', False),
+            metadata=config.get('metadata', False),
+            unique_names=config.get('unique_names', True),
+            use_archive=config.get('use_archive', True),
+            turbo=config.get('turbo', False),
+            use_aria2c=config.get('use_aria2c', False),
+            use_info_cache=config.get('info_cache', True),
+            rate_limit=config.get('rate_limit', ""),
+            rate_schedule=config.get('rate_schedule', ""),
+            host_limits=config.get('host_limits', True),
+            separate_postprocess=config.get('separate_postprocess', True),
+            expand_playlists=config.get('expand_playlists', False),
+            share_cookies=config.get('share_cookies', True),
+            compatible_codecs=config.get('compatible_codecs', False),
+        )
+
+
+def postprocess_separately(options):
+    """True when the ffmpeg work of options is left to PostProcessor"""
+    return options.separate_postprocess and not options.alternative and (
+        options.format in ("mp4", "mp3") or options.embed_thumbnail or options.write_thumbnail
+        or options.subtitles)
+
+
+def build_video_command(options, paths):
+    """yt-dlp command for options, without the URL"""
+    separate = postprocess_separately(options)
+    # Video and audio of an MP4 arrive as two files, .f<format id> keeps them apart until they are merged
+    format_suffix = ".f%(format_id)s" if separate and options.format == "mp4" else ""
+    # Çıktı şablonunu ayarla (benzersiz isimler için)
+    output_template = f"{options.save_path}/%(title)s{format_suffix}.%(ext)s"
+    if options.unique_names:
+        output_template = f"{options.save_path}/%(title)s-%(id)s{format_suffix}.%(ext)s"
+
+    command = [
+        paths.yt_dlp_path,
+        "-o", output_template,
+        "--ffmpeg-location", paths.ffmpeg_dir,
+        "--no-warnings",
+        "--newline",
+        "--no-colors",
+        "--no-playlist",
+        "--progress-template", PROGRESS_TEMPLATE,
+        # Keep .part files and resume them, also when the scheduler retries the job
+        "--continue",
+        "--retries", "10",
+        "--fragment-retries", "10",
+        "--retry-sleep", "http:exp=1:20",
+        "--retry-sleep", "fragment:exp=1:20",
+        "--socket-timeout", "20",
+        # Player functions and tokens yt-dlp works out are kept for every job, see YtDlpCache
+        "--cache-dir", paths.ytdlp_cache_dir,
+    ]
+    if format_suffix:
+        # Thumbnail and subtitles belong to the merged file, not to one of the formats
+        base_template = output_template.replace(format_suffix, "")
+        command.extend(["-o", "thumbnail:" + base_template, "-o", "subtitle:" + base_template])
+
+    # Alternatif indirme seçeneği
+    if options.alternative:
+        command.extend(["-f", "best"])
+    elif separate:
+        # yt-dlp only downloads, PostProcessor merges, converts and embeds
+        command.extend(["--progress-template", POSTPROCESS_TEMPLATE])
+        if options.format == "mp4":
+            video = f"bestvideo[height<={options.quality}]" if options.quality.isdigit() else "bestvideo"
+            # Whatever codecs the best formats have, PostProcessor copies or transcodes them once they are probed
+            command.extend(["-f", f"{video},bestaudio/best"])
+        elif options.format == "mp3":
+            command.extend(["-f", "bestaudio/best"])
+        elif options.format == "m4a":
+            command.extend(["-f", "bestaudio[ext=m4a]"])
+
+        if options.embed_thumbnail or options.write_thumbnail:
+            command.append("--write-thumbnail")
+        if options.subtitles:
+            command.extend(["--write-subs", "--sub-langs", "all"])
+        if options.metadata:
+            command.append("--embed-metadata")
+    else:
+        # Format Seçimi
+        if options.format == "mp4":
+            if options.quality.isdigit():
+                command.extend(["-f", f"bestvideo[height<={options.quality}]+bestaudio"])
+            else:
+                command.extend(["-f", "bestvideo+bestaudio"])
+            command.extend(["--merge-output-format", "mp4"])
+        elif options.format == "mp3":
+            command.extend(["-x", "--audio-format", "mp3", "--audio-quality", "0"])
+        elif options.format == "m4a":
+            command.extend(["-f", "bestaudio[ext=m4a]", "--audio-quality", "0"])
+
+        # Diğer Ayarlar
+        if options.embed_thumbnail:
+            command.append("--embed-thumbnail")
+        if options.write_thumbnail:
+            command.extend(["--write-thumbnail", "--convert-thumbnails", "jpg"])
+        if options.subtitles:
+            command.extend(["--write-subs", "--sub-langs", "all", "--convert-subs", "srt"])
+        if options.metadata:
+            command.append("--embed-metadata")
+
+    if options.use_archive and not separate:
+        # yt-dlp records a video once it is downloaded, before PostProcessor merged it; a failed merge would
+        # be skipped from then on. The scheduler archives these jobs when their post-processing succeeded
+        command.extend(["--download-archive", paths.ytdlp_archive_path])
+    return command
+
+
+def build_gallery_dl_command(paths, save_path, url, write_metadata=False):
+    command = [
+        paths.gallery_dl_path,
+        "--directory", save_path,
+        "--no-check-certificate",
+        "--filename", "%(title)s.%(ext)s",
+        # Items downloaded before are skipped without a request
+        "--download-archive", paths.gallery_dl_archive_path,
+    ]
+    if write_metadata:
+        command.append("--write-metadata")
+    command.append(url)
+    return command
+
+
+def build_gallery_dl_resolve_command(paths, url):
+    """gallery-dl command that prints the direct media URLs of url instead of downloading them"""
+    return [paths.gallery_dl_path, "--no-check-certificate", "-g", url]
+
+
+def build_playlist_command(paths, url):
+    """yt-dlp command that lists the entries of a playlist or channel as it pages through it"""
+    return [
+        paths.yt_dlp_path,
+        "--flat-playlist",
+        # Entries are printed as each page arrives instead of after the whole list
+        "--lazy-playlist",
+        "--ignore-errors",
+        "--no-warnings",
+        "--cache-dir", paths.ytdlp_cache_dir,
+        "--print", ENTRY_TEMPLATE,
+        url,
+    ]
+
+
+def build_host_tuner(options, paths):
+    """HostTuner for turbo mode, None when it is off"""
+    if not options.turbo:
+        return None
+    aria2c_path = None
+    if options.use_aria2c and not paths.missing_tools(("aria2c",)):
+        aria2c_path = paths.aria2c_path
+    return HostTuner(paths.host_tuning_path, aria2c_path)
+
+
+def build_bandwidth_governor(options):
+    """BandwidthGovernor for options, None when neither a rate limit nor host limits are set
+
+    Raises ValueError for a rate limit or schedule that cannot be parsed.
+    """
+    governor = BandwidthGovernor.from_text(options.rate_limit, options.rate_schedule, options.host_limits)
+    return governor if governor.active else None
+
+
+def build_postprocessor(options, paths):
+    """PostProcessor for options, None when yt-dlp does its own post-processing"""
+    if not postprocess_separately(options):
+        return None
+    # Without ffprobe the streams are read from ffmpeg -i
+    ffprobe_path = paths.ffprobe_path if os.path.exists(paths.ffprobe_path) else None
+    return PostProcessor(paths.ffmpeg_path, options, probe=MediaProbe(ffprobe_path, paths.ffmpeg_path))
+
+
+def build_info_cache(options, paths):
+    """InfoCache when enabled in options, otherwise None"""
+    return InfoCache(paths.info_cache_dir) if options.use_info_cache else None
+
+
+def build_ytdlp_cache(paths):
+    """YtDlpCache of the --cache-dir build_video_command passes to every job"""
+    return YtDlpCache(paths.ytdlp_cache_dir)
+
+
+def build_cookie_jar(options, paths):
+    """CookieJar shared by the jobs when enabled in options, otherwise None"""
+    return CookieJar(paths.cookie_jar_path) if options.share_cookies else None
+
+
+def fetch_info(paths, url, cache=None):
+    """Extract url with yt-dlp -J (or take it from cache), returns the info dict"""
+    if cache is not None:
+        cached = cache.get(url)
+        if cached:
+            with open(cached, encoding="utf-8") as f:
+                return json.load(f)
+
+    result = subprocess.run(
+        [paths.yt_dlp_path, "-J", "--no-playlist", "--no-warnings", "--cache-dir", paths.ytdlp_cache_dir, url],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        encoding="utf-8",
+        errors="replace",
+        creationflags=NO_WINDOW
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"yt-dlp çıkış kodu {result.returncode}")
+    info = json.loads(result.stdout)
+    if cache is not None:
+        cache.store_data(url, result.stdout)
+    return info
+
+
+def available_heights(info):
+    """Video heights offered in an info dict, highest first"""
+    heights = {fmt.get("height") for fmt in info.get("formats") or [] if fmt.get("vcodec") != "none"}
+    return sorted((height for height in heights if isinstance(height, int)), reverse=True)
+
+
+def filter_archived(archive, urls):
+    """Drop archived and repeated URLs, returns (pending urls, skipped count, duplicate count)"""
+    archive.sync()
+    pending, skipped = archive.filter(urls)
+    return pending, len(skipped), len(urls) - len(pending) - len(skipped)
+
+
+PROGRESS_LINE_RE = re.compile(
+    r'\[download\]\s+(?P<percent>\d+(?:\.\d+)?)%'
+    r'(?:\s+of\s+~?\s*(?P<total>[\d.]+)(?P<total_unit>[KMGT]?i?B))?'
+    r'(?:\s+at\s+(?P<speed>[\d.]+)(?P<speed_unit>[KMGT]?i?B)/s)?'
+    r'(?:\s+ETA\s+(?P<eta>[\d:]+))?'
+)
+# Lines naming the file a job writes, the last one seen is the final output
+DESTINATION_RES = [
+    re.compile(r'^\[download\] Destination: (?P<path>.+)$'),
+    re.compile(r'^\[download\] (?P<path>.+) has already been downloaded'),
+    re.compile(r'^\[Merger\] Merging formats into "(?P<path>.+)"$'),
+    re.compile(r'^\[ExtractAudio\] Destination: (?P<path>.+)$'),
+]
+SIZE_UNITS = {"B": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "TiB": 1024 ** 4,
+              "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4}
+
+
+def parse_size(number, unit):
+    if number is None or unit not in SIZE_UNITS:
+        return None
+    return float(number) * SIZE_UNITS[unit]
+
+
+def parse_progress_line(line, job=-1):
+    """ProgressEvent from a yt-dlp '[download]  42.0% of ...' line, or None"""
+    match = PROGRESS_LINE_RE.search(line)
+    if not match:
+        return None
+    percent = float(match.group("percent"))
+    total = parse_size(match.group("total"), match.group("total_unit")) or 100.0
+    eta = None
+    if match.group("eta"):
+        eta = 0
+        for part in match.group("eta").split(":"):
+            eta = eta * 60 + int(part)
+    return ProgressEvent(
+        ProgressEvent.PROGRESS, job,
+        status="downloading",
+        downloaded_bytes=total * percent / 100.0,
+        total_bytes=total,
+        speed=parse_size(match.group("speed"), match.group("speed_unit")),
+        eta=eta,
+    )
+
+
+def parse_destination(line):
+    """Output file named by a yt-dlp log line, or None"""
+    for pattern in DESTINATION_RES:
+        match = pattern.match(line)
+        if match:
+            return match.group("path")
+    return None
+
+
+def parse_progress(line, job=-1):
+    """Progress from a --progress-template line, falling back to yt-dlp's text format"""
+    return parse_progress_template(line, job) or parse_progress_line(line, job)
+
+
+class CommandOutput:
+    """Turns the output lines of a downloader process into progress and log callbacks
+
+    feed() takes lines from either pipe in the order they arrive; progress
+    is only parsed on stdout, the last ERROR: line of both is kept.
+    """
+
+    def __init__(self, on_progress=None, on_log=None):
+        self.on_progress = on_progress
+        self.on_log = on_log
+        self.error_message = ""
+        self._throttle = ProgressThrottle()
+
+    def feed(self, line, stderr=False):
+        event = None if stderr else parse_progress(line)
+        if event is None:
+            if line.startswith("ERROR:"):
+                self.error_message = line[len("ERROR:"):].strip()
+            if self.on_log:
+                self.on_log(line)
+        elif self._throttle.ready(event) and self.on_progress:
+            self.on_progress(event)
+
+    def result(self, returncode, error=""):
+        """(success, error message) of the process once it exited with returncode"""
+        if error:
+            return False, error
+        return returncode == 0, self.error_message
+
+
+class BatchOutputDemuxer:
+    """Splits the output of one yt-dlp --batch-file run back into per-URL events
+
+    yt-dlp handles the batch file sequentially, so every line belongs to the
+    first URL that is not resolved yet. BATCH_START_MARKER / BATCH_DONE_MARKER
+    lines printed with --print mark where each URL starts and finishes.
+    """
+    BATCH_START_MARKER = "FWX-ITEM "
+    BATCH_DONE_MARKER = "FWX-DONE "
+
+    def __init__(self, jobs):
+        # jobs: list of (job index, url) in batch file order
+        self.jobs = jobs
+        self.cursor = 0
+        self.started = False
+        self.throttle = ProgressThrottle()
+
+    @classmethod
+    def print_arguments(cls):
+        return [
+            "--print", f"before_dl:{cls.BATCH_START_MARKER}%(original_url)s",
+            # after_video: once every format of the URL is downloaded, not after each one
+            "--print", f"after_video:{cls.BATCH_DONE_MARKER}%(original_url)s",
+            # --print implies --quiet, keep the normal log and progress output
+            "--no-quiet",
+        ]
+
+    def _active(self):
+        return self.jobs[self.cursor][0] if self.cursor < len(self.jobs) else -1
+
+    def _resolve(self, success, message=""):
+        job = self._active()
+        self.cursor += 1
+        self.started = False
+        return ProgressEvent(ProgressEvent.FINISHED, job, success=success, message=message)
+
+    def _start(self):
+        self.started = True
+        return ProgressEvent(ProgressEvent.STARTED, self._active())
+
+    def _find(self, url):
+        for position in range(self.cursor, len(self.jobs)):
+            if self.jobs[position][1] == url:
+                return position
+        return -1
+
+    def feed(self, line):
+        events = []
+        if self.cursor >= len(self.jobs):
+            return events
+
+        if line.startswith(self.BATCH_START_MARKER):
+            position = self._find(line[len(self.BATCH_START_MARKER):].strip())
+            if position < 0:
+                return events
+            # URLs skipped before this one failed during extraction
+            while self.cursor < position:
+                if not self.started:
+                    events.append(self._start())
+                events.append(self._resolve(False))
+            if not self.started:
+                events.append(self._start())
+        elif line.startswith(self.BATCH_DONE_MARKER):
+            if self._find(line[len(self.BATCH_DONE_MARKER):].strip()) == self.cursor:
+                if not self.started:
+                    events.append(self._start())
+                events.append(self._resolve(True))
+        else:
+            if not self.started:
+                events.append(self._start())
+            job = self._active()
+            progress = parse_progress(line, job)
+            if progress is not None:
+                if self.throttle.ready(progress):
+                    events.append(progress)
+                return events
+            events.append(ProgressEvent(ProgressEvent.LOG, job, message=line))
+            if line.startswith("ERROR:"):
+                events.append(self._resolve(False, line[len("ERROR:"):].strip()))
+        return events
+
+    def finish(self, message=""):
+        """Fail every URL the process did not resolve before exiting"""
+        events = []
+        while self.cursor < len(self.jobs):
+            if not self.started:
+                events.append(self._start())
+            events.append(self._resolve(False, message))
+        return events
+
+
+def run_batch(base_command, jobs, on_event, on_spawn=None):
+    """Run one yt-dlp process over a temporary --batch-file, events go to on_event
+
+    The process runs on the shared ProcessReactor, on_spawn(handle) gets its
+    RunningProcess as soon as it is started so it can be killed.
+    """
+    demuxer = BatchOutputDemuxer(jobs)
+    batch_file = None
+    try:
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".txt",
+                                         prefix="fastwex-batch-", delete=False) as f:
+            batch_file = f.name
+            f.write("\n".join(url for _, url in jobs) + "\n")
+
+        command = (base_command + BatchOutputDemuxer.print_arguments()
+                   + ["--ignore-errors", "--batch-file", batch_file])
+
+        def on_line(line, stderr):
+            for event in demuxer.feed(line):
+                on_event(event)
+
+        result = []
+        # One stream: an ERROR: line belongs to the URL whose output came before it
+        handle = default_reactor().spawn(command, on_line, lambda *exit_status: result.append(exit_status),
+                                         merge_stderr=True)
+        if on_spawn is not None:
+            on_spawn(handle)
+        handle.wait()
+        returncode, message = result[0]
+        if not message and returncode != 0:
+            message = f"yt-dlp çıkış kodu {returncode}"
+    except Exception as e:
+        message = str(e)
+    finally:
+        if batch_file:
+            try:
+                os.remove(batch_file)
+            except OSError:
+                pass
+
+    for event in demuxer.finish(message):
+        on_event(event)
+
+
+class HostTuner:
+    """Fragment concurrency per host, tuned from the measured download speed
+
+    Every job of a host starts with the host's current connection count.
+    When a finished job was faster than the best one so far by more than
+    GAIN, the count is doubled for the next job (up to MAXIMUM); once more
+    connections stop paying off the host settles on the best count. A host
+    whose speed later drops to half of its best is probed again. State is
+    kept in a JSON file so the tuning survives restarts.
+    """
+    INITIAL = 4
+    MAXIMUM = 16
+    GAIN = 1.1
+
+    def __init__(self, path=None, aria2c_path=None):
+        self.path = path
+        self.aria2c_path = aria2c_path
+        self.lock = threading.Lock()
+        self.hosts = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.hosts = json.load(f)
+            except (OSError, ValueError):
+                self.hosts = {}
+
+    @staticmethod
+    def host(url):
+        netloc = urlsplit(url if "://" in url else "https://" + url).netloc.lower()
+        return netloc[4:] if netloc.startswith("www.") else netloc
+
+    def connections(self, url):
+        with self.lock:
+            return self.hosts.get(self.host(url), {}).get("connections", self.INITIAL)
+
+    def arguments(self, connections):
+        """yt-dlp arguments for a job using connections parallel fragments"""
+        arguments = ["--concurrent-fragments", str(connections)]
+        if self.aria2c_path:
+            arguments += ["--downloader", self.aria2c_path, "--downloader-args",
+                          f"aria2c:-x {connections} -s {connections} -k 1M --summary-interval=0"]
+        return arguments
+
+    def params(self, connections):
+        """Same as arguments() as YoutubeDL params, for the in-process engine"""
+        params = {"concurrent_fragment_downloads": connections}
+        if self.aria2c_path:
+            params["external_downloader"] = {"default": self.aria2c_path}
+            params["external_downloader_args"] = {
+                "aria2c": ["-x", str(connections), "-s", str(connections), "-k", "1M", "--summary-interval=0"]}
+        return params
+
+    def record(self, url, connections, speed):
+        """Feed back the mean speed (bytes/s) of a finished job"""
+        if not speed:
+            return
+        with self.lock:
+            state = self.hosts.setdefault(self.host(url), {
+                "connections": self.INITIAL, "best": self.INITIAL, "best_speed": 0, "settled": False})
+            if speed > state["best_speed"] * self.GAIN:
+                state["best"] = connections
+                state["best_speed"] = speed
+                if not state["settled"] and connections < self.MAXIMUM:
+                    state["connections"] = min(self.MAXIMUM, connections * 2)
+                else:
+                    state["connections"] = connections
+            elif connections == state["best"] and speed < state["best_speed"] / 2:
+                # Host got slower, forget the old best and probe again
+                state.update(best_speed=speed, settled=False)
+            else:
+                state.update(connections=state["best"], settled=True)
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.hosts, f)
+        except OSError:
+            pass
+
+
+RATE_PATTERN = re.compile(r'^(?P<number>\d+(?:\.\d+)?)\s*(?P<unit>[KMG]?)(?:i?B)?(?:/s)?$', re.IGNORECASE)
+RATE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_rate(text):
+    """(bytes per second, fraction of the link) from "8M", "500K", "1.5MiB/s" or "80%"
+
+    Both are 0 for an empty text, which means no limit.
+    """
+    text = text.strip()
+    if not text:
+        return 0, 0.0
+    if text.endswith("%"):
+        try:
+            percent = float(text[:-1])
+        except ValueError:
+            raise ValueError(f"Geçersiz yüzde: {text}") from None
+        if not 0 < percent <= 100:
+            raise ValueError(f"Geçersiz yüzde: {text}")
+        return 0, percent / 100
+    match = RATE_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Geçersiz hız: {text}")
+    return int(float(match.group("number")) * RATE_UNITS[match.group("unit").upper()]), 0.0
+
+
+def parse_rate_schedule(text):
+    """[(start hour, end hour, bytes per second, fraction)] from "09-18=2M, 23-07=0"
+
+    A range that ends before it starts wraps around midnight; a rate of 0
+    lifts the limit for that range.
+    """
+    schedule = []
+    for entry in text.replace(";", ",").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        hours, separator, rate = entry.partition("=")
+        start, dash, end = hours.partition("-")
+        try:
+            start, end = int(start), int(end)
+        except ValueError:
+            raise ValueError(f"Geçersiz saat aralığı: {entry}") from None
+        if not separator or not dash or not (0 <= start <= 24 and 0 <= end <= 24):
+            raise ValueError(f"Geçersiz saat aralığı: {entry}")
+        schedule.append((start, end) + parse_rate(rate))
+    return schedule
+
+
+class BandwidthGovernor:
+    """Global bandwidth cap split across the running jobs, and concurrent jobs per host
+
+    The cap is limit bytes/s, or fraction of the link when one is given:
+    the link speed is the fastest total download speed observed so far, so
+    nothing is capped until the first jobs have measured it. A time-of-day
+    schedule overrides the cap for its hours. share() is the cap divided by
+    the number of jobs that run at the same time; yt-dlp processes get it as
+    --limit-rate when they start, the in-process engine updates the limit of
+    running downloads whenever a job starts or finishes. A yt-dlp process
+    keeps its rate until it exits: when jobs start and finish the cap is not
+    split again, a new process only gets what the running ones leave of it,
+    and what a finished one used stays unused until the next one starts.
+
+    Jobs of a site listed in host_limits wait while that many of them run,
+    so a large playlist does not hit one CDN with every worker at once.
+    """
+    HOST_LIMITS = {"youtube.com": 3, "instagram.com": 2, "tiktok.com": 2}
+    HOST_ALIASES = {"youtu.be": "youtube.com", "instagr.am": "instagram.com"}
+
+    def __init__(self, limit=0, fraction=0.0, schedule=(), host_limits=None):
+        self.limit = limit
+        self.fraction = fraction
+        self.schedule = list(schedule)
+        self.host_limits = dict(host_limits or {})
+        self.link_speed = 0.0
+        self.lock = threading.Lock()
+        self._running = {}
+
+    @classmethod
+    def from_text(cls, limit_text="", schedule_text="", host_limits=True):
+        limit, fraction = parse_rate(limit_text)
+        return cls(limit, fraction, parse_rate_schedule(schedule_text),
+                   cls.HOST_LIMITS if host_limits else None)
+
+    @property
+    def active(self):
+        return bool(self.limit or self.fraction or self.schedule or self.host_limits)
+
+    def cap(self, now=None):
+        """Total bytes/s allowed right now, 0 for no limit"""
+        limit, fraction = self.limit, self.fraction
+        hour = (now or datetime.now()).hour
+        for start, end, entry_limit, entry_fraction in self.schedule:
+            if start <= hour < end if start <= end else (hour >= start or hour < end):
+                limit, fraction = entry_limit, entry_fraction
+                break
+        if fraction:
+            return int(self.link_speed * fraction)
+        return limit
+
+    def share(self, jobs, used=0):
+        """Bytes/s each of jobs concurrent downloads may use, 0 for no limit
+
+        used is the bytes/s running downloads that keep their rate were
+        given, the share is cut to what they leave of the cap. It does not
+        go below a quarter though, a new download would crawl to its end
+        while a lowered cap is still exceeded.
+        """
+        cap = self.cap()
+        share = cap // max(1, jobs)
+        if used and share:
+            share = max(min(share, cap - used), share // 4)
+        return share
+
+    def observe(self, total_speed):
+        """Feed the current total download speed (bytes/s) of all running jobs"""
+        if total_speed > self.link_speed:
+            self.link_speed = total_speed
+
+    def host_group(self, url):
+        """Key of the host limit url falls under, None for unlimited hosts"""
+        host = urlsplit(url if "://" in url else "https://" + url).hostname or ""
+        host = host[4:] if host.startswith("www.") else host
+        host = self.HOST_ALIASES.get(host, host)
+        for domain in self.host_limits:
+            if host == domain or host.endswith("." + domain):
+                return domain
+        return None
+
+    def acquire(self, group):
+        """Take a slot of group, False while it is full"""
+        with self.lock:
+            if self._running.get(group, 0) >= self.host_limits[group]:
+                return False
+            self._running[group] = self._running.get(group, 0) + 1
+            return True
+
+    def release(self, group):
+        with self.lock:
+            self._running[group] -= 1
+
+
+class RetryPolicy:
+    """Decides whether a failed job runs again, and after how long
+
+    Errors are classified by their message. Each class allows a number of
+    attempts and backs off exponentially from its base delay, with jitter
+    so parallel jobs hitting the same host do not retry in lockstep.
+    Errors of no class, or of the PERMANENT class (unsupported URL, 404,
+    private or removed video...) are not retried. The retried run resumes the .part file (--continue).
+    """
+    PERMANENT = "permanent"
+    RATE_LIMIT = "rate_limit"
+    SERVER = "server"
+    NETWORK = "network"
+    EXTRACTOR = "extractor"
+
+    # (class, pattern, attempts in total, base delay in seconds), first match wins
+    RULES = [
+        (PERMANENT, re.compile(r"HTTP Error (?:400|401|404|410)|Unsupported URL|Video unavailable|Private video"
+                               r"|is not available|has been removed", re.I), 1, 0.0),
+        (RATE_LIMIT, re.compile(r"HTTP Error 429|Too Many Requests|rate.?limit", re.I), 5, 30.0),
+        (SERVER, re.compile(r"HTTP Error 5\d\d", re.I), 4, 5.0),
+        (NETWORK, re.compile(r"timed? ?out|Connection (?:reset|refused|aborted)|Remote end closed|IncompleteRead"
+                             r"|fragment \d+|Temporary failure in name resolution|getaddrinfo|Network is unreachable"
+                             r"|giving up after \d+ retries|Got error", re.I), 4, 2.0),
+        (EXTRACTOR, re.compile(r"Unable to (?:extract|download (?:webpage|JSON|API))|HTTP Error 403", re.I), 2, 5.0),
+    ]
+    MAX_DELAY = 300.0
+
+    def __init__(self, rules=None, max_delay=MAX_DELAY):
+        self.rules = RetryPolicy.RULES if rules is None else rules
+        self.max_delay = max_delay
+
+    def classify(self, message):
+        for error_class, pattern, _, _ in self.rules:
+            if message and pattern.search(message):
+                return error_class
+        return None
+
+    def delay(self, message, attempts):
+        """Seconds to wait before the next attempt, None to give up
+
+        attempts is the number of runs the job already had.
+        """
+        for error_class, pattern, max_attempts, base in self.rules:
+            if message and pattern.search(message):
+                if attempts >= max_attempts:
+                    return None
+                delay = min(self.max_delay, base * 2 ** (attempts - 1))
+                return random.uniform(delay / 2, delay)
+        return None
+
+
+class DownloadJob:
+    """Single URL of a download batch and its state"""
+    PENDING = "pending"
+    RUNNING = "running"
+    # Stopped by JobScheduler.pause, its .part file waits for resume()
+    PAUSED = "paused"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, index, url):
+        self.index = index
+        self.url = url
+        self.state = DownloadJob.PENDING
+        # Higher runs first, see JobScheduler.add
+        self.priority = 0
+        self.progress = 0
+        self.speed = None
+        self.eta = None
+        self.error = ""
+        self.attempts = 0
+        self.output_path = ""
+        # Fragment connections used in turbo mode and the speed samples seen while downloading
+        self.connections = 1
+        # Bytes/s of the bandwidth cap the job's yt-dlp process was started with, 0 for none
+        self.rate_limit = 0
+        self.speed_total = 0.0
+        self.speed_samples = 0
+        # Set when the job started from a cached info JSON instead of the URL
+        self.info_cached = False
+        # Host limit slot of BandwidthGovernor held by the job while it is submitted or running
+        self.host_slot = None
+        # Files the download left for PostProcessor and how it made the final file ("copy", "transcode")
+        self.files = []
+        self.postprocess_method = ""
+        # fastwex_postprocess.PostprocessTask while PostProcessor works on the files
+        self.postprocess_task = None
+        # Phase timestamps (time.monotonic, 0 until reached) and transfer figures of the last attempt,
+        # see fastwex_metrics
+        self.queued_at = time.monotonic()
+        self.started_at = 0.0
+        self.transfer_started_at = 0.0
+        self.transfer_finished_at = 0.0
+        self.download_finished_at = 0.0
+        self.finished_at = 0.0
+        self.postprocess_timings = {}
+        # Bytes of the formats downloaded before the current one, and of the current one
+        self.completed_bytes = 0
+        self.file_bytes = 0
+        self.peak_speed = 0.0
+        self.exit_code = None
+        # ProcessReactor handle while the subprocess engine runs the job, and why it is being killed
+        self.process = None
+        self.stop_reason = None
+        self.cancelled = False
+        # Extractor of the URL ("youtube") and the yt-dlp cache sections there were when it started,
+        # see fastwex_ytcache.YtDlpCache
+        self.extractor = ""
+        self.cache_sections = set()
+
+    @property
+    def finished(self):
+        return self.state in (DownloadJob.DONE, DownloadJob.FAILED)
+
+    @property
+    def postprocessing(self):
+        """Downloaded, waiting for PostProcessor to finish its files"""
+        return self.state == DownloadJob.RUNNING and self.download_finished_at >= self.started_at
+
+    @property
+    def mean_speed(self):
+        return self.speed_total / self.speed_samples if self.speed_samples else None
+
+    @property
+    def downloaded_bytes(self):
+        return self.completed_bytes + self.file_bytes
+
+
+class JobQueue:
+    """In-memory source of the jobs of a JobScheduler
+
+    The scheduler pulls jobs a window at a time with take() and reports
+    every state change through update(), so a durable queue
+    (fastwex_jobstore.StoredJobQueue) can take the place of this one.
+    """
+
+    def __init__(self, urls):
+        self.urls = list(urls)
+        self.total = len(self.urls)
+        self._cursor = 0
+        # Indices handed out by add(), take() skips them
+        self._claimed = set()
+
+    def counts(self):
+        """Jobs that already finished before this run, by state"""
+        return {}
+
+    def extend(self, urls):
+        """Append urls to the end of the queue, returns how many were added"""
+        urls = list(urls)
+        self.urls.extend(urls)
+        self.total += len(urls)
+        return len(urls)
+
+    def add(self, urls):
+        """Append urls and return their jobs at once, ahead of the jobs take() has not reached"""
+        urls = list(urls)
+        first = self.total
+        self.extend(urls)
+        jobs = [DownloadJob(index, url) for index, url in enumerate(urls, first)]
+        self._claimed.update(job.index for job in jobs)
+        return jobs
+
+    def claim(self, index):
+        """Job index when take() has not reached it yet, take() skips it from now on; None otherwise"""
+        if index < self._cursor or index >= len(self.urls) or index in self._claimed:
+            return None
+        self._claimed.add(index)
+        return DownloadJob(index, self.urls[index])
+
+    def take(self, count):
+        """Up to count more pending jobs, in order"""
+        jobs = []
+        while len(jobs) < count and self._cursor < len(self.urls):
+            if self._cursor not in self._claimed:
+                jobs.append(DownloadJob(self._cursor, self.urls[self._cursor]))
+            self._cursor += 1
+        return jobs
+
+    def update(self, job):
+        pass
+
+    def finish(self):
+        """Called once every job has finished"""
+        pass
+
+
+class SchedulerListener:
+    """Callbacks of JobScheduler, called from worker threads"""
+
+    def on_job_started(self, job):
+        pass
+
+    def on_job_progress(self, job):
+        pass
+
+    def on_job_log(self, job, message):
+        pass
+
+    def on_job_finished(self, job):
+        pass
+
+    def on_batch_finished(self, done, failed):
+        pass
+
+    def on_engine_fallback(self, reason):
+        pass
+
+    def on_job_retry(self, job, delay):
+        """job failed with job.error and runs again in delay seconds"""
+        pass
+
+    def on_job_paused(self, job):
+        """job was stopped unfinished: PAUSED until resumed, or PENDING when a higher priority took its slot"""
+        pass
+
+
+class JobScheduler:
+    """Runs a batch of URLs with up to max_workers concurrent yt-dlp processes
+
+    engine="subprocess" spawns yt-dlp per URL on the shared event loop of
+    fastwex_process.ProcessReactor, engine="inprocess" hands the
+    URLs to a pool of YoutubeDL worker processes and falls back to the
+    subprocess path if the pool cannot be started. engine="batch" runs
+    max_workers yt-dlp processes, each working through BATCH_CHUNK URLs per
+    --batch-file. Successful URLs are added to archive when one is given.
+    With a tuner (HostTuner) every job gets the fragment concurrency of its
+    host and reports its speed back when it succeeds. With an info_cache
+    (InfoCache) jobs start from the cached info JSON of their URL when
+    there is one, and fill the cache while downloading when there is not.
+    Failed jobs go back to the queue when retry_policy (RetryPolicy) allows
+    another attempt, after its backoff delay. A governor (BandwidthGovernor)
+    splits its bandwidth cap across the running jobs and keeps jobs of a busy
+    host waiting; batch mode only applies the cap, as every process works
+    through its chunk one URL at a time. With a postprocessor (PostProcessor)
+    a job whose download is done frees its slot and stays running until
+    the ffmpeg work on its files has finished. Finished jobs go to metrics
+    (fastwex_metrics.MetricsRecorder) with their phase timings, and to
+    ytdlp_cache (fastwex_ytcache.YtDlpCache) to count cache hits and misses.
+    With a cookie_jar (fastwex_ytcache.CookieJar) every subprocess and batch
+    run gets its own copy of the shared cookies and merges its changes back
+    when it exits; in-process workers keep their cookies in memory.
+
+    With expanding=True more URLs arrive through extend() while the batch
+    runs (fastwex_playlist.PlaylistExpander), and the batch only finishes
+    after end_expansion() once every job has.
+
+    add() puts URLs into the running batch with a priority, pending jobs
+    start highest priority first. On the subprocess engine a job that finds
+    every slot taken by lower priorities pauses the newest of them: its
+    process tree is killed, the .part file stays and the job waits at the
+    front of its priority for the next slot. pause(), resume() and cancel()
+    do the same for single jobs, stop() for every running one; a job that
+    is post-processing has its ffmpeg work killed instead. In batch
+    mode the whole chunk's process is killed and its other jobs go back to
+    the front of the queue. The in-process workers can not be killed for
+    one job, there only jobs that have not been handed over yet can be
+    paused or cancelled.
+
+    urls is a list or a JobQueue. Jobs are pulled from it in windows of
+    WINDOW and dropped once finished, so memory use does not grow with the
+    size of the batch; job(index) only finds jobs that are still active.
+    """
+    SUBPROCESS = "subprocess"
+    INPROCESS = "inprocess"
+    BATCH = "batch"
+    WINDOW = 64
+    # Jobs waiting for a host limit may grow the window up to this
+    MAX_WINDOW = 4 * WINDOW
+    BATCH_CHUNK = 50
+    # Seconds between liveness checks of the in-process engine's workers
+    REAP_INTERVAL = 1.0
+    # Seconds between the total speed samples progress events feed to the governor
+    OBSERVE_INTERVAL = 1.0
+    # Priority of add() for "download this now"
+    URGENT = 10
+    CANCELLED = "İptal edildi"
+    # Why a running process is being killed (DownloadJob.stop_reason)
+    PAUSE = "pause"
+    PREEMPT = "preempt"
+    CANCEL = "cancel"
+
+    def __init__(self, base_command, urls, max_workers=3, engine=SUBPROCESS, listener=None, archive=None,
+                 tuner=None, info_cache=None, retry_policy=None, governor=None, postprocessor=None, metrics=None,
+                 expanding=False, ytdlp_cache=None, cookie_jar=None):
+        self.base_command = base_command
+        self.queue = urls if isinstance(urls, JobQueue) else JobQueue(urls)
+        self.total = self.queue.total
+        self.max_workers = max(1, max_workers)
+        self.engine = engine
+        self.listener = listener or SchedulerListener()
+        self.archive = archive
+        self.tuner = tuner
+        self.info_cache = info_cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.governor = governor
+        self.postprocessor = postprocessor
+        self.metrics = metrics
+        self.ytdlp_cache = ytdlp_cache
+        self.cookie_jar = cookie_jar
+        self._expanding = expanding
+        self._lock = threading.RLock()
+        self._done = threading.Event()
+        self._batch_finished = False
+        finished = self.queue.counts()
+        self._counts = {DownloadJob.DONE: finished.get(DownloadJob.DONE, 0),
+                        DownloadJob.FAILED: finished.get(DownloadJob.FAILED, 0), DownloadJob.RUNNING: 0,
+                        DownloadJob.PAUSED: 0}
+        self._counts[DownloadJob.PENDING] = self.total - self._counts[DownloadJob.DONE] - self._counts[DownloadJob.FAILED]
+        # Jobs taken from the queue and not finished yet, by index
+        self._active = {}
+        self._pending = deque()
+        self._running = 0
+        self._pool = None
+        self._pump = None
+        self._submitted = 0
+        self._batch_workers = 1
+        self._batch_threads = []
+        # Failed jobs waiting for their retry timer
+        self._retry_wait = set()
+        self._stopped = False
+        self._observed_at = 0.0
+
+    def start(self):
+        if not self._counts[DownloadJob.PENDING] and not self._expanding:
+            self._finish_batch()
+            return
+        if self.engine == JobScheduler.BATCH:
+            self._start_batches()
+            return
+        if self.engine == JobScheduler.INPROCESS:
+            try:
+                self._start_engine()
+                return
+            except Exception as e:
+                self._use_subprocess_fallback(str(e))
+        self._fill_slots()
+
+    def wait(self, timeout=None):
+        """Block until every job has finished
+
+        In batch mode the last yt-dlp processes are waited for as well, their
+        cookies are merged back when they exit.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._done.wait(timeout):
+            return False
+        for thread in self._batch_threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return True
+
+    def extend(self, urls):
+        """Add urls to the end of an expanding batch, they start as soon as a slot is free"""
+        with self._lock:
+            added = self.queue.extend(urls)
+            self.total = self.queue.total
+            self._counts[DownloadJob.PENDING] += added
+            if self._pool is not None:
+                self._feed_engine()
+                return
+        if self.engine != JobScheduler.BATCH:
+            self._fill_slots()
+
+    def end_expansion(self):
+        """No more URLs will be added, the batch finishes with its last job"""
+        with self._lock:
+            self._expanding = False
+            finished = self._all_finished()
+            if finished:
+                self._stop_engine()
+        if finished:
+            self._finish_batch()
+
+    def add(self, urls, priority=URGENT):
+        """Add urls to the running batch ahead of every pending job of a lower priority, returns their jobs"""
+        with self._lock:
+            jobs = self.queue.add(urls)
+            self.total = self.queue.total
+            self._counts[DownloadJob.PENDING] += len(jobs)
+            for job in jobs:
+                job.priority = priority
+                self._active[job.index] = job
+                self._enqueue(job)
+            self._preempt()
+            if self._pool is not None:
+                self._feed_engine()
+                return jobs
+        if self.engine != JobScheduler.BATCH:
+            self._fill_slots()
+        return jobs
+
+    def set_priority(self, index, priority):
+        """Move job index to priority, False once it has finished"""
+        with self._lock:
+            job = self._job_of(index)
+            if job is None or job.finished:
+                return False
+            job.priority = priority
+            if job in self._pending:
+                self._pending.remove(job)
+                self._enqueue(job)
+                self._preempt()
+            if self._pool is not None:
+                self._feed_engine()
+                return True
+        if self.engine != JobScheduler.BATCH:
+            self._fill_slots()
+        return True
+
+    def pause(self, index):
+        """Stop job index until resume(), a running download keeps its .part file
+
+        A post-processing job has its ffmpeg work killed, it starts over when
+        the job is resumed. False when the job can not be paused: finished
+        or handed over to a shared engine process.
+        """
+        with self._lock:
+            job = self._job_of(index)
+            if job is None or job.stop_reason is not None:
+                return False
+            if job.process is not None or job.postprocess_task is not None:
+                self._kill(job, JobScheduler.PAUSE)
+                return True
+            if job.state == DownloadJob.RUNNING or not self._unqueue(job):
+                return False
+            self._set_state(job, DownloadJob.PAUSED)
+            self.listener.on_job_paused(job)
+            return True
+
+    def resume(self, index):
+        """Queue a paused job again, it continues its .part file"""
+        with self._lock:
+            job = self._active.get(index)
+            if job is None or job.state != DownloadJob.PAUSED:
+                return False
+            self._set_state(job, DownloadJob.PENDING)
+            self._enqueue(job, first=True)
+            self._preempt()
+            if self._pool is not None:
+                self._feed_engine()
+                return True
+        if self.engine != JobScheduler.BATCH:
+            self._fill_slots()
+        return True
+
+    def cancel(self, index):
+        """Fail job index without retries, a running process tree or ffmpeg work is killed; False when it can not be"""
+        with self._lock:
+            job = self._job_of(index)
+            if job is None or job.finished or job.stop_reason == JobScheduler.CANCEL:
+                return False
+            if job.process is not None or job.postprocess_task is not None:
+                job.cancelled = True
+                self._kill(job, JobScheduler.CANCEL)
+                return True
+            if job.state == DownloadJob.RUNNING or (job.state == DownloadJob.PENDING and not self._unqueue(job)):
+                return False
+            job.cancelled = True
+            job.error = JobScheduler.CANCELLED
+            self._complete_job(job, False)
+            finished = self._all_finished()
+            if finished:
+                self._stop_engine()
+        if finished:
+            self._finish_batch()
+        else:
+            self._fill_slots()
+        return True
+
+    def stop(self, timeout=5.0):
+        """Kill every running download and start no more, e.g. before the app quits
+
+        The jobs end up PAUSED with their .part files, a stored batch
+        (fastwex_jobstore) resumes them next time. Waits up to timeout
+        seconds for the processes to go; the batch finishes once they have
+        and the ffmpeg work of the post-processing jobs, which are paused as
+        well, has been killed.
+        """
+        with self._lock:
+            self._stopped = True
+            running = [job for job in self._active.values()
+                       if (job.process is not None or job.postprocess_task is not None) and job.stop_reason is None]
+            for job in running:
+                self._kill(job, JobScheduler.PAUSE)
+            # The jobs of a batch chunk share one process
+            handles = {job.process or job.postprocess_task for job in running}
+        for handle in handles:
+            handle.wait(timeout)
+        with self._lock:
+            pool = self._pool
+            self._stop_engine()
+            if pool is not None:
+                # The jobs of the in-process workers went down with them
+                for job in list(self._active.values()):
+                    if job.state == DownloadJob.RUNNING and not job.postprocessing:
+                        self._pause_job(job, JobScheduler.PAUSE)
+            finished = self._all_finished()
+        if finished:
+            self._finish_batch()
+
+    @property
+    def finished(self):
+        """True once the batch has ended (on_batch_finished)"""
+        return self._batch_finished
+
+    @property
+    def stopped(self):
+        """True after stop(), the batch ends without running its pending and paused jobs"""
+        return self._stopped
+
+    def count(self, state):
+        return self._counts[state]
+
+    def job(self, index):
+        """Active job with this index, None once it has finished"""
+        return self._active.get(index)
+
+    def running_jobs(self):
+        with self._lock:
+            return sorted((job for job in self._active.values() if job.state == DownloadJob.RUNNING),
+                          key=lambda job: job.index)
+
+    def aggregate_progress(self):
+        if not self.total:
+            return 0
+        with self._lock:
+            total = (self._counts[DownloadJob.DONE] + self._counts[DownloadJob.FAILED]) * 100
+            total += sum(job.progress for job in self._active.values() if job.state == DownloadJob.RUNNING)
+        return int(total / self.total)
+
+    def _all_finished(self):
+        if self._stopped:
+            # What did not run stays pending or paused for the next start, a killed batch chunk
+            # still reports its jobs
+            return self._counts[DownloadJob.RUNNING] == 0 and not any(
+                job.process is not None for job in self._active.values())
+        return (self._counts[DownloadJob.PENDING] == 0 and self._counts[DownloadJob.RUNNING] == 0
+                and self._counts[DownloadJob.PAUSED] == 0 and not self._expanding)
+
+    def _job_of(self, index):
+        """Active job index, or a pending one beyond the window taken out of the queue; None when finished"""
+        job = self._active.get(index)
+        if job is None:
+            job = self.queue.claim(index)
+            if job is not None:
+                # Waits in the window from now on, like the jobs of add()
+                self._active[job.index] = job
+                self._enqueue(job)
+        return job
+
+    def _next_job(self):
+        """Next pending job, refilling the window from the queue; None when there is none"""
+        with self._lock:
+            while not self._stopped:
+                job = self._take_pending()
+                if job is not None or len(self._pending) >= self.MAX_WINDOW:
+                    return job
+                jobs = self.queue.take(self.WINDOW)
+                if not jobs:
+                    return None
+                for job in jobs:
+                    self._active[job.index] = job
+                    self._pending.append(job)
+            return None
+
+    def _enqueue(self, job, first=False):
+        """Put job in the window after the jobs of its priority, or before them when first"""
+        for position, waiting in enumerate(self._pending):
+            if waiting.priority < job.priority or (first and waiting.priority == job.priority):
+                self._pending.insert(position, job)
+                return
+        self._pending.append(job)
+
+    def _unqueue(self, job):
+        """Take a pending job out of the window or its retry wait, False when it has been handed over"""
+        if job in self._pending:
+            self._pending.remove(job)
+        elif job in self._retry_wait:
+            self._retry_wait.discard(job)
+        else:
+            return False
+        return True
+
+    def _kill(self, job, reason):
+        """Kill the process of job; other jobs of the same batch chunk go back to the front of the queue"""
+        job.stop_reason = reason
+        if job.postprocess_task is not None:
+            # The download is done, only the job's own ffmpeg work goes
+            job.postprocess_task.kill()
+            return
+        for other in self._active.values():
+            if other is not job and other.process is job.process and other.stop_reason is None:
+                other.stop_reason = JobScheduler.PREEMPT
+        job.process.kill()
+
+    def _preempt(self):
+        """Pause the newest lowest priority running jobs while higher priorities find no free slot"""
+        if self.engine != JobScheduler.SUBPROCESS:
+            return
+        running = [job for job in self._active.values() if job.state == DownloadJob.RUNNING]
+        # Post-processing jobs hold no slot
+        stopping = sum(1 for job in running if job.stop_reason is not None and job.process is not None)
+        free = self.max_workers - self._running + stopping
+        victims = sorted((job for job in running if job.process is not None and job.stop_reason is None),
+                         key=lambda job: (job.priority, -job.started_at))
+        for waiting in list(self._pending)[max(0, free):]:
+            if not victims or victims[0].priority >= waiting.priority:
+                break
+            self._kill(victims.pop(0), JobScheduler.PREEMPT)
+
+    def _take_pending(self):
+        """First pending job whose host has a free slot, None when every one has to wait"""
+        if self.governor is None or not self.governor.host_limits or self.engine == JobScheduler.BATCH:
+            return self._pending.popleft() if self._pending else None
+        for position, job in enumerate(self._pending):
+            group = self.governor.host_group(job.url)
+            if group is None or self.governor.acquire(group):
+                job.host_slot = group
+                del self._pending[position]
+                return job
+        return None
+
+    def _release_host(self, job):
+        if job.host_slot is not None:
+            self.governor.release(job.host_slot)
+            job.host_slot = None
+
+    def _rate_arguments(self, job, jobs):
+        """--limit-rate for a yt-dlp process that runs next to jobs - 1 others
+
+        The running processes keep the rates they started with, the new one
+        gets no more than they leave of the cap.
+        """
+        job.rate_limit = 0
+        if self.governor is None:
+            return []
+        used = sum(other.rate_limit for other in self._active.values()
+                   if other is not job and other.process is not None and other.state == DownloadJob.RUNNING)
+        job.rate_limit = self.governor.share(jobs, used)
+        # Every fragment connection applies the limit on its own
+        rate = job.rate_limit // max(1, job.connections)
+        return ["--limit-rate", str(rate)] if rate else []
+
+    def _rebalance(self):
+        """Split the cap again across the jobs of the in-process engine"""
+        if self.governor is not None and self._pool is not None:
+            self._pool.set_rate_limit(self.governor.share(self._running))
+
+    def _set_state(self, job, state):
+        self._counts[job.state] -= 1
+        self._counts[state] += 1
+        job.state = state
+        if state == DownloadJob.RUNNING:
+            job.attempts += 1
+            job.started_at = time.monotonic()
+            job.transfer_started_at = job.transfer_finished_at = 0.0
+            job.completed_bytes = job.file_bytes = 0
+            if self.ytdlp_cache is not None:
+                job.cache_sections = self.ytdlp_cache.sections()
+        elif state == DownloadJob.PENDING:
+            # Waiting again, for a retry or after an engine fallback
+            job.queued_at = time.monotonic()
+        self.queue.update(job)
+
+    def _start_pool_workers(self):
+        """Workers worth starting: no more than the pending jobs, unless more are on the way"""
+        if self._expanding:
+            return self.max_workers
+        return min(self.max_workers, self._counts[DownloadJob.PENDING])
+
+    def _start_engine(self):
+        workers = self._start_pool_workers()
+        self._pool = fastwex_engine.YtDlpProcessPool(self.base_command[1:], workers)
+        self._pump = threading.Thread(target=self._pump_events, args=(self._pool,), daemon=True)
+        self._pump.start()
+        self._submitted = 0
+        self._feed_engine()
+
+    def _feed_engine(self):
+        """Keep two tasks per engine worker queued"""
+        with self._lock:
+            pool = self._pool
+            while pool is not None and self._submitted < 2 * len(pool.processes):
+                job = self._next_job()
+                if job is None:
+                    # The workers stay up while the queue is empty, a running job may still
+                    # come back for a retry; _stop_engine ends them once every job finished
+                    break
+                params = {}
+                if self.tuner is not None:
+                    job.connections = self.tuner.connections(job.url)
+                    params = self.tuner.params(job.connections)
+                load_path, write_template = self._info_paths(job)
+                pool.submit(job.index, job.url, params, load_path, write_template)
+                self._submitted += 1
+
+    def _info_paths(self, job):
+        """(cached info JSON to load, infojson output template to write), either may be None"""
+        if self.info_cache is None:
+            return None, None
+        cached = self.info_cache.get(job.url)
+        job.info_cached = cached is not None
+        if cached:
+            return cached, None
+        return None, self.info_cache.target(job.url)[:-len(".info.json")]
+
+    def _info_arguments(self, job):
+        """Arguments that take the place of the URL on the yt-dlp command line"""
+        load_path, write_template = self._info_paths(job)
+        if load_path:
+            return ["--load-info-json", load_path]
+        if write_template:
+            return ["--write-info-json", "-o", "infojson:" + write_template, job.url]
+        return [job.url]
+
+    def _pump_events(self, pool):
+        reaped_at = time.monotonic()
+        while self._pool is pool:
+            event = pool.next_event()
+            if event is not None:
+                self._on_engine_event(event)
+            if event is None or time.monotonic() - reaped_at >= self.REAP_INTERVAL:
+                reaped_at = time.monotonic()
+                self._reap_engine(pool)
+
+    def _reap_engine(self, pool):
+        """Fail the jobs of engine workers that died, the pool starts new workers in their place"""
+        with self._lock:
+            if self._pool is not pool:
+                # _stop_engine terminated the workers on purpose
+                return
+            for index, exitcode in pool.reap():
+                self._on_engine_event(ProgressEvent(ProgressEvent.FINISHED, index, success=False,
+                                                    message=f"yt-dlp motor işlemi kapandı (çıkış kodu {exitcode})"))
+
+    def _start_batches(self):
+        # A --batch-file run cannot take per-URL info JSON, the info cache is not used here
+        workers = self._start_pool_workers()
+        # Processes that share the bandwidth cap, a short queue does not give every worker a chunk
+        self._batch_workers = workers if self._expanding else \
+            min(workers, -(-self._counts[DownloadJob.PENDING] // self.BATCH_CHUNK))
+        self._batch_threads = [threading.Thread(target=self._run_batches, daemon=True) for _ in range(workers)]
+        for thread in self._batch_threads:
+            thread.start()
+
+    def _run_batches(self):
+        """One batch worker: --batch-file runs of BATCH_CHUNK URLs until the queue is empty"""
+        while True:
+            with self._lock:
+                jobs = []
+                while len(jobs) < self.BATCH_CHUNK:
+                    job = self._next_job()
+                    if job is None:
+                        break
+                    jobs.append(job)
+            if not jobs:
+                with self._lock:
+                    waiting = (bool(self._retry_wait) or self._expanding
+                               or self._counts[DownloadJob.PAUSED] > 0) and not self._stopped
+                if not waiting:
+                    return
+                # Stay around for jobs that come back from their retry timer, are still being listed or paused
+                time.sleep(0.5)
+                continue
+            command = self.base_command
+            if self.tuner is not None:
+                # One process per chunk, it runs with the concurrency of the chunk's first host
+                connections = self.tuner.connections(jobs[0].url)
+                for job in jobs:
+                    job.connections = connections
+                command = command + self.tuner.arguments(connections)
+            with self._lock:
+                command = command + self._rate_arguments(jobs[0], self._batch_workers)
+                # The job of the chunk that runs holds the process's rate
+                for job in jobs:
+                    job.rate_limit = jobs[0].rate_limit
+            cookies = self.cookie_jar.checkout() if self.cookie_jar is not None else None
+            if cookies:
+                command = command + ["--cookies", cookies]
+            try:
+                run_batch(command, [(job.index, job.url) for job in jobs], self._on_engine_event,
+                          lambda handle: self._batch_spawned(jobs, handle))
+            finally:
+                if cookies:
+                    self.cookie_jar.checkin(cookies)
+
+    def _batch_spawned(self, jobs, handle):
+        """Every job of a batch chunk holds the chunk's process, stop(), pause() and cancel() kill it"""
+        with self._lock:
+            for job in jobs:
+                if not job.finished:
+                    job.process = handle
+                    if self._stopped and job.stop_reason is None:
+                        # stop() came while the chunk was being started
+                        self._kill(job, JobScheduler.PAUSE)
+
+    def _stop_engine(self):
+        # The pump thread leaves its loop once the pool is detached
+        pool, self._pool = self._pool, None
+        self._pump = None
+        if pool is not None:
+            pool.terminate()
+
+    def _use_subprocess_fallback(self, reason):
+        self._stop_engine()
+        self.engine = JobScheduler.SUBPROCESS
+        requeue = sorted((job for job in self._active.values()
+                          if not job.finished and job.state != DownloadJob.PAUSED and job not in self._retry_wait),
+                         key=lambda job: (-job.priority, job.index))
+        for job in requeue:
+            self._release_host(job)
+            if job.state == DownloadJob.RUNNING:
+                self._set_state(job, DownloadJob.PENDING)
+            job.progress = 0
+        self._pending = deque(requeue)
+        self._running = 0
+        self.listener.on_engine_fallback(reason)
+
+    def _on_engine_event(self, event):
+        with self._lock:
+            if event.kind == ProgressEvent.ENGINE_ERROR:
+                if self._pool is not None:
+                    self._use_subprocess_fallback(event.message)
+                    self._fill_slots()
+                return
+
+            job = self._active.get(event.job)
+            if job is None or job.state == DownloadJob.PAUSED:
+                # Paused jobs are not with any engine process, their events come from one stop() ended
+                return
+
+            if event.kind == ProgressEvent.STARTED:
+                if job.stop_reason is not None:
+                    # The rest of a killed batch chunk, it never ran
+                    return
+                self._set_state(job, DownloadJob.RUNNING)
+                self._running += 1
+                self._rebalance()
+                self.listener.on_job_started(job)
+            elif event.kind == ProgressEvent.PROGRESS:
+                self._update_progress(job, event)
+            elif event.kind == ProgressEvent.POSTPROCESS:
+                if event.status == "started":
+                    self.listener.on_job_log(job, f"⚙️ {event.postprocessor} çalışıyor...")
+            elif event.kind == ProgressEvent.LOG:
+                self._log(job, event.message)
+            elif event.kind == ProgressEvent.FINISHED:
+                if self.engine == JobScheduler.INPROCESS:
+                    # YoutubeDL.download's return code
+                    job.exit_code = 0 if event.success else 1
+                job.process = None
+                reason, job.stop_reason = job.stop_reason, None
+                if reason in (JobScheduler.PAUSE, JobScheduler.PREEMPT) and not event.success:
+                    self._pause_job(job, reason)
+                elif reason == JobScheduler.CANCEL:
+                    self._finish_job(job, False, JobScheduler.CANCELLED)
+                else:
+                    self._finish_job(job, event.success, event.message)
+                if self._pool is not None:
+                    self._submitted -= 1
+                    self._feed_engine()
+                    self._rebalance()
+                if self._all_finished():
+                    self._stop_engine()
+                    self._finish_batch()
+
+    def _fill_slots(self):
+        with self._lock:
+            while self._running < self.max_workers:
+                job = self._next_job()
+                if job is None:
+                    break
+                self._start_job(job)
+
+            if self._all_finished():
+                self._finish_batch()
+
+    def _start_job(self, job):
+        self._set_state(job, DownloadJob.RUNNING)
+        self._running += 1
+        self.listener.on_job_started(job)
+        command = self.base_command
+        if self.tuner is not None:
+            job.connections = self.tuner.connections(job.url)
+            command = command + self.tuner.arguments(job.connections)
+        # Jobs that will run next to this one while the queue lasts
+        jobs = min(self.max_workers, self._counts[DownloadJob.PENDING] + self._counts[DownloadJob.RUNNING])
+        command = command + self._rate_arguments(job, jobs)
+        cookies = self.cookie_jar.checkout() if self.cookie_jar is not None else None
+        if cookies:
+            command = command + ["--cookies", cookies]
+        output = CommandOutput(on_progress=lambda event: self._update_progress(job, event),
+                               on_log=lambda message: self._log(job, message))
+        # No thread per job: the process runs on the shared reactor and calls back when it exits
+        job.process = default_reactor().spawn(
+            command + self._info_arguments(job), output.feed,
+            lambda returncode, error: self._job_exited(job, output, returncode, error, cookies))
+
+    def _job_exited(self, job, output, returncode, error, cookies=None):
+        if cookies:
+            # Outside the scheduler lock, the merge writes a file
+            self.cookie_jar.checkin(cookies)
+        success, error_message = output.result(returncode, error)
+        with self._lock:
+            job.exit_code = returncode
+            job.process = None
+            reason, job.stop_reason = job.stop_reason, None
+            if reason in (JobScheduler.PAUSE, JobScheduler.PREEMPT) and not success:
+                self._pause_job(job, reason)
+            else:
+                if reason == JobScheduler.CANCEL:
+                    success, error_message = False, JobScheduler.CANCELLED
+                self._finish_job(job, success, error_message)
+        self._fill_slots()
+
+    def _pause_job(self, job, reason):
+        """Park a job whose process was killed, it starts over from its .part file"""
+        self._release_host(job)
+        started = job.state == DownloadJob.RUNNING
+        if started:
+            if not job.postprocessing:
+                # A post-processing job gave its slot back when its download was done
+                self._running -= 1
+            # Not a failed attempt, the retry budget stays as it was
+            job.attempts -= 1
+        job.speed = job.eta = None
+        job.files = []
+        if reason == JobScheduler.PREEMPT:
+            self._set_state(job, DownloadJob.PENDING)
+            self._enqueue(job, first=True)
+        else:
+            self._set_state(job, DownloadJob.PAUSED)
+        if started or reason == JobScheduler.PAUSE:
+            self.listener.on_job_paused(job)
+
+    def _log(self, job, message):
+        extractor = parse_extractor(message)
+        if extractor:
+            job.extractor = extractor
+        files = parse_moved_files(message)
+        if files is not None:
+            job.files.extend(files)
+            return
+        path = parse_destination(message)
+        if path:
+            job.output_path = path
+        self.listener.on_job_log(job, message)
+
+    def _update_progress(self, job, event):
+        job.speed = event.speed
+        job.eta = event.eta
+        if event.filename:
+            job.output_path = event.filename
+        if event.speed and event.status == "downloading":
+            job.speed_total += event.speed
+            job.speed_samples += 1
+            job.peak_speed = max(job.peak_speed, event.speed)
+        if event.status == "downloading":
+            job.transfer_finished_at = time.monotonic()
+            job.transfer_started_at = job.transfer_started_at or job.transfer_finished_at
+        if event.downloaded_bytes is not None:
+            if event.downloaded_bytes < job.file_bytes:
+                # The next format of the URL started from zero
+                job.completed_bytes += job.file_bytes
+            job.file_bytes = event.downloaded_bytes
+        percent = event.percent
+        if percent is not None:
+            job.progress = int(percent)
+        if self.governor is not None and time.monotonic() - self._observed_at >= self.OBSERVE_INTERVAL:
+            # The jobs starting and finishing rebalance on their own, this is for a cap that is a fraction of
+            # the link speed
+            with self._lock:
+                self._observed_at = time.monotonic()
+                self.governor.observe(sum(running.speed or 0 for running in self._active.values()
+                                          if running.state == DownloadJob.RUNNING))
+                self._rebalance()
+        self.listener.on_job_progress(job)
+
+    def _finish_job(self, job, success, error_message):
+        if job.finished:
+            return
+        job.error = error_message
+        job.download_finished_at = time.monotonic()
+        self._release_host(job)
+        if job.state == DownloadJob.RUNNING:
+            self._running -= 1
+        delay = None if success or job.cancelled else self.retry_policy.delay(error_message, job.attempts)
+        if delay is not None:
+            self._schedule_retry(job, delay)
+            return
+        if success and self.postprocessor is not None and job.files:
+            # The download slot is free now, the job finishes when its ffmpeg work does
+            self.listener.on_job_log(job, "⚙️ Dönüştürme kuyruğunda...")
+            job.postprocess_task = self.postprocessor.submit(
+                job.files, lambda message: self.listener.on_job_log(job, message),
+                lambda *result: self._postprocess_finished(job, *result))
+            return
+        self._complete_job(job, success)
+
+    def _postprocess_finished(self, job, success, error_message, output_path, method, timings):
+        with self._lock:
+            job.postprocess_task = None
+            reason, job.stop_reason = job.stop_reason, None
+            if reason == JobScheduler.PAUSE and not success:
+                # The downloaded files stay, yt-dlp finds them done when the job is resumed
+                self._pause_job(job, reason)
+            else:
+                if reason == JobScheduler.CANCEL:
+                    success, error_message = False, JobScheduler.CANCELLED
+                job.error = error_message
+                job.postprocess_method = method
+                job.postprocess_timings = timings
+                if output_path:
+                    job.output_path = output_path
+                self._complete_job(job, success)
+            finished = self._all_finished()
+            if finished:
+                self._stop_engine()
+        if finished:
+            self._finish_batch()
+
+    def _complete_job(self, job, success):
+        job.finished_at = time.monotonic()
+        self._set_state(job, DownloadJob.DONE if success else DownloadJob.FAILED)
+        if success and self.archive is not None:
+            self.archive.add(job.url)
+        if success and self.tuner is not None:
+            self.tuner.record(job.url, job.connections, job.mean_speed)
+        if self.info_cache is not None:
+            if job.info_cached and not success:
+                # Maybe stale stream URLs, extract again next time
+                self.info_cache.invalidate(job.url)
+            elif not job.info_cached:
+                self.info_cache.store(job.url)
+        if self.metrics is not None:
+            self.metrics.record(job, self.engine)
+        if self.ytdlp_cache is not None:
+            self.ytdlp_cache.record(job.extractor, job.cache_sections)
+        self.listener.on_job_finished(job)
+        self._active.pop(job.index, None)
+
+    def _schedule_retry(self, job, delay):
+        self._set_state(job, DownloadJob.PENDING)
+        job.progress = 0
+        job.files = []
+        if job.info_cached and self.info_cache is not None:
+            # Stream URLs in the cached info may have expired, extract again
+            self.info_cache.invalidate(job.url)
+        self._retry_wait.add(job)
+        self.listener.on_job_retry(job, delay)
+        timer = threading.Timer(delay, self._retry, args=(job,))
+        timer.daemon = True
+        timer.start()
+
+    def _retry(self, job):
+        with self._lock:
+            if job not in self._retry_wait:
+                # Paused or cancelled while it waited
+                return
+            self._retry_wait.discard(job)
+            # Retries go first within their priority, the rest of the window keeps its order
+            self._enqueue(job, first=True)
+            if self._pool is not None:
+                self._feed_engine()
+                return
+        if self.engine != JobScheduler.BATCH:
+            self._fill_slots()
+
+    def _finish_batch(self):
+        with self._lock:
+            if self._batch_finished:
+                return
+            self._batch_finished = True
+            if not self._counts[DownloadJob.PENDING] and not self._counts[DownloadJob.PAUSED]:
+                # A stopped batch stays in the store for --resume
+                self.queue.finish()
+            if self.postprocessor is not None:
+                self.postprocessor.close()
+        self.listener.on_batch_finished(self.count(DownloadJob.DONE), self.count(DownloadJob.FAILED))
+        # wait() returns only after the listener has seen the end of the batch
+        self._done.set()
@@ -0,0 +1,398 @@
+"""In-process yt-dlp engine.
+
+yt_dlp.YoutubeDL instances live in worker processes and are reused across
+URLs, so the interpreter and extractor startup is paid once per worker
+instead of once per URL. Progress and postprocessor hooks are turned into
+ProgressEvent objects and sent back through a multiprocessing queue per
+worker.
+"""
+import importlib.util
+import json
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+
+# Machine-readable progress lines for --progress-template, one JSON object per line
+PROGRESS_MARKER = "FWXP "
+PROGRESS_FIELDS = ("downloaded_bytes", "total_bytes", "total_bytes_estimate", "speed", "eta",
+                   "fragment_index", "fragment_count")
+PROGRESS_TEMPLATE = "download:" + PROGRESS_MARKER + "{" + ",".join(
+    ['"status":"%(progress.status)s"']
+    + [f'"{field}":%(progress.{field}|null)s' for field in PROGRESS_FIELDS]
+) + "}"
+
+
+def is_available():
+    """True if the yt_dlp module can be imported"""
+    return importlib.util.find_spec("yt_dlp") is not None
+
+
+class ProgressEvent:
+    """Typed event sent from an engine worker to the GUI"""
+    STARTED = "started"
+    PROGRESS = "progress"
+    POSTPROCESS = "postprocess"
+    LOG = "log"
+    FINISHED = "finished"
+    ENGINE_ERROR = "engine_error"
+
+    __slots__ = ("kind", "job", "status", "downloaded_bytes", "total_bytes", "speed", "eta",
+                 "fragment_index", "fragment_count", "filename", "postprocessor", "message", "success")
+
+    def __init__(self, kind, job=-1, status="", downloaded_bytes=None, total_bytes=None, speed=None,
+                 eta=None, fragment_index=None, fragment_count=None, filename="", postprocessor="",
+                 message="", success=False):
+        self.kind = kind
+        self.job = job
+        self.status = status
+        self.downloaded_bytes = downloaded_bytes
+        self.total_bytes = total_bytes
+        self.speed = speed
+        self.eta = eta
+        self.fragment_index = fragment_index
+        self.fragment_count = fragment_count
+        self.filename = filename
+        self.postprocessor = postprocessor
+        self.message = message
+        self.success = success
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    @property
+    def percent(self):
+        if self.downloaded_bytes and self.total_bytes:
+            return min(100.0, self.downloaded_bytes * 100.0 / self.total_bytes)
+        if self.fragment_index and self.fragment_count:
+            return min(100.0, self.fragment_index * 100.0 / self.fragment_count)
+        return None
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def parse_progress_template(line, job=-1):
+    """ProgressEvent from a PROGRESS_TEMPLATE line, or None"""
+    if not line.startswith(PROGRESS_MARKER):
+        return None
+    try:
+        data = json.loads(line[len(PROGRESS_MARKER):])
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return ProgressEvent(
+        ProgressEvent.PROGRESS, job,
+        status=data.get("status") or "",
+        downloaded_bytes=_number(data.get("downloaded_bytes")),
+        total_bytes=_number(data.get("total_bytes")) or _number(data.get("total_bytes_estimate")),
+        speed=_number(data.get("speed")),
+        eta=_number(data.get("eta")),
+        fragment_index=_number(data.get("fragment_index")),
+        fragment_count=_number(data.get("fragment_count")),
+    )
+
+
+class ProgressThrottle:
+    """Lets through at most one progress event per job every interval seconds
+
+    Events that end a download (status other than "downloading" or 100%)
+    always pass so the final state is never dropped.
+    """
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self._last = {}
+
+    def ready(self, event):
+        now = time.monotonic()
+        last = self._last.get(event.job)
+        final = event.status not in ("", "downloading") or (event.percent or 0) >= 100
+        if final or last is None or now - last >= self.interval:
+            self._last[event.job] = now
+            return True
+        return False
+
+
+def format_bytes(value):
+    if value is None:
+        return "?"
+    for unit in ("B", "KiB", "MiB"):
+        if value < 1024:
+            return f"{value:.1f}{unit}"
+        value /= 1024.0
+    return f"{value:.1f}GiB"
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class _EventLogger:
+    """yt-dlp logger that forwards messages as LOG events"""
+
+    def __init__(self, worker):
+        self.worker = worker
+
+    def debug(self, message):
+        if not message.startswith("[debug] "):
+            self.worker.emit(ProgressEvent(ProgressEvent.LOG, self.worker.job, message=message))
+
+    def info(self, message):
+        self.worker.emit(ProgressEvent(ProgressEvent.LOG, self.worker.job, message=message))
+
+    def warning(self, message):
+        self.worker.emit(ProgressEvent(ProgressEvent.LOG, self.worker.job, status="warning",
+                                       message=f"WARNING: {message}"))
+
+    def error(self, message):
+        # Reported with FINISHED, the scheduler's retry policy looks at it
+        self.worker.last_error = message[len("ERROR:"):].strip() if message.startswith("ERROR:") else message
+        self.worker.emit(ProgressEvent(ProgressEvent.LOG, self.worker.job, status="error", message=message))
+
+
+def _copy_params(params):
+    """Copy of YoutubeDL params one level deep, a nested dict (outtmpl) changed by a task is not shared"""
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in params.items()}
+
+
+class _Worker:
+    """Body of one engine process: a single YoutubeDL reused for every task"""
+
+    def __init__(self, argv, tasks, events, rate_limit):
+        self.argv = argv
+        self.tasks = tasks
+        self.events = events
+        # Bytes/s per job set by the scheduler, 0 for no limit
+        self.rate_limit = rate_limit
+        self.ydl = None
+        # ydl.params as built, every task starts from them
+        self.base_params = {}
+        self.job = -1
+        self.last_error = ""
+        self.throttle = ProgressThrottle()
+
+    def emit(self, event):
+        self.events.put(event)
+
+    def apply_rate_limit(self):
+        """Take over the current per-job limit, yt-dlp's downloaders read ratelimit on every chunk"""
+        rate = self.rate_limit.value
+        # Every fragment connection applies the limit on its own
+        fragments = self.ydl.params.get("concurrent_fragment_downloads") or 1
+        self.ydl.params["ratelimit"] = rate / fragments if rate else None
+
+    def progress_hook(self, d):
+        self.apply_rate_limit()
+        event = ProgressEvent(
+            ProgressEvent.PROGRESS, self.job,
+            status=d.get("status", ""),
+            downloaded_bytes=d.get("downloaded_bytes"),
+            total_bytes=d.get("total_bytes") or d.get("total_bytes_estimate"),
+            speed=d.get("speed"),
+            eta=d.get("eta"),
+            fragment_index=d.get("fragment_index"),
+            fragment_count=d.get("fragment_count"),
+            filename=d.get("filename") or "",
+        )
+        if self.throttle.ready(event):
+            self.emit(event)
+
+    def postprocessor_hook(self, d):
+        self.emit(ProgressEvent(
+            ProgressEvent.POSTPROCESS, self.job,
+            status=d.get("status", ""),
+            postprocessor=d.get("postprocessor", ""),
+        ))
+
+    def build(self):
+        import yt_dlp
+
+        ydl_opts = dict(yt_dlp.parse_options(self.argv).ydl_opts)
+        ydl_opts["logger"] = _EventLogger(self)
+        ydl_opts["noprogress"] = True
+        ydl_opts["progress_hooks"] = [self.progress_hook]
+        ydl_opts["postprocessor_hooks"] = [self.postprocessor_hook]
+        return yt_dlp.YoutubeDL(ydl_opts)
+
+    def reset_params(self, params):
+        """Put ydl.params back to the built options, then apply the overrides of one task"""
+        self.ydl.params.clear()
+        self.ydl.params.update(_copy_params(self.base_params))
+        self.ydl.params.update(params)
+
+    def run(self):
+        try:
+            ydl = self.ydl = self.build()
+        except BaseException as e:
+            self.emit(ProgressEvent(ProgressEvent.ENGINE_ERROR, message=str(e)))
+            return
+        self.base_params = _copy_params(ydl.params)
+
+        with ydl:
+            while True:
+                task = self.tasks.get()
+                if task is None:
+                    break
+                self.job, url, params, load_path, write_template = task
+                self.emit(ProgressEvent(ProgressEvent.STARTED, self.job))
+                # Per-task overrides, e.g. the fragment concurrency of turbo mode
+                self.reset_params(params)
+                self.apply_rate_limit()
+                ydl.params["writeinfojson"] = bool(write_template)
+                if write_template:
+                    ydl.params["outtmpl"] = {**ydl.params["outtmpl"], "infojson": write_template}
+                # YoutubeDL keeps the return code across calls, reset it per URL
+                ydl._download_retcode = 0
+                self.last_error = ""
+                try:
+                    if load_path:
+                        success = ydl.download_with_info_file(load_path) == 0
+                    else:
+                        success = ydl.download([url]) == 0
+                    message = "" if success else self.last_error
+                except Exception as e:
+                    success = False
+                    message = str(e)
+                self.emit(ProgressEvent(ProgressEvent.FINISHED, self.job, success=success, message=message))
+                self.job = -1
+
+
+def _worker_main(argv, tasks, events, rate_limit):
+    _Worker(argv, tasks, events, rate_limit).run()
+
+
+class YtDlpProcessPool:
+    """Fixed set of engine processes, each fed from its own task queue
+
+    Tasks wait in the pool until a worker is free, so a worker holds at
+    most one. A worker process that dies (killed, out of memory, a crash in
+    an extension module) is replaced by reap(): a task it had not started
+    yet goes back to the front, the one it was running is reported lost.
+    Every worker only reads and writes queues of its own, one killed in the
+    middle of a put can not take the lock of a shared queue down with it.
+    """
+
+    def __init__(self, argv, workers):
+        self.argv = argv
+        self.context = multiprocessing.get_context("spawn")
+        # Events of all workers, forwarded from their own queues by one pump thread each
+        self.events = queue.Queue()
+        # Read by the workers while they download, the reference keeps it alive until they have it
+        self.rate_limit = self.context.Value("d", 0.0, lock=False)
+        self.lock = threading.Lock()
+        self.backlog = deque()
+        self.queues = []
+        self.event_queues = []
+        self.processes = []
+        # Task of every worker and whether it has started it, None while it is free
+        self.assigned = []
+        self.started = []
+        for _ in range(max(1, workers)):
+            self.queues.append(None)
+            self.event_queues.append(None)
+            self.processes.append(None)
+            self.assigned.append(None)
+            self.started.append(False)
+            self._start_worker(len(self.processes) - 1)
+
+    def _start_worker(self, slot):
+        self.queues[slot] = self.context.Queue()
+        events = self.event_queues[slot] = self.context.Queue()
+        threading.Thread(target=self._pump, args=(slot, events), daemon=True).start()
+        self.processes[slot] = self.context.Process(
+            target=_worker_main, args=(self.argv, self.queues[slot], events, self.rate_limit), daemon=True)
+        self.processes[slot].start()
+
+    def _pump(self, slot, events):
+        # Leaves its loop once the worker is replaced, what the dead one still sent is dropped
+        while self.event_queues[slot] is events:
+            try:
+                event = events.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            with self.lock:
+                if self.event_queues[slot] is events:
+                    self.events.put(event)
+
+    def _dispatch(self):
+        for slot, task in enumerate(self.assigned):
+            if not self.backlog:
+                break
+            if task is None and self.processes[slot].is_alive():
+                self.assigned[slot] = task = self.backlog.popleft()
+                self.started[slot] = False
+                self.queues[slot].put(task)
+
+    def submit(self, job, url, params=None, load_path=None, write_template=None):
+        """Queue url, or the info JSON at load_path; write_template: where to write its info JSON"""
+        with self.lock:
+            self.backlog.append((job, url, params or {}, load_path, write_template))
+            self._dispatch()
+
+    def set_rate_limit(self, rate):
+        """Limit every running download to rate bytes/s, 0 to lift it"""
+        self.rate_limit.value = rate
+
+    def next_event(self, timeout=0.2):
+        try:
+            event = self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if event.kind in (ProgressEvent.STARTED, ProgressEvent.FINISHED):
+            with self.lock:
+                for slot, task in enumerate(self.assigned):
+                    if task is not None and task[0] == event.job:
+                        if event.kind == ProgressEvent.STARTED:
+                            self.started[slot] = True
+                        else:
+                            self.assigned[slot] = None
+                        break
+                self._dispatch()
+        return event
+
+    def reap(self):
+        """Restart the worker processes that died, returns (job, exitcode) of the tasks they were running
+
+        A worker that ended by itself (exit code 0) reported why with an
+        ENGINE_ERROR event and is left alone.
+        """
+        lost = []
+        with self.lock:
+            for slot, process in enumerate(self.processes):
+                if process.is_alive() or process.exitcode == 0:
+                    continue
+                task = self.assigned[slot]
+                if task is not None:
+                    if self.started[slot]:
+                        lost.append((task[0], process.exitcode))
+                    else:
+                        self.backlog.appendleft(task)
+                self.assigned[slot] = None
+                self._start_worker(slot)
+            self._dispatch()
+        return lost
+
+    def close(self):
+        for tasks in self.queues:
+            tasks.put(None)
+
+    def terminate(self):
+        for slot in range(len(self.event_queues)):
+            self.event_queues[slot] = None
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join(1)
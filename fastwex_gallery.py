@@ -0,0 +1,171 @@
+"""Two-stage gallery-dl downloads.
+
+gallery-dl only resolves the media of a profile or post (-g prints one
+direct URL per line as it goes), and a bounded pool of HTTP workers
+fetches the files in parallel, each worker keeping its own keep-alive
+session. The crawl and the downloads overlap, so a photo-heavy profile is
+limited by bandwidth instead of by one file after the other.
+"""
+import os
+import queue
+import subprocess
+import threading
+from urllib.parse import unquote, urlsplit
+
+from fastwex_core import NO_WINDOW
+
+
+def is_available():
+    """True if requests (a dependency of instaloader) can be imported"""
+    try:
+        import requests  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def media_filename(url):
+    """File name of a resolved media URL, the last path segment without the query"""
+    return os.path.basename(unquote(urlsplit(url).path)) or "media"
+
+
+class FetchListener:
+    """Callbacks of MediaFetcher, called from its threads"""
+
+    def on_log(self, message, level):
+        pass
+
+    def on_progress(self, finished, resolved):
+        pass
+
+
+class MediaFetcher:
+    """Runs a gallery-dl -g command and downloads what it prints into save_path
+
+    Files already in save_path are skipped. Downloads go to a .part file
+    that is renamed once complete, so an existing file is a whole one.
+    """
+    WORKERS = 8
+    CHUNK_SIZE = 256 * 1024
+    TIMEOUT = 30
+    USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+    def __init__(self, save_path, workers=WORKERS, listener=None):
+        self.save_path = save_path
+        self.workers = max(1, workers)
+        self.listener = listener or FetchListener()
+        self.resolved = 0
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.downloaded_bytes = 0
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._process = None
+        # Bounded: gallery-dl is not read further while the workers are this far behind
+        self._urls = queue.Queue(maxsize=self.workers * 4)
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+
+    def run(self, command):
+        """Resolve and fetch everything, returns (success, error message)"""
+        os.makedirs(self.save_path, exist_ok=True)
+        threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        error_message = ""
+        # Last line that was not a URL, gallery-dl's error when it fails
+        last_message = ""
+        try:
+            self._process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                # One pipe: a full stderr buffer can not stall gallery-dl while stdout is read
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                encoding="utf-8",
+                errors="replace",
+                creationflags=NO_WINDOW
+            )
+            for line in self._process.stdout:
+                url = line.strip()
+                # "| url" lines are fallbacks of the URL before them, "ytdl:" ones need yt-dlp
+                if not url.startswith(("http://", "https://")):
+                    if url and not url.startswith(("|", "ytdl:")):
+                        last_message = url
+                    continue
+                if self._cancelled.is_set():
+                    break
+                self.resolved += 1
+                self._urls.put(url)
+            self._process.wait()
+            if self._process.returncode != 0 and not self._cancelled.is_set():
+                error_message = last_message or f"gallery-dl çıkış kodu {self._process.returncode}"
+        except Exception as e:
+            error_message = str(e)
+        finally:
+            for _ in threads:
+                self._urls.put(None)
+            for thread in threads:
+                thread.join()
+
+        if self._cancelled.is_set():
+            error_message = error_message or "İptal edildi"
+        return not error_message and not self.failed, error_message
+
+    def _work(self):
+        import requests
+
+        with requests.Session() as session:
+            session.headers["User-Agent"] = MediaFetcher.USER_AGENT
+            while True:
+                url = self._urls.get()
+                if url is None:
+                    return
+                if self._cancelled.is_set():
+                    continue
+                self._fetch(session, url)
+
+    def _fetch(self, session, url):
+        name = media_filename(url)
+        path = os.path.join(self.save_path, name)
+        if os.path.exists(path):
+            with self._lock:
+                self.skipped += 1
+            self._progress()
+            return
+
+        part_path = path + ".part"
+        try:
+            with session.get(url, stream=True, timeout=MediaFetcher.TIMEOUT) as response:
+                response.raise_for_status()
+                size = 0
+                with open(part_path, "wb") as f:
+                    for chunk in response.iter_content(MediaFetcher.CHUNK_SIZE):
+                        if self._cancelled.is_set():
+                            raise RuntimeError("İptal edildi")
+                        f.write(chunk)
+                        size += len(chunk)
+            os.replace(part_path, path)
+            with self._lock:
+                self.done += 1
+                self.downloaded_bytes += size
+            self.listener.on_log(f"✅ {name}", "success")
+        except Exception as e:
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+            with self._lock:
+                self.failed += 1
+            self.listener.on_log(f"❌ Hata: {name}: {str(e)}", "error")
+        self._progress()
+
+    def _progress(self):
+        with self._lock:
+            finished = self.done + self.skipped + self.failed
+        self.listener.on_progress(finished, self.resolved)
@@ -0,0 +1,117 @@
+"""On-disk cache of extracted video info.
+
+yt-dlp's info JSON (what -J prints and --write-info-json writes) is kept
+per URL so a later download, retry or format change can start from
+--load-info-json instead of extracting the page again. Entries expire
+after a TTL because the stream URLs inside them do, and the directory is
+kept under a size limit by evicting the least recently used entries.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from fastwex_archive import canonical_key
+
+
+class InfoCache:
+    """<key hash>.info.json files in cache_dir, indexed in cache_dir/index.sqlite
+
+    Shared by the scheduler's worker threads, every index access goes
+    through self.lock.
+    """
+    # Stream URLs of most sites stay valid for a few hours
+    DEFAULT_TTL = 2 * 60 * 60
+    DEFAULT_MAX_BYTES = 100 * 1024 ** 2
+
+    def __init__(self, cache_dir, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS info "
+                        "(key TEXT PRIMARY KEY, path TEXT, size INTEGER, fetched_at REAL, used_at REAL)")
+        self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def target(self, url):
+        """Path a fresh info JSON for url should be written to"""
+        name = hashlib.sha1(canonical_key(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name + ".info.json")
+
+    def get(self, url):
+        """Cached info JSON path for url, None when missing or expired"""
+        key = canonical_key(url)
+        if not key:
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT path, fetched_at FROM info WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            path, fetched_at = row
+            if now - fetched_at > self.ttl or not os.path.exists(path):
+                self._remove(key, path)
+                return None
+            self.db.execute("UPDATE info SET used_at = ? WHERE key = ?", (now, key))
+            self.db.commit()
+        return path
+
+    def store(self, url):
+        """Index the file written to target(url), returns its path or None"""
+        key = canonical_key(url)
+        path = self.target(url)
+        if not key or not os.path.exists(path):
+            return None
+        now = time.time()
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO info VALUES (?, ?, ?, ?, ?)",
+                            (key, path, os.path.getsize(path), now, now))
+            self.db.commit()
+            self.evict()
+        return path
+
+    def store_data(self, url, data):
+        """Write info JSON text (e.g. the output of yt-dlp -J) for url and index it"""
+        path = self.target(url)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+        return self.store(url)
+
+    def invalidate(self, url):
+        key = canonical_key(url)
+        with self.lock:
+            row = self.db.execute("SELECT path FROM info WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._remove(key, row[0])
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until the cache fits max_bytes"""
+        with self.lock:
+            for key, path in self.db.execute("SELECT key, path FROM info WHERE fetched_at < ?",
+                                             (time.time() - self.ttl,)).fetchall():
+                self._remove(key, path)
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM info").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, path, size in self.db.execute(
+                    "SELECT key, path, size FROM info ORDER BY used_at").fetchall():
+                self._remove(key, path)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def _remove(self, key, path):
+        with self.lock:
+            self.db.execute("DELETE FROM info WHERE key = ?", (key,))
+            self.db.commit()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,501 @@
+"""Instagram downloads in worker processes.
+
+Every worker process builds one instaloader.Instaloader and keeps it (with
+its session and rate controller) for all the tasks it gets, also those of
+later downloads. A profile is listed by one worker while the posts found
+so far are already downloaded by the others, so up to `workers` posts are
+fetched at the same time and the GUI thread only receives events.
+
+Profiles are synced incrementally: ProfileIndex remembers the posts already
+downloaded and, after a complete sync, the time of the newest post. The
+next listing stops at that post, so only the new page or two are fetched.
+API requests of all workers go through one RequestPacer, a token bucket
+that slows down when Instagram answers 429.
+"""
+import calendar
+import multiprocessing
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Post structures per POSTS event while a profile is listed
+POSTS_CHUNK = 12
+# Task key of the profile listing, posts are numbered from 0
+LISTING = -1
+
+
+class InstagramEvent:
+    """Event sent from a loader worker to InstagramDownloader"""
+    LOG = "log"
+    POSTS = "posts"
+    FINISHED = "finished"
+    ENGINE_ERROR = "engine_error"
+
+    def __init__(self, kind, key=LISTING, success=True, message="", level="info", posts=None, total=None,
+                 timestamp=None):
+        self.kind = kind
+        self.key = key
+        self.success = success
+        self.message = message
+        self.level = level
+        self.posts = posts or []
+        self.total = total
+        # Post time of a finished post; for the listing, the newest post seen
+        self.timestamp = timestamp
+
+
+def parse_instagram_url(url):
+    """("post", shortcode), ("story", username) or ("profile", username)"""
+    parts = [part for part in url.split("?")[0].split("/") if part]
+    for marker in ("p", "reel", "reels", "tv"):
+        if marker in parts and parts.index(marker) + 1 < len(parts):
+            return "post", parts[parts.index(marker) + 1]
+    if "stories" in parts and parts.index("stories") + 1 < len(parts):
+        return "story", parts[parts.index("stories") + 1]
+    return "profile", parts[-1].lstrip("@") if parts else ""
+
+
+def session_path(session_dir, username):
+    return os.path.join(session_dir, f"session-{username}")
+
+
+def login(session_dir, username, password):
+    """Log in once and save the session file the loader workers use"""
+    import instaloader
+
+    loader = instaloader.Instaloader(quiet=True)
+    try:
+        loader.login(username, password)
+    except instaloader.TwoFactorAuthRequiredException:
+        raise RuntimeError("İki adımlı doğrulama gerekiyor: oturumu 'instaloader -l kullanıcı' ile açıp "
+                           f"oturum dosyasını {session_dir} klasörüne kopyalayın")
+    os.makedirs(session_dir, exist_ok=True)
+    loader.save_session_to_file(session_path(session_dir, username))
+
+
+def post_timestamp(post):
+    return calendar.timegm(post.date_utc.utctimetuple())
+
+
+class RequestPacer:
+    """Token bucket for Instagram API requests, shared by the loader processes
+
+    Lets RATE requests per second through on average, with bursts of BURST.
+    A 429 halves the rate and empties the bucket; every request after that
+    lets the rate recover by RECOVERY, up to the rate it started with.
+    """
+    RATE = 0.3
+    MIN_RATE = 0.02
+    BURST = 8
+    RECOVERY = 1.02
+    MAX_BACKOFF = 300.0
+
+    def __init__(self, context, rate=RATE):
+        self.max_rate = rate
+        # tokens, time of the last refill, current rate
+        self.state = context.Array("d", [RequestPacer.BURST, time.time(), rate])
+
+    def acquire(self):
+        """Take a token, returns how long to sleep before the request"""
+        with self.state.get_lock():
+            tokens, stamp, rate = self.state[:]
+            now = time.time()
+            # Negative tokens are requests already promised to other workers
+            tokens = min(RequestPacer.BURST, tokens + (now - stamp) * rate) - 1
+            self.state[0] = tokens
+            self.state[1] = now
+            self.state[2] = min(self.max_rate, rate * RequestPacer.RECOVERY)
+        return -tokens / rate if tokens < 0 else 0.0
+
+    def penalize(self):
+        """Instagram answered 429, returns how long to back off"""
+        with self.state.get_lock():
+            rate = max(RequestPacer.MIN_RATE, self.state[2] / 2)
+            self.state[0] = min(self.state[0], 0.0)
+            self.state[1] = time.time()
+            self.state[2] = rate
+        return min(RequestPacer.MAX_BACKOFF, 2 / rate)
+
+
+def _rate_controller(pacer, on_429):
+    """instaloader rate_controller factory that paces requests with pacer"""
+    import instaloader
+
+    class PacedRateController(instaloader.RateController):
+        def wait_before_query(self, query_type):
+            wait = pacer.acquire()
+            if wait > 0:
+                self.sleep(wait)
+
+        def handle_429(self, query_type):
+            wait = pacer.penalize()
+            on_429(wait)
+            self.sleep(wait)
+
+    return PacedRateController
+
+
+class _Worker:
+    """Body of one loader process"""
+
+    def __init__(self, options, pacer, tasks, events):
+        self.options = options
+        self.pacer = pacer
+        self.tasks = tasks
+        self.events = events
+
+    def emit(self, event):
+        self.events.put(event)
+
+    def on_429(self, wait):
+        self.emit(InstagramEvent(InstagramEvent.LOG, level="warning",
+                                 message=f"⏳ Instagram istek sınırı (429), yavaşlatıldı: {wait:.0f} sn bekleniyor"))
+
+    def build(self):
+        import instaloader
+
+        loader = instaloader.Instaloader(
+            dirname_pattern=os.path.join(self.options["save_path"], "{profile}", "{target}"),
+            save_metadata=self.options.get("captions", False),
+            download_video_thumbnails=False,
+            download_geotags=False,
+            download_comments=False,
+            compress_json=False,
+            quiet=True,
+            rate_controller=_rate_controller(self.pacer, self.on_429) if self.pacer else None,
+        )
+        user = self.options.get("session_user")
+        if user:
+            path = session_path(self.options["session_dir"], user)
+            # Without our own file, instaloader's default location (instaloader -l) is tried
+            loader.load_session_from_file(user, path if os.path.exists(path) else None)
+        return loader
+
+    def run(self):
+        try:
+            loader = self.build()
+        except BaseException as e:
+            self.emit(InstagramEvent(InstagramEvent.ENGINE_ERROR, message=str(e)))
+            return
+
+        import instaloader
+
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            kind, key, value = task
+            try:
+                timestamp = None
+                if kind == "profile":
+                    timestamp = self.list_profile(instaloader, loader, *value)
+                    message = value[0]
+                    if loader.context.is_logged_in:
+                        # Keep the refreshed cookies for the next run
+                        loader.save_session_to_file(session_path(self.options["session_dir"],
+                                                                 self.options["session_user"]))
+                else:
+                    if isinstance(value, dict):
+                        post = instaloader.load_structure(loader.context, value)
+                    else:
+                        post = instaloader.Post.from_shortcode(loader.context, value)
+                    loader.download_post(post, target=post.owner_username)
+                    message = post.shortcode
+                    timestamp = post_timestamp(post)
+                self.emit(InstagramEvent(InstagramEvent.FINISHED, key, message=message, timestamp=timestamp))
+            except Exception as e:
+                self.emit(InstagramEvent(InstagramEvent.FINISHED, key, success=False, message=str(e)))
+
+    def list_profile(self, instaloader, loader, username, cursor, known):
+        """Queue the profile's posts newer than cursor and not in known, returns the newest post time"""
+        profile = instaloader.Profile.from_username(loader.context, username)
+        if cursor is None:
+            self.emit(InstagramEvent(InstagramEvent.POSTS, total=profile.mediacount))
+        loader.download_profilepic(profile)
+        if self.options.get("igtv"):
+            loader.download_igtv(profile)
+            self.emit(InstagramEvent(InstagramEvent.LOG, message=f"✅ IGTV indirildi: {profile.username}",
+                                     level="success"))
+
+        posts = []
+        newest = cursor
+        for post in profile.get_posts():
+            timestamp = post_timestamp(post)
+            if cursor is not None and timestamp <= cursor:
+                # Pinned posts come first whatever their age
+                if post.is_pinned:
+                    continue
+                break
+            newest = max(newest or timestamp, timestamp)
+            if post.shortcode in known:
+                continue
+            # The listing already has every post's node, workers rebuild the Post without a request
+            posts.append(instaloader.get_json_structure(post))
+            if len(posts) >= POSTS_CHUNK:
+                self.emit(InstagramEvent(InstagramEvent.POSTS, posts=posts))
+                posts = []
+        if posts:
+            self.emit(InstagramEvent(InstagramEvent.POSTS, posts=posts))
+        return newest
+
+
+def _worker_main(options, pacer, tasks, events):
+    _Worker(options, pacer, tasks, events).run()
+
+
+class ProfileIndex:
+    """Downloaded posts and the sync cursor of every profile, in SQLite
+
+    The cursor is the time of the newest post and only moves after a sync
+    that finished without errors, so posts missed by an interrupted sync
+    are picked up by the next one. Shared by the GUI and the event thread,
+    every access goes through self.lock.
+    """
+
+    def __init__(self, db_path):
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS posts "
+                        "(username TEXT, shortcode TEXT, taken_at REAL, PRIMARY KEY (username, shortcode))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS profiles (username TEXT PRIMARY KEY, cursor REAL, synced_at REAL)")
+        self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def cursor(self, username):
+        with self.lock:
+            row = self.db.execute("SELECT cursor FROM profiles WHERE username = ?", (username,)).fetchone()
+        return row[0] if row else None
+
+    def known(self, username, after=None):
+        """Shortcodes downloaded for username, only those newer than after when given"""
+        with self.lock:
+            rows = self.db.execute("SELECT shortcode FROM posts WHERE username = ? AND taken_at > ?",
+                                   (username, after if after is not None else -1)).fetchall()
+        return {shortcode for shortcode, in rows}
+
+    def add(self, username, shortcode, taken_at):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO posts VALUES (?, ?, ?)", (username, shortcode, taken_at))
+            self.db.commit()
+
+    def set_cursor(self, username, cursor):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO profiles VALUES (?, ?, ?)", (username, cursor, time.time()))
+            self.db.commit()
+
+
+class InstagramListener:
+    """Callbacks of InstagramDownloader, called from its event thread"""
+
+    def on_log(self, message, level):
+        pass
+
+    def on_progress(self, done, total):
+        pass
+
+    def on_finished(self, done, failed):
+        pass
+
+
+class InstagramDownloader:
+    """Downloads Instagram posts and profiles with a pool of loader processes
+
+    options: save_path, captions (save metadata / captions), igtv,
+    incremental, session_user and session_dir. Profiles are synced
+    against index (ProfileIndex) when one is given.
+
+    The loader processes stay up between start() calls, the next post or
+    profile goes to workers that already have their Instaloader and
+    session. configure() changes the options of the next start(); workers
+    built with other WORKER_OPTIONS are replaced then. close() ends them.
+    """
+    # Options the loader processes are built with
+    WORKER_OPTIONS = ("save_path", "captions", "igtv", "session_user", "session_dir")
+
+    def __init__(self, options, workers=3, listener=None, index=None):
+        self.options = options
+        self.workers = max(1, workers)
+        self.listener = listener or InstagramListener()
+        self.index = index
+        self.username = None
+        self._newest = None
+        self._cancelled = False
+        self.done = 0
+        self.failed = 0
+        self.total = 0
+        self._submitted = 0
+        self._listing = False
+        self._processes = []
+        self._worker_options = None
+        self._pacer = None
+        self._tasks = None
+        self._events = None
+        self._finished = threading.Event()
+        # True while no download runs, events that still arrive then are dropped
+        self._closing = True
+        self._lock = threading.Lock()
+
+    def configure(self, options, workers):
+        """Options and pool size for the next start()"""
+        self.options = options
+        self.workers = max(1, workers)
+
+    def start(self, url):
+        with self._lock:
+            self.username = None
+            self._newest = None
+            self._cancelled = False
+            self.done = self.failed = self.total = self._submitted = 0
+            self._listing = False
+            self._finished = threading.Event()
+            self._closing = False
+
+        kind, value = parse_instagram_url(url)
+        if kind == "story" or not value:
+            message = ("⚠️ Hikaye indirmek için giriş yapmalısınız" if kind == "story"
+                       else "⚠️ URL'den gönderi veya kullanıcı adı çıkarılamadı")
+            self.listener.on_log(message, "warning")
+            self._finish()
+            return
+
+        # The worker that lists a profile joins the others on its posts once the listing is done
+        self._start_workers(1 if kind == "post" else self.workers)
+
+        if kind == "post":
+            self.total = 1
+            self._submit(value)
+        else:
+            self._listing = True
+            self.username = value
+            cursor, known = None, set()
+            if self.index is not None:
+                known = self.index.known(value)
+                if self.options.get("incremental", True):
+                    cursor = self.index.cursor(value)
+                    known = self.index.known(value, after=cursor)
+            self._tasks.put(("profile", LISTING, (value, cursor, known)))
+            if cursor is not None:
+                self.listener.on_log(f"🔍 Profil eşitleniyor, sadece yeni gönderiler: {value}", "info")
+            else:
+                self.listener.on_log(f"🔍 Profil listeleniyor: {value}", "info")
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def cancel(self):
+        if not self._closing:
+            self._cancelled = True
+            self.listener.on_log("⏹️ Instagram indirmesi iptal edildi", "warning")
+        self._finish()
+
+    def close(self):
+        """End the loader processes, a running download is cancelled"""
+        self.cancel()
+        self._stop_workers()
+
+    def _start_workers(self, count):
+        """Have at least count loader processes running with the current options"""
+        worker_options = {key: self.options.get(key) for key in InstagramDownloader.WORKER_OPTIONS}
+        if self._processes and (worker_options != self._worker_options or len(self._processes) > self.workers
+                                or not all(process.is_alive() for process in self._processes)):
+            self._stop_workers()
+        context = multiprocessing.get_context("spawn")
+        if not self._processes:
+            self._worker_options = worker_options
+            # Kept here: the shared state must outlive start() until the workers have unpickled it
+            self._pacer = RequestPacer(context)
+            self._tasks = context.Queue()
+            self._events = context.Queue()
+            threading.Thread(target=self._pump, args=(self._events,), daemon=True).start()
+        while len(self._processes) < count:
+            process = context.Process(target=_worker_main, args=(self.options, self._pacer, self._tasks, self._events),
+                                      daemon=True)
+            process.start()
+            self._processes.append(process)
+
+    def _stop_workers(self):
+        # The pump thread leaves its loop once the event queue is detached
+        processes, self._processes = self._processes, []
+        self._events = None
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(1)
+
+    def _submit(self, value):
+        self._tasks.put(("post", self._submitted, value))
+        self._submitted += 1
+
+    def _pump(self, events):
+        while self._events is events:
+            try:
+                event = events.get(timeout=0.2)
+            except queue.Empty:
+                if not self._closing and not any(process.is_alive() for process in self._processes):
+                    self.listener.on_log("❌ Instagram işlemleri beklenmedik şekilde kapandı", "error")
+                    # Whatever had not finished is lost
+                    self.failed += self._submitted - self.done - self.failed + int(self._listing)
+                    self._finish(stop_workers=True)
+                continue
+            if not self._closing:
+                self._handle(event)
+
+    def _handle(self, event):
+        if event.kind == InstagramEvent.ENGINE_ERROR:
+            self.listener.on_log(f"❌ Instaloader başlatılamadı: {event.message}", "error")
+            self._finish(stop_workers=True)
+            return
+        if event.kind == InstagramEvent.LOG:
+            self.listener.on_log(event.message, event.level)
+            return
+        if event.kind == InstagramEvent.POSTS:
+            if event.total is not None:
+                self.total = event.total
+            for structure in event.posts:
+                self._submit(structure)
+            self.total = max(self.total, self._submitted)
+        elif event.kind == InstagramEvent.FINISHED:
+            if event.key == LISTING:
+                self._listing = False
+                if event.success:
+                    # Private or partly hidden profiles list fewer posts than mediacount
+                    self.total = self._submitted
+                    self._newest = event.timestamp
+                    self.listener.on_log(f"📋 {self._submitted} yeni gönderi bulundu: {event.message}", "info")
+                else:
+                    self.failed += 1
+                    self.listener.on_log(f"❌ Hata: {event.message}", "error")
+            elif event.success:
+                self.done += 1
+                if self.index is not None and self.username:
+                    self.index.add(self.username, event.message, event.timestamp)
+                self.listener.on_log(f"✅ Gönderi indirildi: {event.message}", "success")
+            else:
+                self.failed += 1
+                self.listener.on_log(f"❌ Hata [{event.key + 1}]: {event.message}", "error")
+        self.listener.on_progress(self.done + self.failed, self.total)
+
+        if not self._listing and self.done + self.failed >= self._submitted:
+            self._finish()
+
+    def _finish(self, stop_workers=False):
+        # Called by the event thread and by cancel(), only the first call of a download counts
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+        if stop_workers or self._cancelled:
+            # A cancelled download leaves queued and running tasks behind
+            self._stop_workers()
+        if (self.index is not None and self.username and self._newest is not None
+                and not self.failed and not self._cancelled):
+            self.index.set_cursor(self.username, self._newest)
+        self.listener.on_finished(self.done, self.failed)
+        # wait() returns only after the cursor and the listener are done
+        self._finished.set()
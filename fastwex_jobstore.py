@@ -0,0 +1,165 @@
+"""Durable download queue.
+
+Every batch is written to SQLite before the first download starts: the
+options it was started with, its engine and the state of every URL. After
+a crash or a quit from the tray the unfinished batches can be resumed, and
+jobs that were running at the time start again. The scheduler pulls jobs
+through StoredJobQueue in small windows, so a list of 100k URLs is never
+held in memory or in a widget at once.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+from fastwex_core import DownloadJob, JobQueue
+
+# Rows per INSERT when a batch is created from a long URL iterable
+INSERT_CHUNK = 5000
+
+
+class JobStore:
+    """SQLite file holding batches and their jobs
+
+    The connection is shared by the scheduler's worker threads, every access
+    goes through self.lock. WAL mode keeps the state written by a finished
+    job safe even when the app is killed right after.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS batches "
+                        "(id INTEGER PRIMARY KEY, created_at REAL, options TEXT, engine TEXT, max_workers INTEGER)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS jobs "
+                        "(batch_id INTEGER, position INTEGER, url TEXT, state TEXT, attempts INTEGER, "
+                        "error TEXT, output_path TEXT, updated_at REAL, PRIMARY KEY (batch_id, position))")
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (batch_id, state, position)")
+        self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def create_batch(self, urls, options, engine, max_workers):
+        """Store a new batch, urls may be any iterable; returns the batch id"""
+        with self.lock:
+            cursor = self.db.execute("INSERT INTO batches (created_at, options, engine, max_workers) VALUES (?, ?, ?, ?)",
+                                     (time.time(), json.dumps(options), engine, max_workers))
+            batch_id = cursor.lastrowid
+            rows = []
+            for position, url in enumerate(urls):
+                rows.append((batch_id, position, url, DownloadJob.PENDING, 0, "", "", 0))
+                if len(rows) >= INSERT_CHUNK:
+                    self.db.executemany("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    rows = []
+            self.db.executemany("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.commit()
+        return batch_id
+
+    def unfinished_batches(self):
+        """Batches with jobs left to run, newest first, as dicts"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT b.id, b.created_at, b.options, b.engine, b.max_workers, COUNT(j.position), "
+                "SUM(j.state IN (?, ?, ?)) FROM batches b JOIN jobs j ON j.batch_id = b.id "
+                "GROUP BY b.id ORDER BY b.id DESC",
+                (DownloadJob.PENDING, DownloadJob.RUNNING, DownloadJob.PAUSED)).fetchall()
+        return [
+            {"id": batch_id, "created_at": created_at, "options": json.loads(options), "engine": engine,
+             "max_workers": max_workers, "total": total, "remaining": remaining}
+            for batch_id, created_at, options, engine, max_workers, total, remaining in rows if remaining
+        ]
+
+    def queue(self, batch_id):
+        return StoredJobQueue(self, batch_id)
+
+    def jobs(self, batch_id):
+        """(url, state) of every job of a batch, in order"""
+        with self.lock:
+            return self.db.execute("SELECT url, state FROM jobs WHERE batch_id = ? ORDER BY position",
+                                   (batch_id,)).fetchall()
+
+    def delete_batch(self, batch_id):
+        with self.lock:
+            self.db.execute("DELETE FROM jobs WHERE batch_id = ?", (batch_id,))
+            self.db.execute("DELETE FROM batches WHERE id = ?", (batch_id,))
+            self.db.commit()
+
+
+class StoredJobQueue(JobQueue):
+    """JobQueue reading the jobs of one stored batch and writing their state back"""
+
+    def __init__(self, store, batch_id):
+        self.store = store
+        self.batch_id = batch_id
+        self._position = -1
+        self._claimed = set()
+        with store.lock:
+            # Jobs that were running or paused when the app went away start again
+            store.db.execute("UPDATE jobs SET state = ? WHERE batch_id = ? AND state IN (?, ?)",
+                             (DownloadJob.PENDING, batch_id, DownloadJob.RUNNING, DownloadJob.PAUSED))
+            store.db.commit()
+            self.total = store.db.execute("SELECT COUNT(*) FROM jobs WHERE batch_id = ?", (batch_id,)).fetchone()[0]
+
+    def counts(self):
+        with self.store.lock:
+            return dict(self.store.db.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE batch_id = ? AND state IN (?, ?) GROUP BY state",
+                (self.batch_id, DownloadJob.DONE, DownloadJob.FAILED)).fetchall())
+
+    def extend(self, urls):
+        rows = [(self.batch_id, position, url, DownloadJob.PENDING, 0, "", "", 0)
+                for position, url in enumerate(urls, self.total)]
+        with self.store.lock:
+            self.store.db.executemany("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.store.db.commit()
+        self.total += len(rows)
+        return len(rows)
+
+    def claim(self, index):
+        if index <= self._position or index in self._claimed:
+            return None
+        with self.store.lock:
+            row = self.store.db.execute(
+                "SELECT url, attempts FROM jobs WHERE batch_id = ? AND position = ? AND state = ?",
+                (self.batch_id, index, DownloadJob.PENDING)).fetchone()
+        if row is None:
+            return None
+        self._claimed.add(index)
+        job = DownloadJob(index, row[0])
+        job.attempts = row[1]
+        return job
+
+    def take(self, count):
+        jobs = []
+        while len(jobs) < count:
+            with self.store.lock:
+                rows = self.store.db.execute(
+                    "SELECT position, url, attempts FROM jobs WHERE batch_id = ? AND state = ? AND position > ? "
+                    "ORDER BY position LIMIT ?",
+                    (self.batch_id, DownloadJob.PENDING, self._position, count - len(jobs))).fetchall()
+            if not rows:
+                break
+            for position, url, attempts in rows:
+                if position in self._claimed:
+                    continue
+                job = DownloadJob(position, url)
+                job.attempts = attempts
+                jobs.append(job)
+            self._position = rows[-1][0]
+        return jobs
+
+    def update(self, job):
+        with self.store.lock:
+            self.store.db.execute(
+                "UPDATE jobs SET state = ?, attempts = ?, error = ?, output_path = ?, updated_at = ? "
+                "WHERE batch_id = ? AND position = ?",
+                (job.state, job.attempts, job.error, job.output_path, time.time(), self.batch_id, job.index))
+            self.store.db.commit()
+
+    def finish(self):
+        self.store.delete_batch(self.batch_id)
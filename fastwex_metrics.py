@@ -0,0 +1,202 @@
+"""Per-job performance metrics.
+
+Every finished job is written as one JSON line to a rotating metrics file:
+how long it waited in the queue, spent extracting the page, transferring,
+merging/transcoding and embedding, how many bytes it moved at what average
+and peak speed, its retries and the downloader's exit code. The recorder
+also keeps totals per host, printed as a table at the end of a batch and
+served in the Prometheus text format by MetricsServer for headless runs.
+"""
+import json
+import logging
+import logging.handlers
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fastwex_core import DownloadJob, HostTuner
+
+PHASES = ("queue", "extract", "transfer", "merge", "embed")
+
+
+def job_phases(job):
+    """Seconds of every phase of job's last attempt, 0 for phases it did not reach"""
+    def span(start, end):
+        return max(0.0, end - start) if start and end else 0.0
+
+    if job.transfer_started_at:
+        extract = span(job.started_at, job.transfer_started_at)
+    else:
+        # Nothing was transferred: a cached file, an archive skip or an error
+        extract = span(job.started_at, job.download_finished_at)
+    if "merge" in job.postprocess_timings:
+        merge = job.postprocess_timings["merge"]
+    else:
+        # yt-dlp's own merger and embedders run between the last progress line and the exit
+        merge = span(job.transfer_finished_at, job.download_finished_at)
+    return {
+        "queue": span(job.queued_at, job.started_at),
+        "extract": extract,
+        "transfer": span(job.transfer_started_at, job.transfer_finished_at),
+        "merge": merge,
+        "embed": job.postprocess_timings.get("embed", 0.0),
+    }
+
+
+class _HostTotals:
+    def __init__(self):
+        self.jobs = 0
+        self.failed = 0
+        self.retries = 0
+        self.bytes = 0
+        self.transfer_seconds = 0.0
+        self.peak_speed = 0.0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+
+    def add(self, record):
+        self.jobs += 1
+        self.failed += record["state"] == DownloadJob.FAILED
+        self.retries += record["retries"]
+        self.bytes += record["bytes"]
+        self.transfer_seconds += record["phases"]["transfer"]
+        self.peak_speed = max(self.peak_speed, record["peak_speed"])
+        for phase in PHASES:
+            self.phases[phase] += record["phases"][phase]
+
+    @property
+    def average_speed(self):
+        return self.bytes / self.transfer_seconds if self.transfer_seconds else 0.0
+
+
+class MetricsRecorder:
+    """Writes finished jobs to path as JSON lines and keeps per-host totals
+
+    The file is rotated at max_bytes keeping backups old files (path.1 ...).
+    record is called from the scheduler's threads, the totals are guarded
+    by self.lock.
+    """
+    DEFAULT_MAX_BYTES = 5 * 1024 ** 2
+    DEFAULT_BACKUPS = 3
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS):
+        self.path = path
+        self.lock = threading.Lock()
+        self.handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                            encoding="utf-8", delay=True)
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+        # Totals since the recorder was made, and of the current batch
+        self.hosts = {}
+        self.batch_hosts = {}
+
+    def close(self):
+        with self.lock:
+            self.handler.close()
+
+    def start_batch(self):
+        with self.lock:
+            self.batch_hosts = {}
+
+    def record(self, job, engine=""):
+        """Add a finished job, returns the record written"""
+        phases = job_phases(job)
+        record = {
+            "ts": round(time.time(), 3),
+            "url": job.url,
+            "host": HostTuner.host(job.url),
+            "state": job.state,
+            "attempts": job.attempts,
+            "retries": max(0, job.attempts - 1),
+            "exit_code": job.exit_code,
+            "error": job.error,
+            "bytes": job.downloaded_bytes,
+            "avg_speed": round(job.downloaded_bytes / phases["transfer"]) if phases["transfer"] else 0,
+            "peak_speed": round(job.peak_speed),
+            "phases": {phase: round(seconds, 3) for phase, seconds in phases.items()},
+            "postprocess_method": job.postprocess_method,
+            "info_cached": job.info_cached,
+            "engine": engine,
+        }
+        with self.lock:
+            for hosts in (self.hosts, self.batch_hosts):
+                hosts.setdefault(record["host"], _HostTotals()).add(record)
+            self.handler.emit(logging.makeLogRecord({"msg": json.dumps(record, ensure_ascii=False)}))
+        return record
+
+    def format_summary(self):
+        """Table of the current batch per host, "" when it has no jobs"""
+        with self.lock:
+            rows = sorted(self.batch_hosts.items(), key=lambda item: -item[1].jobs)
+        if not rows:
+            return ""
+        header = f"{'Site':<24} {'İş':>5} {'Hata':>5} {'Tekrar':>6} {'MB':>9} {'Ort. MB/s':>9} {'Tepe MB/s':>9}" + \
+                 "".join(f" {phase:>9}" for phase in PHASES)
+        lines = [header, "-" * len(header)]
+        for host, totals in rows:
+            lines.append(
+                f"{host[:24]:<24} {totals.jobs:>5} {totals.failed:>5} {totals.retries:>6} "
+                f"{totals.bytes / 1024 ** 2:>9.1f} {totals.average_speed / 1024 ** 2:>9.2f} "
+                f"{totals.peak_speed / 1024 ** 2:>9.2f}" +
+                # Mean seconds per job
+                "".join(f" {totals.phases[phase] / totals.jobs:>8.2f}s" for phase in PHASES))
+        return "\n".join(lines)
+
+    def prometheus(self):
+        """Totals since start in the Prometheus text exposition format"""
+        with self.lock:
+            hosts = sorted(self.hosts.items())
+        metrics = [
+            ("fastwex_jobs_total", "counter", "Finished jobs", lambda t: t.jobs),
+            ("fastwex_jobs_failed_total", "counter", "Failed jobs", lambda t: t.failed),
+            ("fastwex_retries_total", "counter", "Retried attempts", lambda t: t.retries),
+            ("fastwex_downloaded_bytes_total", "counter", "Downloaded bytes", lambda t: t.bytes),
+            ("fastwex_transfer_speed_bytes", "gauge", "Average transfer speed", lambda t: t.average_speed),
+            ("fastwex_peak_speed_bytes", "gauge", "Highest speed seen", lambda t: t.peak_speed),
+        ]
+        lines = []
+        for name, kind, help_text, value in metrics:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{host="{_label(host)}"}} {_number(value(totals))}' for host, totals in hosts]
+        name = "fastwex_phase_seconds_total"
+        lines += [f"# HELP {name} Seconds spent per phase", f"# TYPE {name} counter"]
+        for host, totals in hosts:
+            lines += [f'{name}{{host="{_label(host)}",phase="{phase}"}} {_number(totals.phases[phase])}'
+                      for phase in PHASES]
+        return "\n".join(lines) + "\n"
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else f"{value:.3f}"
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsServer:
+    """Serves GET /metrics of a MetricsRecorder on host:port from a daemon thread"""
+
+    def __init__(self, recorder, port, host="127.0.0.1"):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = recorder.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,132 @@
+"""Streaming playlist and channel expansion.
+
+yt-dlp --flat-playlist --lazy-playlist prints the entries of a playlist or
+channel page by page while it lists them, without extracting any video.
+PlaylistExpander reads them as they come and hands the new ones over in
+small groups (JobScheduler.extend), so the first videos are downloading
+while later pages are still being listed. Entries already in the download
+archive or listed before are dropped on the way, by the same
+"<extractor> <id>" key yt-dlp's --download-archive uses.
+"""
+import subprocess
+import threading
+import time
+
+from fastwex_archive import canonical_key
+
+# Hide the console window of yt-dlp on Windows
+NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+ENTRY_MARKER = "FWX-ENTRY "
+# --print template of one entry: extractor, id and URL; flat entries only have url, videos webpage_url
+ENTRY_TEMPLATE = ENTRY_MARKER + "%(ie_key,extractor_key|NA)s %(id|NA)s %(webpage_url,url|NA)s"
+
+
+def parse_entry(line):
+    """(archive key, url) of an ENTRY_TEMPLATE line, None for other lines and entries without a URL"""
+    if not line.startswith(ENTRY_MARKER):
+        return None
+    parts = line[len(ENTRY_MARKER):].strip().split(" ", 2)
+    if len(parts) != 3 or "://" not in parts[2]:
+        return None
+    extractor, video_id, url = parts
+    if extractor != "NA" and video_id != "NA":
+        return f"{extractor.lower()} {video_id}", url
+    return canonical_key(url), url
+
+
+class ExpandListener:
+    """Callbacks of PlaylistExpander, called from the thread running it"""
+
+    def on_entries(self, urls):
+        """New entries, in playlist order"""
+        pass
+
+
+class PlaylistExpander:
+    """Runs build_playlist_command commands and passes new entries to the listener
+
+    The first entry is passed on at once, later ones in groups of up to
+    GROUP or every FLUSH_INTERVAL seconds, whichever comes first. seen holds
+    keys that count as listed already, e.g. the URLs queued by hand.
+    """
+    GROUP = 25
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, archive=None, listener=None, seen=()):
+        self.archive = archive
+        self.listener = listener or ExpandListener()
+        self.seen = set(seen)
+        self.listed = 0
+        self.added = 0
+        self.archived = 0
+        self.duplicates = 0
+        self._cancelled = threading.Event()
+        self._process = None
+        if archive is not None:
+            archive.sync()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+
+    def run(self, command):
+        """List one playlist or channel, returns (success, error message)"""
+        error_message = ""
+        group = []
+        flushed = 0.0
+        try:
+            self._process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                # One pipe: a full stderr buffer can not stall the listing
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                encoding="utf-8",
+                errors="replace",
+                creationflags=NO_WINDOW
+            )
+            for line in self._process.stdout:
+                line = line.strip()
+                if self._cancelled.is_set():
+                    break
+                if line.startswith("ERROR:"):
+                    error_message = line[len("ERROR:"):].strip()
+                    continue
+                entry = parse_entry(line)
+                if entry is None:
+                    continue
+                self.listed += 1
+                group.append(entry)
+                if not flushed or len(group) >= self.GROUP or time.monotonic() - flushed >= self.FLUSH_INTERVAL:
+                    self._flush(group)
+                    group = []
+                    flushed = time.monotonic()
+            self._process.wait()
+            if self._process.returncode != 0 and not error_message and not self._cancelled.is_set():
+                error_message = f"yt-dlp çıkış kodu {self._process.returncode}"
+        except Exception as e:
+            error_message = str(e)
+        if group and not self._cancelled.is_set():
+            self._flush(group)
+
+        if self._cancelled.is_set():
+            error_message = error_message or "İptal edildi"
+        # --ignore-errors: unavailable entries fail the exit code, the listing itself may be fine
+        return not self._cancelled.is_set() and (not error_message or self.listed > 0), error_message
+
+    def _flush(self, entries):
+        new = []
+        for key, url in entries:
+            if key in self.seen:
+                self.duplicates += 1
+                continue
+            self.seen.add(key)
+            new.append((key, url))
+        if self.archive is not None and new:
+            archived = self.archive.archived_keys([key for key, _ in new])
+            self.archived += len(archived)
+            new = [(key, url) for key, url in new if key not in archived]
+        if new:
+            self.added += len(new)
+            self.listener.on_entries([url for _, url in new])
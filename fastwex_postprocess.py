@@ -0,0 +1,427 @@
+"""ffmpeg post-processing outside of yt-dlp.
+
+With separate post-processing yt-dlp only downloads: the video and audio
+of an MP4 as two files, the best audio for MP3, thumbnails and subtitles
+as the site serves them. The lines yt-dlp prints through
+POSTPROCESS_TEMPLATE tell the scheduler which files a job left behind, and
+once the download is done it hands them to PostProcessor. Its ffmpeg work
+queue runs one job per CPU core, so the download slot is free for the next
+URL while the previous one is merged, transcoded or gets its thumbnail
+embedded.
+
+MediaProbe looks at the codecs of the downloaded streams first: streams
+the target container can hold are copied as they are, which takes seconds,
+and only the others are transcoded.
+
+ffmpeg runs on the event loop of fastwex_process.ProcessReactor like the
+downloaders, in a process group of its own: the PostprocessTask submit()
+returns kills it with its children when a job is paused, cancelled or the
+scheduler stops.
+"""
+import json
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+
+from fastwex_process import default_reactor
+
+# Hide the console window of ffmpeg on Windows
+NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+# yt-dlp prints the final path of every file of a download once MoveFiles has run
+POSTPROCESS_MARKER = "FWXPP "
+POSTPROCESS_TEMPLATE = ("postprocess:" + POSTPROCESS_MARKER + '{"status":"%(progress.status)s",'
+                        '"postprocessor":"%(progress.postprocessor)s","files":%(info.__files_to_move)j}')
+
+THUMBNAIL_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+SUBTITLE_EXTS = {".vtt", ".srt", ".ass", ".ssa", ".ttml", ".dfxp", ".srv1", ".srv2", ".srv3", ".json3", ".lrc"}
+# Subtitle formats ffmpeg can read and turn into SRT
+CONVERTIBLE_SUBTITLE_EXTS = {".vtt", ".ass", ".ssa"}
+# Containers that take a thumbnail as an attached picture
+EMBED_THUMBNAIL_EXTS = {".mp4", ".m4a", ".mp3"}
+# Codecs the target containers hold without transcoding
+COPY_CODECS = {
+    ".mp4": {"video": {"h264", "hevc", "av1", "vp9", "mpeg4"},
+             "audio": {"aac", "mp3", "opus", "flac", "alac", "ac3", "eac3"}},
+    ".mp3": {"audio": {"mp3"}},
+}
+# COPY_CODECS with options.compatible_codecs: AV1, VP9, Opus and FLAC in MP4 play in browsers and
+# current players, older players, TVs and editors refuse them
+COMPATIBLE_COPY_CODECS = {
+    ".mp4": {"video": {"h264", "hevc", "mpeg4"},
+             "audio": {"aac", "mp3", "alac", "ac3", "eac3"}},
+    ".mp3": {"audio": {"mp3"}},
+}
+# Encoders for streams that have to be transcoded
+TRANSCODE_ARGUMENTS = {
+    (".mp4", "video"): ["libx264", "-preset", "veryfast", "-crf", "20", "-pix_fmt", "yuv420p"],
+    (".mp4", "audio"): ["aac", "-b:a", "192k"],
+    (".mp3", "audio"): ["libmp3lame", "-q:a", "0"],
+}
+# "Stream #0:1[0x2](und): Audio: opus (Opus / 0x7375704F), ..." in ffmpeg -i output
+FFMPEG_STREAM = re.compile(r'Stream #\d+:(?P<index>\d+)\S*: (?P<type>Video|Audio|Subtitle|Data|Attachment): (?P<codec>\w+)')
+# ".f<format id>" that tells the separately downloaded formats of one video apart
+FORMAT_SUFFIX = re.compile(r'\.f[^.\\/]+$')
+# Error of a task whose ffmpeg work was killed
+STOPPED = "ffmpeg durduruldu"
+
+
+def parse_moved_files(line):
+    """Final paths from a POSTPROCESS_TEMPLATE line, [] for other postprocessor lines, None for other output"""
+    if not line.startswith(POSTPROCESS_MARKER):
+        return None
+    try:
+        data = json.loads(line[len(POSTPROCESS_MARKER):])
+    except ValueError:
+        return []
+    if not isinstance(data, dict) or data.get("postprocessor") != "MoveFiles" or data.get("status") != "finished":
+        return []
+    files = data.get("files")
+    if not isinstance(files, dict):
+        return []
+    return [os.path.abspath(path) for path in files.values() if path]
+
+
+def output_base(path):
+    """Path without its extension and without the .f<format id> of a separately downloaded format"""
+    return FORMAT_SUFFIX.sub("", os.path.splitext(path)[0])
+
+
+class PostprocessError(RuntimeError):
+    pass
+
+
+class MediaProbe:
+    """Streams of media files as (index, type, codec) tuples, from ffprobe or else ffmpeg -i
+
+    Results are cached per path, size and modification time, so every
+    step working on the same file probes it once.
+    """
+    MAX_ENTRIES = 1024
+
+    def __init__(self, ffprobe_path, ffmpeg_path):
+        self.ffprobe_path = ffprobe_path
+        self.ffmpeg_path = ffmpeg_path
+        self.lock = threading.Lock()
+        self._cache = {}
+
+    def streams(self, path):
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            if key in self._cache:
+                return self._cache[key]
+        streams = None
+        if self.ffprobe_path:
+            try:
+                streams = self._ffprobe(path)
+            except OSError:
+                # e.g. the bundled ffprobe.exe on another OS
+                self.ffprobe_path = None
+        if streams is None:
+            try:
+                streams = self._ffmpeg(path)
+            except OSError as e:
+                raise PostprocessError(f"ffmpeg çalıştırılamadı: {e}") from e
+        if not streams:
+            raise PostprocessError(f"Akışlar okunamadı: {os.path.basename(path)}")
+        with self.lock:
+            if len(self._cache) >= self.MAX_ENTRIES:
+                self._cache.clear()
+            self._cache[key] = streams
+        return streams
+
+    def _ffprobe(self, path):
+        result = subprocess.run(
+            [self.ffprobe_path, "-v", "error", "-of", "json",
+             "-show_entries", "stream=index,codec_type,codec_name:stream_disposition=attached_pic", path],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True, errors="replace",
+            creationflags=NO_WINDOW)
+        try:
+            data = json.loads(result.stdout)
+        except ValueError:
+            return []
+        return [(stream.get("index"), stream.get("codec_type"), stream.get("codec_name"))
+                for stream in data.get("streams", [])
+                # Cover art shows up as a video stream
+                if not stream.get("disposition", {}).get("attached_pic")]
+
+    def _ffmpeg(self, path):
+        # Without an output ffmpeg exits with an error after printing the input's streams
+        result = subprocess.run([self.ffmpeg_path, "-hide_banner", "-nostdin", "-i", path],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True,
+                                errors="replace", creationflags=NO_WINDOW)
+        streams = []
+        for line in result.stderr.splitlines():
+            match = FFMPEG_STREAM.search(line)
+            if match and "(attached pic)" not in line:
+                streams.append((int(match.group("index")), match.group("type").lower(), match.group("codec")))
+        return streams
+
+
+class PostprocessTask:
+    """Handle of the files given to PostProcessor.submit, kill() and wait() like fastwex_process.RunningProcess"""
+
+    def __init__(self, files, on_log, on_done):
+        self.files = files
+        self.on_log = on_log
+        self.on_done = on_done
+        self.killed = False
+        # RunningProcess of the ffmpeg command that is running for the task
+        self.process = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def kill(self):
+        """Drop the task, or kill its ffmpeg process tree when it runs; on_done reports STOPPED"""
+        with self._lock:
+            self.killed = True
+            process = self.process
+        if process is not None:
+            process.kill()
+
+    def wait(self, timeout=None):
+        """Block until on_done has been called, False on timeout"""
+        return self._done.wait(timeout)
+
+    def _attach(self, process):
+        with self._lock:
+            self.process = process
+            killed = self.killed
+        if killed:
+            # kill() came while the command was being started
+            process.kill()
+
+
+class PostProcessor:
+    """ffmpeg work queue for the files of finished downloads
+
+    options is the DownloadOptions the batch was started with. Jobs are
+    run by up to workers threads, each waiting on one ffmpeg process that
+    runs on reactor (fastwex_process.ProcessReactor).
+    """
+
+    def __init__(self, ffmpeg_path, options, workers=None, probe=None, reactor=None):
+        self.ffmpeg_path = ffmpeg_path
+        self.options = options
+        self.probe = probe or MediaProbe(None, ffmpeg_path)
+        self.workers = max(1, workers or os.cpu_count() or 2)
+        self.reactor = reactor or default_reactor()
+        self._tasks = queue.Queue()
+        self._threads = []
+        # Tasks submitted and not done yet
+        self._pending = set()
+        self._lock = threading.Lock()
+        # Task of the worker thread, run() attaches its ffmpeg process to it
+        self._local = threading.local()
+
+    def submit(self, files, on_log, on_done):
+        """Process files in the background, then on_done(success, error message, output path, method, timings)
+
+        method is how the media was made: "copy" for a stream copy, "transcode",
+        or "" when the downloaded file was kept as it is. timings has the
+        seconds spent on the "merge" and "embed" steps. Returns the
+        PostprocessTask of files.
+        """
+        task = PostprocessTask(list(files), on_log, on_done)
+        with self._lock:
+            self._pending.add(task)
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        self._tasks.put(task)
+        return task
+
+    def close(self):
+        """End the worker threads, ffmpeg work still queued or running is killed"""
+        with self._lock:
+            for _ in self._threads:
+                self._tasks.put(None)
+            self._threads = []
+            pending = list(self._pending)
+        for task in pending:
+            task.kill()
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            self._local.task = task
+            timings = {}
+            try:
+                if task.killed:
+                    raise PostprocessError(STOPPED)
+                output_path, method = self.process(task.files, task.on_log, timings)
+            except Exception as e:
+                task.on_done(False, str(e), "", "", timings)
+            else:
+                task.on_done(True, "", output_path, method, timings)
+            finally:
+                self._local.task = None
+                with self._lock:
+                    self._pending.discard(task)
+                task._done.set()
+
+    def process(self, files, on_log=None, timings=None):
+        """Run every step the options ask for on files, returns (final media path, method)
+
+        The seconds each step took are added to timings if it is given.
+        """
+        on_log = on_log or (lambda message: None)
+        timings = {} if timings is None else timings
+        media, thumbnails, subtitles = [], [], []
+        for path in dict.fromkeys(files):
+            if not os.path.exists(path):
+                continue
+            ext = os.path.splitext(path)[1].lower()
+            if ext in THUMBNAIL_EXTS:
+                thumbnails.append(path)
+            elif ext in SUBTITLE_EXTS:
+                subtitles.append(path)
+            else:
+                media.append(path)
+        if not media:
+            raise PostprocessError("İndirilen dosya bulunamadı")
+
+        started = time.monotonic()
+        output_path, method = self._media(media, on_log)
+        for path in subtitles:
+            self._subtitle(path, on_log)
+        timings["merge"] = time.monotonic() - started
+        if thumbnails:
+            started = time.monotonic()
+            self._thumbnail(output_path, thumbnails[0], on_log)
+            timings["embed"] = time.monotonic() - started
+        return output_path, method
+
+    def _media(self, media, on_log):
+        base = output_base(media[0])
+        target = "." + self.options.format if self.options.format in ("mp4", "mp3") else None
+        if target is None:
+            return self._rename(media[0], base + os.path.splitext(media[0])[1]), ""
+
+        # First video and first audio stream over all downloaded files
+        selected = {}
+        for path in media:
+            for index, codec_type, codec in self.probe.streams(path):
+                if codec_type in ("video", "audio") and codec_type not in selected:
+                    selected[codec_type] = (path, index, codec)
+        if target == ".mp3":
+            selected.pop("video", None)
+        if not selected or (target == ".mp3" and "audio" not in selected):
+            raise PostprocessError("Uygun video veya ses akışı bulunamadı")
+
+        output_path = base + target
+        copy_codecs = (COMPATIBLE_COPY_CODECS if self.options.compatible_codecs else COPY_CODECS)[target]
+        copy = all(codec in copy_codecs.get(codec_type, ()) for codec_type, (_, _, codec) in selected.items())
+        if copy and len(media) == 1 and media[0].lower().endswith(target):
+            # Already what was asked for
+            return self._rename(media[0], output_path), ""
+
+        inputs = list(dict.fromkeys(path for path, _, _ in selected.values()))
+        arguments = []
+        for path in inputs:
+            arguments += ["-i", path]
+        descriptions = []
+        for codec_type in ("video", "audio"):
+            if codec_type not in selected:
+                continue
+            path, index, codec = selected[codec_type]
+            arguments += ["-map", f"{inputs.index(path)}:{index}"]
+            stream = codec_type[0]
+            if codec in copy_codecs.get(codec_type, ()):
+                arguments += [f"-c:{stream}", "copy"]
+                descriptions.append(codec)
+            else:
+                arguments += [f"-c:{stream}"] + TRANSCODE_ARGUMENTS[(target, codec_type)]
+                descriptions.append(f"{codec}→{TRANSCODE_ARGUMENTS[(target, codec_type)][0]}")
+        if target == ".mp4":
+            arguments += ["-movflags", "+faststart"]
+
+        method = "copy" if copy else "transcode"
+        action = "kopyalanıyor" if copy else "dönüştürülüyor"
+        on_log(f"⚙️ {os.path.basename(output_path)} {action} ({', '.join(descriptions)})")
+        temp_path = base + ".temp" + target
+        self.run(arguments, temp_path)
+        self._remove(media)
+        os.replace(temp_path, output_path)
+        return output_path, method
+
+    @staticmethod
+    def _rename(path, output_path):
+        if output_path != path:
+            os.replace(path, output_path)
+        return output_path
+
+    def _subtitle(self, path, on_log):
+        if os.path.splitext(path)[1].lower() not in CONVERTIBLE_SUBTITLE_EXTS:
+            return
+        output_path = os.path.splitext(path)[0] + ".srt"
+        on_log(f"⚙️ Altyazı SRT'ye dönüştürülüyor: {os.path.basename(output_path)}")
+        self.run(["-i", path], output_path)
+        self._remove([path])
+
+    def _thumbnail(self, media_path, path, on_log):
+        if self.options.write_thumbnail and os.path.splitext(path)[1].lower() not in (".jpg", ".jpeg"):
+            jpg_path = os.path.splitext(path)[0] + ".jpg"
+            self.run(["-i", path], jpg_path)
+            self._remove([path])
+            path = jpg_path
+
+        ext = os.path.splitext(media_path)[1].lower()
+        if self.options.embed_thumbnail:
+            if ext in EMBED_THUMBNAIL_EXTS:
+                on_log(f"⚙️ Küçük resim ekleniyor: {os.path.basename(media_path)}")
+                temp_path = os.path.splitext(media_path)[0] + ".temp" + ext
+                if ext == ".mp4":
+                    arguments = ["-map", "0", "-map", "1:0", "-c", "copy", "-c:v:1", "mjpeg",
+                                 "-disposition:v:1", "attached_pic"]
+                else:
+                    arguments = ["-map", "0:a", "-map", "1:0", "-c:a", "copy", "-c:v", "mjpeg",
+                                 "-disposition:v:0", "attached_pic"]
+                    if ext == ".mp3":
+                        arguments += ["-id3v2_version", "3"]
+                self.run(["-i", media_path, "-i", path] + arguments, temp_path)
+                os.replace(temp_path, media_path)
+            else:
+                on_log(f"⚠️ {ext} dosyasına küçük resim eklenemiyor")
+        if not self.options.write_thumbnail:
+            self._remove([path])
+
+    def run(self, arguments, output_path):
+        """ffmpeg arguments... output_path, raises PostprocessError with ffmpeg's last error line
+
+        On a worker thread the process belongs to the thread's task, and
+        PostprocessError(STOPPED) is raised once that has been killed.
+        """
+        task = getattr(self._local, "task", None)
+        if task is not None and task.killed:
+            raise PostprocessError(STOPPED)
+        command = [self.ffmpeg_path, "-y", "-hide_banner", "-nostdin", "-loglevel", "error"] + arguments + [output_path]
+        lines, result = [], []
+        process = self.reactor.spawn(command, lambda line, stderr: lines.append(line),
+                                     lambda returncode, error: result.append((returncode, error)))
+        if task is not None:
+            task._attach(process)
+        process.wait()
+        returncode, error = result[0]
+        if returncode is None:
+            raise PostprocessError(f"ffmpeg çalıştırılamadı: {error}")
+        if returncode != 0:
+            self._remove([output_path])
+            if task is not None and task.killed:
+                raise PostprocessError(STOPPED)
+            raise PostprocessError(f"ffmpeg: {lines[-1] if lines else f'çıkış kodu {returncode}'}")
+
+    @staticmethod
+    def _remove(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,176 @@
+"""Event-driven child processes.
+
+ProcessReactor runs downloader processes as asyncio subprocesses on one
+event loop thread. stdout and stderr of every process are read as their
+lines arrive, so a process that fills one pipe while the other is being
+waited on can not hang, and any number of running processes costs that
+single thread instead of one blocked thread per process.
+
+Every command starts as the leader of its own process group, so killing it
+takes down the ffmpeg and aria2c processes yt-dlp started as well.
+"""
+import asyncio
+import concurrent.futures
+import locale
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+# Hide the console window of child processes on Windows
+NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+# Longest output line read at once, info JSON printed by --print can be large
+LINE_LIMIT = 16 * 1024 ** 2
+# What universal_newlines=True decoded with
+ENCODING = locale.getpreferredencoding(False)
+# A new session makes the process the leader of its group, os.killpg reaches its children
+PROCESS_GROUP = {} if sys.platform == "win32" else {"start_new_session": True}
+
+
+def _use_pidfd_watcher(loop):
+    """Watch children through pidfds on Linux before Python 3.12 (the default there)
+
+    The default ThreadedChildWatcher of older versions starts one waiting
+    thread per process, which is what this module avoids. Only this loop
+    starts subprocesses with asyncio in FastweX.
+    """
+    if sys.platform == "win32" or sys.version_info >= (3, 12) or not hasattr(os, "pidfd_open"):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        # Kernel older than 5.3, keep the default watcher
+        return
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(loop)
+    asyncio.set_child_watcher(watcher)
+
+
+async def kill_tree(pid):
+    """Kill process pid and every process it started"""
+    if sys.platform == "win32":
+        # taskkill /T follows the parent ids down to the children
+        process = await asyncio.create_subprocess_exec(
+            "taskkill", "/F", "/T", "/PID", str(pid),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=NO_WINDOW)
+        await process.wait()
+        return
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class RunningProcess:
+    """Handle of a command started by ProcessReactor.spawn"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.process = None
+        self.killed = False
+        self.future = None
+
+    def kill(self):
+        """Kill the process tree from any thread, on_exit follows once it is gone"""
+        self.loop.call_soon_threadsafe(self._kill)
+
+    def wait(self, timeout=None):
+        """Block until on_exit has been called, False on timeout"""
+        done, _ = concurrent.futures.wait([self.future], timeout)
+        return bool(done)
+
+    def _kill(self):
+        self.killed = True
+        if self.process is not None and self.process.returncode is None:
+            self.loop.create_task(kill_tree(self.process.pid))
+
+
+class ProcessReactor:
+    """Runs commands on a shared event loop, output lines and exits go to callbacks
+
+    The loop thread starts with the first command. Callbacks are called on
+    that thread, a slow callback holds up the output of every process.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._loop is None:
+                # A ProactorEventLoop on Windows, it runs subprocesses without a selector
+                loop = asyncio.new_event_loop()
+                _use_pidfd_watcher(loop)
+                threading.Thread(target=loop.run_forever, name="fastwex-processes", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def spawn(self, command, on_line, on_exit, merge_stderr=False):
+        """Start command, returns its RunningProcess
+
+        on_line(line, stderr) gets every non-empty output line, on_exit(exit
+        code, error) is called once at the end; exit code is None and error
+        set when the process could not be started or a callback raised.
+        A killed process ends with a negative exit code (POSIX) or 1.
+        With merge_stderr both streams arrive in the order they were written,
+        as stdout lines.
+        """
+        loop = self._start()
+        handle = RunningProcess(loop)
+        handle.future = asyncio.run_coroutine_threadsafe(
+            self._run(handle, command, on_line, on_exit, merge_stderr), loop)
+        return handle
+
+    async def _run(self, handle, command, on_line, on_exit, merge_stderr):
+        process = None
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+                limit=LINE_LIMIT,
+                creationflags=NO_WINDOW,
+                **PROCESS_GROUP
+            )
+            handle.process = process
+            if handle.killed:
+                # kill() came before the process existed
+                await kill_tree(process.pid)
+            readers = [self._read(process.stdout, on_line, False)]
+            if not merge_stderr:
+                readers.append(self._read(process.stderr, on_line, True))
+            await asyncio.gather(*readers)
+            returncode = await process.wait()
+        except Exception as e:
+            if process is not None and process.returncode is None:
+                await kill_tree(process.pid)
+                await process.wait()
+            on_exit(None, str(e))
+            return None
+        on_exit(returncode, "")
+        return returncode
+
+    @staticmethod
+    async def _read(stream, on_line, stderr):
+        async for raw in stream:
+            # yt-dlp ends progress lines with \r without --newline
+            for line in raw.decode(ENCODING, errors="replace").replace("\r", "\n").split("\n"):
+                line = line.strip()
+                if line:
+                    on_line(line, stderr)
+
+
+_default_reactor = None
+_default_lock = threading.Lock()
+
+
+def default_reactor():
+    """The ProcessReactor shared by every scheduler of the process"""
+    global _default_reactor
+    with _default_lock:
+        if _default_reactor is None:
+            _default_reactor = ProcessReactor()
+        return _default_reactor
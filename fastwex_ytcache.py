@@ -0,0 +1,226 @@
+"""Shared yt-dlp cache directory and cookie jar.
+
+yt-dlp keeps what it works out once per site - YouTube's player signature
+functions, extractor tokens - in its --cache-dir. Every FastweX job uses
+the same managed directory under base_dir (yt-dlp replaces cache entries
+atomically, concurrent processes can share it), and YtDlpCache.prewarm
+fills it in the background at startup, so short videos do not each pay
+for solving the player again.
+
+A --cookies file can not be shared as such: yt-dlp writes the whole jar
+back when it exits and concurrent processes would drop each other's
+cookies. CookieJar hands every process its own copy and merges the
+cookies it changed back into the shared file under a lock.
+"""
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from fastwex_process import default_reactor
+
+# Short, long-lived video whose extraction solves the current YouTube player
+PREWARM_URL = "https://www.youtube.com/watch?v=jNQXAC9IVRw"
+# YouTube rotates its player about daily
+PREWARM_INTERVAL = 12 * 3600
+# Copies of a process that never checked in (killed app), older than any running job
+STALE_COPY_AGE = 24 * 3600
+COOKIE_HEADER = "# Netscape HTTP Cookie File\n"
+# "[youtube] Extracting URL: ..." names the extractor of a job
+EXTRACTING_RE = re.compile(r"^\[(?P<extractor>[\w]+)(?::[\w:]+)?\] Extracting URL:")
+
+
+def parse_extractor(line):
+    """Extractor name of a yt-dlp "Extracting URL" line ("youtube"), or None"""
+    match = EXTRACTING_RE.match(line)
+    return match.group("extractor").lower() if match else None
+
+
+class YtDlpCache:
+    """The --cache-dir of every job, with hit and miss counts
+
+    A job counts as a hit when its extractor already had entries in the
+    cache when it started (cache sections are named after the extractor,
+    e.g. "youtube-nsig"), and as a miss when it had none and left some.
+    Jobs of sites that do not use the cache are not counted.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.stamp_path = os.path.join(cache_dir, ".prewarmed")
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def arguments(self):
+        return ["--cache-dir", self.cache_dir]
+
+    def sections(self):
+        """Names of the cache sections that hold at least one entry"""
+        sections = set()
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir() and os.listdir(entry.path):
+                        sections.add(entry.name)
+        except OSError:
+            pass
+        return sections
+
+    def record(self, extractor, sections_before):
+        """Count a finished job of extractor that started with sections_before, returns "hit", "miss" or None"""
+        if not extractor:
+            return None
+        if any(section.startswith(extractor) for section in sections_before):
+            result = "hit"
+        elif any(section.startswith(extractor) for section in self.sections()):
+            result = "miss"
+        else:
+            return None
+        with self.lock:
+            if result == "hit":
+                self.hits += 1
+            else:
+                self.misses += 1
+        return result
+
+    def start_batch(self):
+        with self.lock:
+            self.hits = self.misses = 0
+
+    def format_summary(self):
+        """One log line with the counts since start_batch, empty when no job used the cache"""
+        with self.lock:
+            if not self.hits and not self.misses:
+                return ""
+            return f"🗄️ yt-dlp önbelleği: {self.hits} isabet, {self.misses} ıska"
+
+    def stale(self, now=None):
+        """True when the last successful prewarm is older than PREWARM_INTERVAL"""
+        try:
+            return (now or time.time()) - os.path.getmtime(self.stamp_path) > PREWARM_INTERVAL
+        except OSError:
+            return True
+
+    def prewarm(self, yt_dlp_path, on_done=None, url=PREWARM_URL):
+        """Extract url once in the background so the player is solved before the first job
+
+        Runs on the shared ProcessReactor, no thread is started. Returns its
+        RunningProcess, None without running anything when the cache is
+        still fresh. on_done(success, error) is called from the reactor thread.
+        """
+        if not self.stale():
+            return None
+        errors = []
+
+        def on_line(line, stderr):
+            if line.startswith("ERROR:"):
+                errors.append(line[len("ERROR:"):].strip())
+
+        def on_exit(returncode, error):
+            success = returncode == 0 and not error
+            if success:
+                with open(self.stamp_path, "w", encoding="utf-8") as f:
+                    f.write(url)
+            if on_done:
+                on_done(success, error or (errors[-1] if errors else ""))
+
+        command = [yt_dlp_path, *self.arguments(), "--simulate", "--no-playlist", "--no-warnings", url]
+        return default_reactor().spawn(command, on_line, on_exit)
+
+
+def read_cookies(path):
+    """Cookie lines of a Netscape cookies file by (domain, path, name), {} when there is none"""
+    cookies = {}
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                # "#HttpOnly_" marks a cookie line, any other "#" line is a comment
+                if not line.strip() or (line.startswith("#") and not line.startswith("#HttpOnly_")):
+                    continue
+                fields = line.split("\t")
+                if len(fields) == 7:
+                    domain = fields[0][len("#HttpOnly_"):] if line.startswith("#HttpOnly_") else fields[0]
+                    cookies[(domain, fields[2], fields[5])] = line
+    except OSError:
+        pass
+    return cookies
+
+
+def expired(line, now):
+    expires = line.split("\t")[4]
+    # 0 or empty: a session cookie
+    return expires.isdigit() and 0 < int(expires) < now
+
+
+class CookieJar:
+    """cookies.txt shared by concurrent yt-dlp processes
+
+    checkout() copies the jar for one process (--cookies copy), checkin()
+    merges what the process added, changed or removed back into the jar
+    and deletes the copy. A process that was killed never wrote its copy,
+    so checking it in changes nothing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.work_dir = path + ".jobs"
+        self.lock = threading.Lock()
+        # Cookies of every checked out copy as they were handed out
+        self._checked_out = {}
+        os.makedirs(self.work_dir, exist_ok=True)
+        self._remove_stale_copies()
+
+    def checkout(self):
+        """Path of a private copy of the jar"""
+        fd, copy = tempfile.mkstemp(prefix="job-", suffix=".txt", dir=self.work_dir)
+        os.close(fd)
+        with self.lock:
+            if os.path.exists(self.path):
+                shutil.copyfile(self.path, copy)
+            else:
+                # yt-dlp refuses a file without the header
+                with open(copy, "w", encoding="utf-8") as f:
+                    f.write(COOKIE_HEADER)
+            self._checked_out[copy] = read_cookies(copy)
+        return copy
+
+    def checkin(self, copy):
+        """Merge a copy from checkout() back into the jar"""
+        with self.lock:
+            before = self._checked_out.pop(copy, {})
+            after = read_cookies(copy)
+            if after != before:
+                cookies = read_cookies(self.path)
+                for key in before.keys() - after.keys():
+                    cookies.pop(key, None)
+                for key, line in after.items():
+                    if before.get(key) != line:
+                        cookies[key] = line
+                now = time.time()
+                self._write([line for line in cookies.values() if not expired(line, now)])
+        try:
+            os.remove(copy)
+        except OSError:
+            pass
+
+    def _remove_stale_copies(self):
+        now = time.time()
+        for name in os.listdir(self.work_dir):
+            path = os.path.join(self.work_dir, name)
+            try:
+                if now - os.path.getmtime(path) > STALE_COPY_AGE:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _write(self, lines):
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(COOKIE_HEADER)
+            f.writelines(line + "\n" for line in lines)
+        os.replace(temp, self.path)
@@ -0,0 +1,73 @@
+import pytest
+
+from fastwex_archive import DownloadArchive, canonical_key, normalize_url
+
+
+@pytest.mark.parametrize("url, normalized", [
+    ("  https://WWW.Example.COM/Path?q=1#top ", "https://www.example.com/Path?q=1"),
+    ("example.com/video", "https://example.com/video"),
+    ("HTTP://example.com", "http://example.com"),
+    ("   ", ""),
+])
+def test_normalize_url(url, normalized):
+    assert normalize_url(url) == normalized
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+    "https://m.youtube.com/watch?v=dQw4w9WgXcQ&t=42",
+    "youtu.be/dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ?si=abc",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+    "https://WWW.YOUTUBE.COM/watch?v=dQw4w9WgXcQ#comments",
+])
+def test_youtube_links_of_one_video_share_a_key(url):
+    assert canonical_key(url) == "youtube dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize("url, key", [
+    ("https://www.tiktok.com/@someone/video/7123456789012345678", "tiktok 7123456789012345678"),
+    ("https://www.instagram.com/p/C0dEabc_1-x/", "instagram C0dEabc_1-x"),
+    ("https://www.instagram.com/someone/reel/C0dEabc/", "instagram C0dEabc"),
+    ("https://vimeo.com/76979871", "vimeo 76979871"),
+    ("https://x.com/someone/status/1234567890", "twitter 1234567890"),
+])
+def test_known_sites(url, key):
+    assert canonical_key(url) == key
+
+
+def test_other_urls_are_keyed_by_the_normalized_url():
+    assert canonical_key("Example.com/a?b=1#c") == "url https://example.com/a?b=1"
+    # A watch URL without a valid id is not a video
+    assert canonical_key("https://www.youtube.com/watch?v=short") == "url https://www.youtube.com/watch?v=short"
+    assert canonical_key("") == ""
+
+
+def test_filter_drops_archived_and_repeated_urls(tmp_path):
+    archive = DownloadArchive(str(tmp_path / "archive.sqlite"), str(tmp_path / "download-archive.txt"))
+    archive.add("https://youtu.be/dQw4w9WgXcQ")
+    pending, skipped = archive.filter([
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://vimeo.com/1",
+        "vimeo.com/1",
+        "https://vimeo.com/2",
+    ])
+    archive.close()
+    assert pending == ["https://vimeo.com/1", "https://vimeo.com/2"]
+    assert skipped == ["https://www.youtube.com/watch?v=dQw4w9WgXcQ"]
+
+
+def test_sync_imports_new_lines_of_the_ytdlp_archive(tmp_path):
+    ytdlp_archive = tmp_path / "download-archive.txt"
+    archive = DownloadArchive(str(tmp_path / "archive.sqlite"), str(ytdlp_archive))
+    ytdlp_archive.write_text("youtube dQw4w9WgXcQ\nvimeo 1")
+    # The last line is still being written
+    assert archive.sync() == 1
+    with open(ytdlp_archive, "a") as f:
+        f.write("\n")
+    assert archive.sync() == 1
+    assert archive.archived_keys(["youtube dQw4w9WgXcQ", "vimeo 1", "vimeo 2"]) == {"youtube dQw4w9WgXcQ",
+                                                                                    "vimeo 1"}
+    archive.close()
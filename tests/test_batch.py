@@ -0,0 +1,119 @@
+from fastwex_core import BatchOutputDemuxer
+from fastwex_engine import PROGRESS_MARKER, ProgressEvent
+
+STARTED = ProgressEvent.STARTED
+FINISHED = ProgressEvent.FINISHED
+LOG = ProgressEvent.LOG
+PROGRESS = ProgressEvent.PROGRESS
+
+JOBS = [(0, "https://example.com/a"), (1, "https://example.com/b"), (2, "https://example.com/c")]
+
+
+def start(url):
+    return BatchOutputDemuxer.BATCH_START_MARKER + url
+
+
+def done(url):
+    return BatchOutputDemuxer.BATCH_DONE_MARKER + url
+
+
+def summary(events):
+    """(kind, job) of every event, FINISHED with its success"""
+    return [(event.kind, event.job, event.success) if event.kind == FINISHED else (event.kind, event.job)
+            for event in events]
+
+
+def feed(demuxer, lines):
+    events = []
+    for line in lines:
+        events.extend(demuxer.feed(line))
+    return events
+
+
+def test_markers_split_the_output_per_url():
+    demuxer = BatchOutputDemuxer(JOBS)
+    events = feed(demuxer, [
+        start("https://example.com/a"),
+        "[download] Destination: a.mp4",
+        done("https://example.com/a"),
+        start("https://example.com/b"),
+        done("https://example.com/b"),
+    ])
+    assert summary(events) == [
+        (STARTED, 0), (LOG, 0), (FINISHED, 0, True),
+        (STARTED, 1), (FINISHED, 1, True),
+    ]
+    assert events[1].message == "[download] Destination: a.mp4"
+
+
+def test_output_before_the_first_marker_belongs_to_the_first_url():
+    demuxer = BatchOutputDemuxer(JOBS)
+    events = feed(demuxer, ["[generic] Extracting URL: https://example.com/a", start("https://example.com/a")])
+    assert summary(events) == [(STARTED, 0), (LOG, 0)]
+
+
+def test_error_line_fails_the_current_url():
+    demuxer = BatchOutputDemuxer(JOBS)
+    events = feed(demuxer, [
+        start("https://example.com/a"),
+        "ERROR: [generic] Unable to download webpage: HTTP Error 404",
+        start("https://example.com/b"),
+    ])
+    assert summary(events) == [(STARTED, 0), (LOG, 0), (FINISHED, 0, False), (STARTED, 1)]
+    assert events[2].message == "[generic] Unable to download webpage: HTTP Error 404"
+
+
+def test_urls_skipped_by_the_process_fail():
+    demuxer = BatchOutputDemuxer(JOBS)
+    events = feed(demuxer, [
+        start("https://example.com/a"),
+        done("https://example.com/a"),
+        # b failed during extraction without an ERROR line that reached us
+        start("https://example.com/c"),
+    ])
+    assert summary(events) == [
+        (STARTED, 0), (FINISHED, 0, True),
+        (STARTED, 1), (FINISHED, 1, False),
+        (STARTED, 2),
+    ]
+
+
+def test_unknown_and_stale_markers_are_ignored():
+    demuxer = BatchOutputDemuxer(JOBS)
+    events = feed(demuxer, [
+        start("https://example.com/a"),
+        start("https://other.example/x"),
+        # Not the URL being downloaded
+        done("https://example.com/b"),
+    ])
+    assert summary(events) == [(STARTED, 0)]
+
+
+def test_repeated_urls_are_resolved_in_order():
+    demuxer = BatchOutputDemuxer([(0, "https://example.com/a"), (1, "https://example.com/a")])
+    events = feed(demuxer, [start("https://example.com/a"), done("https://example.com/a"),
+                            start("https://example.com/a"), done("https://example.com/a")])
+    assert summary(events) == [(STARTED, 0), (FINISHED, 0, True), (STARTED, 1), (FINISHED, 1, True)]
+
+
+def test_progress_lines_become_progress_events():
+    demuxer = BatchOutputDemuxer(JOBS)
+    events = feed(demuxer, [
+        start("https://example.com/a"),
+        PROGRESS_MARKER + '{"status":"downloading","downloaded_bytes":50,"total_bytes":200,"speed":10.0}',
+    ])
+    assert summary(events) == [(STARTED, 0), (PROGRESS, 0)]
+    assert events[1].downloaded_bytes == 50
+    assert events[1].total_bytes == 200
+
+
+def test_finish_fails_every_unresolved_url():
+    demuxer = BatchOutputDemuxer(JOBS)
+    events = feed(demuxer, [start("https://example.com/a"), done("https://example.com/a"),
+                            start("https://example.com/b")])
+    events = demuxer.finish("yt-dlp çıkış kodu 1")
+    assert summary(events) == [(FINISHED, 1, False), (STARTED, 2), (FINISHED, 2, False)]
+    assert all(event.message == "yt-dlp çıkış kodu 1" for event in events if event.kind == FINISHED)
+    # Nothing is left to resolve
+    assert demuxer.finish() == []
+    assert demuxer.feed("late output") == []
@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+import fastwex_engine
+from fastwex_engine import ProgressEvent, YtDlpProcessPool
+
+pytest.importorskip("yt_dlp")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from media_server import MediaServer  # noqa: E402
+
+
+def test_every_task_starts_from_the_built_params():
+    worker = fastwex_engine._Worker(["--no-warnings"], None, multiprocessing.Queue(),
+                                    multiprocessing.Value("d", 0.0))
+    worker.ydl = worker.build()
+    worker.base_params = fastwex_engine._copy_params(worker.ydl.params)
+    worker.reset_params({"concurrent_fragment_downloads": 8})
+    worker.ydl.params["outtmpl"]["infojson"] = "info.json"
+    assert worker.ydl.params["concurrent_fragment_downloads"] == 8
+    worker.reset_params({})
+    assert worker.ydl.params.get("concurrent_fragment_downloads") == 1
+    assert "infojson" not in worker.ydl.params["outtmpl"]
+
+
+def next_event(pool, kind, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        event = pool.next_event()
+        if event is not None and event.kind == kind:
+            return event
+    return None
+
+
+def test_dead_workers_are_replaced_and_their_task_reported(tmp_path):
+    server = MediaServer(0, 0.0, 256 * 1024)
+    pool = YtDlpProcessPool(["--no-warnings", "-o", str(tmp_path / "%(title)s.%(ext)s")], 1)
+    try:
+        pool.submit(0, server.url("video/v0.mp4?size=2097152"))
+        assert next_event(pool, ProgressEvent.STARTED).job == 0
+        os.kill(pool.processes[0].pid, signal.SIGKILL)
+        pool.processes[0].join(5)
+        assert pool.reap() == [(0, -signal.SIGKILL)]
+        assert pool.processes[0].is_alive()
+        # The new worker takes the next task
+        pool.submit(1, server.url("video/v1.mp4?size=1024"))
+        event = next_event(pool, ProgressEvent.FINISHED)
+        assert (event.job, event.success) == (1, True)
+        assert pool.reap() == []
+    finally:
+        pool.terminate()
+        server.close()
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import pytest
+
+from fastwex_core import BandwidthGovernor, parse_rate, parse_rate_schedule
+
+
+@pytest.mark.parametrize("text, rate", [
+    ("", (0, 0.0)),
+    ("  ", (0, 0.0)),
+    ("500", (500, 0.0)),
+    ("500K", (500 * 1024, 0.0)),
+    ("8M", (8 * 1024 ** 2, 0.0)),
+    ("1.5MiB/s", (int(1.5 * 1024 ** 2), 0.0)),
+    ("2mb", (2 * 1024 ** 2, 0.0)),
+    ("1G", (1024 ** 3, 0.0)),
+    ("80%", (0, 0.8)),
+    ("100%", (0, 1.0)),
+])
+def test_parse_rate(text, rate):
+    assert parse_rate(text) == rate
+
+
+@pytest.mark.parametrize("text", ["fast", "8X", "-1M", "0%", "150%", "abc%"])
+def test_parse_rate_rejects_invalid_values(text):
+    with pytest.raises(ValueError):
+        parse_rate(text)
+
+
+def test_parse_rate_schedule():
+    assert parse_rate_schedule("09-18=2M, 23-07=0; 12-13=50%") == [
+        (9, 18, 2 * 1024 ** 2, 0.0),
+        (23, 7, 0, 0.0),
+        (12, 13, 0, 0.5),
+    ]
+    assert parse_rate_schedule("") == []
+    assert parse_rate_schedule(" , ") == []
+
+
+@pytest.mark.parametrize("text", ["09-18", "9=2M", "a-b=2M", "09-25=2M", "09-18=fast"])
+def test_parse_rate_schedule_rejects_invalid_entries(text):
+    with pytest.raises(ValueError):
+        parse_rate_schedule(text)
+
+
+def test_schedule_overrides_the_cap_for_its_hours():
+    governor = BandwidthGovernor.from_text("4M", "09-18=1M, 23-07=0", host_limits=False)
+    assert governor.cap(datetime(2024, 1, 1, 12)) == 1024 ** 2
+    assert governor.cap(datetime(2024, 1, 1, 18)) == 4 * 1024 ** 2
+    # Wraps around midnight
+    assert governor.cap(datetime(2024, 1, 1, 23)) == 0
+    assert governor.cap(datetime(2024, 1, 1, 3)) == 0
+
+
+def test_fraction_of_the_observed_link_speed():
+    governor = BandwidthGovernor.from_text("50%", host_limits=False)
+    assert governor.share(2) == 0
+    governor.observe(8000)
+    governor.observe(4000)
+    assert governor.share(2) == 2000
+
+
+def test_share_is_cut_to_what_running_downloads_leave():
+    governor = BandwidthGovernor(limit=8000)
+    assert governor.share(4) == 2000
+    # Three processes started with 2000, one with 1000 while five jobs ran
+    assert governor.share(3, used=7000) == 1000
+    # Never below a quarter of the share
+    assert governor.share(4, used=9000) == 500
+
+
+def test_host_limits():
+    governor = BandwidthGovernor(host_limits={"youtube.com": 1})
+    group = governor.host_group("https://youtu.be/dQw4w9WgXcQ")
+    assert group == "youtube.com"
+    assert governor.host_group("m.youtube.com/watch?v=x") == "youtube.com"
+    assert governor.host_group("https://vimeo.com/1") is None
+    assert governor.acquire(group)
+    assert not governor.acquire(group)
+    governor.release(group)
+    assert governor.acquire(group)
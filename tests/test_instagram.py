@@ -0,0 +1,55 @@
+import multiprocessing
+
+import pytest
+
+from fastwex_instagram import ProfileIndex, RequestPacer
+
+
+@pytest.fixture
+def pacer():
+    return RequestPacer(multiprocessing.get_context("spawn"), rate=1.0)
+
+
+def test_pacer_lets_a_burst_through_then_paces(pacer):
+    assert [pacer.acquire() for _ in range(RequestPacer.BURST)] == [0.0] * RequestPacer.BURST
+    # Requests promised to other workers queue up behind each other
+    assert pacer.acquire() == pytest.approx(1.0, abs=0.05)
+    assert pacer.acquire() == pytest.approx(2.0, abs=0.05)
+
+
+def test_pacer_backs_off_on_429_and_recovers(pacer):
+    assert pacer.penalize() == pytest.approx(4.0)
+    # The bucket is empty at half the rate
+    assert pacer.acquire() == pytest.approx(2.0, abs=0.1)
+    rate = pacer.state[2]
+    pacer.acquire()
+    assert pacer.state[2] == pytest.approx(rate * RequestPacer.RECOVERY)
+    for _ in range(100):
+        pacer.acquire()
+    assert pacer.state[2] == pacer.max_rate
+
+
+def test_pacer_rate_does_not_drop_below_the_minimum(pacer):
+    for _ in range(20):
+        backoff = pacer.penalize()
+    assert pacer.state[2] == RequestPacer.MIN_RATE
+    assert backoff == min(RequestPacer.MAX_BACKOFF, 2 / RequestPacer.MIN_RATE)
+
+
+def test_profile_index(tmp_path):
+    index = ProfileIndex(str(tmp_path / "instagram.sqlite"))
+    assert index.cursor("someone") is None
+    assert index.known("someone") == set()
+    index.add("someone", "old", 100.0)
+    index.add("someone", "new", 200.0)
+    index.add("other", "theirs", 300.0)
+    assert index.known("someone") == {"old", "new"}
+    assert index.known("someone", after=150.0) == {"new"}
+    index.set_cursor("someone", 200.0)
+    index.close()
+
+    index = ProfileIndex(str(tmp_path / "instagram.sqlite"))
+    assert index.cursor("someone") == 200.0
+    assert index.cursor("other") is None
+    assert index.known("other") == {"theirs"}
+    index.close()
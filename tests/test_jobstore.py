@@ -0,0 +1,119 @@
+import pytest
+
+from fastwex_core import DownloadJob, JobQueue
+from fastwex_jobstore import JobStore
+
+URLS = [f"https://example.com/{position}" for position in range(10)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "queue.sqlite"))
+    yield store
+    store.close()
+
+
+def indices(jobs):
+    return [job.index for job in jobs]
+
+
+def set_state(queue, index, state, attempts=0):
+    job = DownloadJob(index, URLS[index])
+    job.state = state
+    job.attempts = attempts
+    queue.update(job)
+
+
+def test_take_hands_out_pending_jobs_a_window_at_a_time(store):
+    queue = store.queue(store.create_batch(URLS, {}, "subprocess", 3))
+    assert queue.total == 10
+    first = queue.take(4)
+    assert indices(first) == [0, 1, 2, 3]
+    assert [job.url for job in first] == URLS[:4]
+    assert indices(queue.take(4)) == [4, 5, 6, 7]
+    assert indices(queue.take(4)) == [8, 9]
+    assert queue.take(4) == []
+
+
+def test_take_skips_finished_jobs_and_keeps_attempts(store):
+    batch_id = store.create_batch(URLS, {}, "subprocess", 3)
+    queue = store.queue(batch_id)
+    for index in (1, 2, 5):
+        set_state(queue, index, DownloadJob.DONE)
+    set_state(queue, 3, DownloadJob.FAILED)
+    set_state(queue, 4, DownloadJob.PENDING, attempts=2)
+    queue = store.queue(batch_id)
+    jobs = queue.take(3)
+    assert indices(jobs) == [0, 4, 6]
+    assert jobs[1].attempts == 2
+    assert queue.counts() == {DownloadJob.DONE: 3, DownloadJob.FAILED: 1}
+
+
+def test_running_and_paused_jobs_start_again_after_a_restart(store):
+    batch_id = store.create_batch(URLS[:4], {"format": "mp4"}, "inprocess", 2)
+    queue = store.queue(batch_id)
+    set_state(queue, 0, DownloadJob.DONE)
+    set_state(queue, 1, DownloadJob.RUNNING, attempts=1)
+    set_state(queue, 2, DownloadJob.PAUSED)
+    assert store.unfinished_batches()[0]["remaining"] == 3
+    queue = store.queue(batch_id)
+    assert indices(queue.take(10)) == [1, 2, 3]
+    assert [state for _, state in store.jobs(batch_id)] == [DownloadJob.DONE] + [DownloadJob.PENDING] * 3
+
+
+def test_extend_appends_after_the_last_job(store):
+    queue = store.queue(store.create_batch(URLS[:3], {}, "subprocess", 3))
+    assert indices(queue.take(3)) == [0, 1, 2]
+    assert queue.extend(["https://example.com/a", "https://example.com/b"]) == 2
+    assert queue.total == 5
+    jobs = queue.take(3)
+    assert indices(jobs) == [3, 4]
+    assert jobs[0].url == "https://example.com/a"
+
+
+def test_unfinished_batches_and_finish(store):
+    done = store.create_batch(URLS[:1], {}, "subprocess", 3)
+    set_state(store.queue(done), 0, DownloadJob.DONE)
+    batch_id = store.create_batch(URLS, {"format": "mp3"}, "batch", 4)
+    batches = store.unfinished_batches()
+    assert [batch["id"] for batch in batches] == [batch_id]
+    assert batches[0]["options"] == {"format": "mp3"}
+    assert (batches[0]["engine"], batches[0]["max_workers"], batches[0]["total"]) == ("batch", 4, 10)
+    store.queue(batch_id).finish()
+    assert store.unfinished_batches() == []
+    assert store.jobs(batch_id) == []
+
+
+def test_in_memory_queue_takes_and_extends():
+    queue = JobQueue(URLS[:3])
+    assert indices(queue.take(2)) == [0, 1]
+    queue.extend(["https://example.com/a"])
+    assert queue.total == 4
+    assert indices(queue.take(5)) == [2, 3]
+    assert queue.take(5) == []
+
+
+def test_claim_takes_a_job_out_of_the_stored_queue(store):
+    batch_id = store.create_batch(URLS[:6], {}, "subprocess", 3)
+    queue = store.queue(batch_id)
+    set_state(queue, 5, DownloadJob.DONE)
+    assert indices(queue.take(2)) == [0, 1]
+    job = queue.claim(3)
+    assert (job.index, job.url) == (3, URLS[3])
+    # Already claimed, handed out by take() or finished
+    assert queue.claim(3) is None
+    assert queue.claim(1) is None
+    assert queue.claim(5) is None
+    assert indices(queue.take(10)) == [2, 4]
+
+
+def test_claim_and_add_on_the_in_memory_queue():
+    queue = JobQueue(URLS[:4])
+    assert indices(queue.take(1)) == [0]
+    assert queue.claim(2).url == URLS[2]
+    assert queue.claim(2) is None
+    assert queue.claim(0) is None
+    assert queue.claim(4) is None
+    added = queue.add(["https://example.com/a"])
+    assert indices(added) == [4]
+    assert indices(queue.take(10)) == [1, 3]
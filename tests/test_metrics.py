@@ -0,0 +1,92 @@
+import json
+
+from fastwex_core import DownloadJob
+from fastwex_metrics import MetricsRecorder, job_phases
+
+
+def finished_job(url="https://www.example.com/v/1", state=DownloadJob.DONE, attempts=1):
+    job = DownloadJob(0, url)
+    job.state = state
+    job.attempts = attempts
+    job.queued_at = 100.0
+    job.started_at = 102.0
+    job.transfer_started_at = 103.5
+    job.transfer_finished_at = 107.5
+    job.download_finished_at = 108.0
+    job.completed_bytes = 3000
+    job.file_bytes = 1000
+    job.peak_speed = 2500.0
+    job.exit_code = 0
+    return job
+
+
+def test_job_phases():
+    assert job_phases(finished_job()) == {"queue": 2.0, "extract": 1.5, "transfer": 4.0, "merge": 0.5, "embed": 0.0}
+
+
+def test_job_phases_with_separate_postprocessing():
+    job = finished_job()
+    job.postprocess_timings = {"merge": 3.0, "embed": 1.25}
+    phases = job_phases(job)
+    assert phases["merge"] == 3.0
+    assert phases["embed"] == 1.25
+
+
+def test_job_phases_without_a_transfer():
+    job = finished_job()
+    job.transfer_started_at = job.transfer_finished_at = 0.0
+    assert job_phases(job) == {"queue": 2.0, "extract": 6.0, "transfer": 0.0, "merge": 0.0, "embed": 0.0}
+
+
+def test_record_writes_json_lines(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    recorder = MetricsRecorder(str(path))
+    record = recorder.record(finished_job(attempts=2), "subprocess")
+    recorder.record(finished_job(state=DownloadJob.FAILED))
+    recorder.close()
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert lines[0] == record
+    assert record["host"] == "example.com"
+    assert record["retries"] == 1
+    assert record["bytes"] == 4000
+    assert record["avg_speed"] == 1000
+    assert record["engine"] == "subprocess"
+    assert lines[1]["state"] == DownloadJob.FAILED
+
+
+def test_record_rotates_the_file(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    recorder = MetricsRecorder(str(path), max_bytes=600, backups=2)
+    for _ in range(10):
+        recorder.record(finished_job())
+    recorder.close()
+    assert (tmp_path / "metrics.jsonl.1").exists()
+    assert not (tmp_path / "metrics.jsonl.3").exists()
+
+
+def test_totals_per_host_and_batch(tmp_path):
+    recorder = MetricsRecorder(str(tmp_path / "metrics.jsonl"))
+    recorder.record(finished_job())
+    recorder.start_batch()
+    recorder.record(finished_job(state=DownloadJob.FAILED, attempts=3))
+    recorder.record(finished_job("https://other.example/x"))
+    recorder.close()
+    totals = recorder.hosts["example.com"]
+    assert (totals.jobs, totals.failed, totals.retries, totals.bytes) == (2, 1, 2, 8000)
+    assert totals.average_speed == 1000.0
+    assert recorder.batch_hosts["example.com"].jobs == 1
+    # Header, rule and one row per host of the batch
+    rows = recorder.format_summary().splitlines()[2:]
+    assert sorted(row.split()[0] for row in rows) == ["example.com", "other.example"]
+
+
+def test_prometheus_text(tmp_path):
+    recorder = MetricsRecorder(str(tmp_path / "metrics.jsonl"))
+    assert "fastwex_jobs_total" in recorder.prometheus()
+    recorder.record(finished_job())
+    recorder.close()
+    text = recorder.prometheus()
+    assert 'fastwex_jobs_total{host="example.com"} 1' in text
+    assert 'fastwex_downloaded_bytes_total{host="example.com"} 4000' in text
+    assert 'fastwex_phase_seconds_total{host="example.com",phase="transfer"} 4' in text
+    assert text.endswith("\n")
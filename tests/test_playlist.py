@@ -0,0 +1,73 @@
+import sys
+
+from fastwex_archive import DownloadArchive
+from fastwex_playlist import ENTRY_MARKER, ExpandListener, PlaylistExpander, parse_entry
+
+
+class Recorder(ExpandListener):
+    def __init__(self):
+        self.groups = []
+
+    def on_entries(self, urls):
+        self.groups.append(urls)
+
+
+def listing(*steps, exit_code=0):
+    """Command printing the entry lines of steps, a number between them sleeps that many seconds"""
+    lines = ["import sys, time"]
+    for step in steps:
+        if isinstance(step, float):
+            lines.append(f"time.sleep({step})")
+        else:
+            lines.append(f"print({step!r}, flush=True)")
+    lines.append(f"sys.exit({exit_code})")
+    return [sys.executable, "-c", "\n".join(lines)]
+
+
+def entry(video_id):
+    return f"{ENTRY_MARKER}Youtube {video_id} https://www.youtube.com/watch?v={video_id}"
+
+
+def test_parse_entry():
+    assert parse_entry(entry("abc")) == ("youtube abc", "https://www.youtube.com/watch?v=abc")
+    # Flat entries without an id fall back to the key of the URL
+    assert parse_entry(f"{ENTRY_MARKER}NA NA https://youtu.be/dQw4w9WgXcQ") == \
+        ("youtube dQw4w9WgXcQ", "https://youtu.be/dQw4w9WgXcQ")
+    assert parse_entry(f"{ENTRY_MARKER}Youtube abc NA") is None
+    assert parse_entry("[youtube:tab] Downloading page 2") is None
+
+
+def test_first_entry_goes_at_once_then_groups():
+    listener = Recorder()
+    expander = PlaylistExpander(listener=listener)
+    count = 2 * PlaylistExpander.GROUP + 10
+    assert expander.run(listing(*(entry(f"v{index}") for index in range(count)))) == (True, "")
+    assert [len(group) for group in listener.groups] == [1, PlaylistExpander.GROUP, PlaylistExpander.GROUP, 9]
+    assert listener.groups[0] == ["https://www.youtube.com/watch?v=v0"]
+    assert expander.listed == expander.added == count
+
+
+def test_slow_pages_are_flushed_after_the_interval():
+    listener = Recorder()
+    expander = PlaylistExpander(listener=listener)
+    wait = PlaylistExpander.FLUSH_INTERVAL + 0.3
+    expander.run(listing(entry("a"), entry("b"), entry("c"), wait, entry("d"), entry("e")))
+    # b and c wait for the next line, e for the end of the listing
+    assert [len(group) for group in listener.groups] == [1, 3, 1]
+
+
+def test_seen_and_archived_entries_are_dropped(tmp_path):
+    archive = DownloadArchive(str(tmp_path / "archive.sqlite"), str(tmp_path / "download-archive.txt"))
+    archive.add("https://youtu.be/BBBBBBBBBBB")
+    listener = Recorder()
+    expander = PlaylistExpander(archive, listener, seen={"youtube AAAAAAAAAAA"})
+    expander.run(listing(*(entry(video_id * 11) for video_id in "ABCC")))
+    assert listener.groups == [["https://www.youtube.com/watch?v=CCCCCCCCCCC"]]
+    assert (expander.listed, expander.added, expander.archived, expander.duplicates) == (4, 1, 1, 2)
+
+
+def test_errors_of_single_entries_do_not_fail_the_listing():
+    expander = PlaylistExpander()
+    assert expander.run(listing(entry("a"), "ERROR: [youtube] b: Private video", exit_code=1)) == \
+        (True, "[youtube] b: Private video")
+    assert PlaylistExpander().run(listing("ERROR: Unsupported URL", exit_code=1)) == (False, "Unsupported URL")
@@ -0,0 +1,111 @@
+import os
+
+from fastwex_core import DownloadOptions
+from fastwex_postprocess import PostProcessor
+
+
+class FakeProbe:
+    """Streams by file name instead of asking ffprobe"""
+
+    def __init__(self, streams):
+        self._streams = streams
+
+    def streams(self, path):
+        return self._streams[os.path.basename(path)]
+
+
+class RecordingPostProcessor(PostProcessor):
+    """Writes the output instead of running ffmpeg and keeps the arguments of every run"""
+
+    def __init__(self, options, streams):
+        super().__init__("ffmpeg", options, workers=1, probe=FakeProbe(streams))
+        self.runs = []
+
+    def run(self, arguments, output_path):
+        self.runs.append(arguments)
+        with open(output_path, "wb") as f:
+            f.write(b"out")
+
+
+def downloaded(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_bytes(b"media")
+        paths.append(str(path))
+    return paths
+
+
+def test_vp9_and_opus_are_copied_into_mp4(tmp_path):
+    files = downloaded(tmp_path, "clip.f303.webm", "clip.f251.webm")
+    processor = RecordingPostProcessor(DownloadOptions(str(tmp_path)), {
+        "clip.f303.webm": [(0, "video", "vp9")],
+        "clip.f251.webm": [(0, "audio", "opus")],
+    })
+    output_path, method = processor.process(files)
+    assert method == "copy"
+    assert output_path == str(tmp_path / "clip.mp4")
+    assert processor.runs == [["-i", files[0], "-i", files[1], "-map", "0:0", "-c:v", "copy",
+                               "-map", "1:0", "-c:a", "copy", "-movflags", "+faststart"]]
+    assert sorted(os.listdir(tmp_path)) == ["clip.mp4"]
+
+
+def test_h264_and_aac_mp4_is_kept_as_it_is(tmp_path):
+    files = downloaded(tmp_path, "clip.f22.mp4")
+    processor = RecordingPostProcessor(DownloadOptions(str(tmp_path)), {
+        "clip.f22.mp4": [(0, "video", "h264"), (1, "audio", "aac")],
+    })
+    assert processor.process(files) == (str(tmp_path / "clip.mp4"), "")
+    assert processor.runs == []
+    assert sorted(os.listdir(tmp_path)) == ["clip.mp4"]
+
+
+def test_compatible_codecs_transcode_only_what_mp4_players_refuse(tmp_path):
+    files = downloaded(tmp_path, "clip.f137.mp4", "clip.f251.webm")
+    processor = RecordingPostProcessor(DownloadOptions(str(tmp_path), compatible_codecs=True), {
+        "clip.f137.mp4": [(0, "video", "h264")],
+        "clip.f251.webm": [(0, "audio", "opus")],
+    })
+    output_path, method = processor.process(files)
+    assert method == "transcode"
+    arguments = processor.runs[0]
+    assert arguments[arguments.index("-c:v") + 1] == "copy"
+    assert arguments[arguments.index("-c:a") + 1] == "aac"
+
+
+def test_vp9_is_transcoded_with_compatible_codecs(tmp_path):
+    files = downloaded(tmp_path, "clip.f303.webm", "clip.f251.webm")
+    processor = RecordingPostProcessor(DownloadOptions(str(tmp_path), compatible_codecs=True), {
+        "clip.f303.webm": [(0, "video", "vp9")],
+        "clip.f251.webm": [(0, "audio", "opus")],
+    })
+    assert processor.process(files)[1] == "transcode"
+    arguments = processor.runs[0]
+    assert arguments[arguments.index("-c:v") + 1] == "libx264"
+    assert arguments[arguments.index("-c:a") + 1] == "aac"
+
+
+def test_mp3_takes_the_audio_stream_only(tmp_path):
+    files = downloaded(tmp_path, "song.webm")
+    processor = RecordingPostProcessor(DownloadOptions(str(tmp_path), format="mp3"), {
+        "song.webm": [(0, "video", "vp9"), (1, "audio", "opus")],
+    })
+    output_path, method = processor.process(files)
+    assert (output_path, method) == (str(tmp_path / "song.mp3"), "transcode")
+    assert processor.runs == [["-i", files[0], "-map", "0:1", "-c:a", "libmp3lame", "-q:a", "0"]]
+
+
+def test_mp3_download_is_kept_as_it_is(tmp_path):
+    files = downloaded(tmp_path, "song.mp3")
+    processor = RecordingPostProcessor(DownloadOptions(str(tmp_path), format="mp3"), {
+        "song.mp3": [(0, "audio", "mp3")],
+    })
+    assert processor.process(files) == (files[0], "")
+    assert processor.runs == []
+
+
+def test_other_formats_are_only_renamed(tmp_path):
+    files = downloaded(tmp_path, "song.m4a")
+    processor = RecordingPostProcessor(DownloadOptions(str(tmp_path), format="m4a"), {})
+    assert processor.process(files) == (files[0], "")
+    assert processor.runs == []
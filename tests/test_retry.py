@@ -0,0 +1,54 @@
+import re
+
+import pytest
+
+from fastwex_core import RetryPolicy
+
+
+@pytest.mark.parametrize("message, error_class", [
+    ("HTTP Error 404: Not Found", RetryPolicy.PERMANENT),
+    ("[youtube] abc: Video unavailable", RetryPolicy.PERMANENT),
+    ("HTTP Error 429: Too Many Requests", RetryPolicy.RATE_LIMIT),
+    ("HTTP Error 503: Service Unavailable", RetryPolicy.SERVER),
+    ("Read timed out.", RetryPolicy.NETWORK),
+    ("Connection reset by peer", RetryPolicy.NETWORK),
+    ("Unable to extract uploader id", RetryPolicy.EXTRACTOR),
+    ("HTTP Error 403: Forbidden", RetryPolicy.EXTRACTOR),
+    ("Postprocessing: Conversion failed!", None),
+    ("", None),
+])
+def test_classify(message, error_class):
+    assert RetryPolicy().classify(message) == error_class
+
+
+def test_first_matching_rule_wins():
+    # A 404 inside a fragment error is still a missing page
+    assert RetryPolicy().classify("fragment 3 not found, HTTP Error 404") == RetryPolicy.PERMANENT
+
+
+def test_delay_backs_off_with_jitter():
+    policy = RetryPolicy()
+    for attempts in (1, 2, 3):
+        base = 2.0 * 2 ** (attempts - 1)
+        for _ in range(20):
+            assert base / 2 <= policy.delay("Read timed out.", attempts) <= base
+
+
+def test_delay_gives_up_after_the_attempts_of_the_class():
+    policy = RetryPolicy()
+    assert policy.delay("HTTP Error 503", 3) is not None
+    assert policy.delay("HTTP Error 503", 4) is None
+    assert policy.delay("HTTP Error 429", 4) is not None
+    assert policy.delay("HTTP Error 429", 5) is None
+
+
+def test_no_delay_for_permanent_or_unknown_errors():
+    policy = RetryPolicy()
+    assert policy.delay("HTTP Error 404", 1) is None
+    assert policy.delay("something else", 1) is None
+    assert policy.delay("", 1) is None
+
+
+def test_delay_is_capped():
+    policy = RetryPolicy(rules=[(RetryPolicy.SERVER, re.compile(r"HTTP Error 5\d\d"), 20, 100.0)], max_delay=150.0)
+    assert 75.0 <= policy.delay("HTTP Error 500", 10) <= 150.0
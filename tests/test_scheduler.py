@@ -0,0 +1,248 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from fastwex_core import DownloadJob, DownloadOptions, JobScheduler, SchedulerListener
+from fastwex_engine import PROGRESS_TEMPLATE
+from fastwex_postprocess import POSTPROCESS_MARKER, PostProcessor
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCH_DIR)
+from media_server import MediaServer  # noqa: E402
+
+FAKE_YT_DLP = os.path.join(BENCH_DIR, "fake_yt_dlp.py")
+# A video takes about a second at the server's rate
+VIDEO_SIZE = 256 * 1024
+RATE = 256 * 1024
+# Stand-in ffmpeg: probing finds VP9 and Opus, any other command runs until it is killed
+FAKE_FFMPEG = """#!{python}
+import sys
+import time
+if sys.argv[-2] == "-i":
+    sys.stderr.write("  Stream #0:0: Video: vp9\\n  Stream #0:1: Audio: opus\\n")
+    sys.exit(1)
+time.sleep(60)
+"""
+
+
+class FakeProcess:
+    def __init__(self):
+        self.killed = False
+
+    def kill(self):
+        self.killed = True
+
+
+class Recorder(SchedulerListener):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+
+    def add(self, *event):
+        with self.lock:
+            self.events.append(event)
+
+    def on_job_started(self, job):
+        self.add("started", job.index)
+
+    def on_job_paused(self, job):
+        self.add("paused", job.index)
+
+    def on_job_finished(self, job):
+        self.add("finished", job.index, job.state)
+
+    def of(self, kind):
+        with self.lock:
+            return [event[1] for event in self.events if event[0] == kind]
+
+
+def running_scheduler(max_workers, priorities, engine=JobScheduler.SUBPROCESS):
+    """Scheduler whose jobs of priorities run on fake processes, started one second apart"""
+    scheduler = JobScheduler(["yt-dlp"], [], max_workers, engine)
+    for index, priority in enumerate(priorities):
+        job = DownloadJob(index, f"https://example.com/{index}")
+        job.priority = priority
+        job.state = DownloadJob.RUNNING
+        job.started_at = float(index)
+        job.process = FakeProcess()
+        scheduler._active[index] = job
+    scheduler._running = len(priorities)
+    return scheduler
+
+
+def wait_for(condition, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def test_enqueue_orders_the_window_by_priority():
+    scheduler = JobScheduler(["yt-dlp"], [], 1)
+    jobs = [DownloadJob(index, f"https://example.com/{index}") for index in range(5)]
+    for job, priority in zip(jobs, (0, 5, 0, 5, 10)):
+        job.priority = priority
+        scheduler._enqueue(job)
+    resumed = DownloadJob(5, "https://example.com/5")
+    resumed.priority = 5
+    scheduler._enqueue(resumed, first=True)
+    assert [job.index for job in scheduler._pending] == [4, 5, 1, 3, 0, 2]
+
+
+def test_preempt_kills_the_newest_job_of_the_lowest_priority():
+    scheduler = running_scheduler(3, [0, 0, 5])
+    urgent = DownloadJob(3, "https://example.com/3")
+    urgent.priority = JobScheduler.URGENT
+    scheduler._enqueue(urgent)
+    scheduler._preempt()
+    assert [job.stop_reason for job in scheduler._active.values()] == [None, JobScheduler.PREEMPT, None]
+    assert scheduler._active[1].process.killed
+
+
+def test_preempt_makes_room_for_every_waiting_job_of_a_higher_priority():
+    scheduler = running_scheduler(3, [3, 0, 0])
+    for index, priority in ((3, 5), (4, 5), (5, 5), (6, 0)):
+        job = DownloadJob(index, f"https://example.com/{index}")
+        job.priority = priority
+        scheduler._enqueue(job)
+    scheduler._preempt()
+    # The priority 3 job goes last, the priority 0 job in the window takes nothing
+    assert [index for index, job in scheduler._active.items() if job.stop_reason] == [0, 1, 2]
+
+
+def test_preempt_counts_stopping_jobs_and_free_slots():
+    scheduler = running_scheduler(3, [0, 0])
+    urgent = DownloadJob(2, "https://example.com/2")
+    urgent.priority = JobScheduler.URGENT
+    scheduler._enqueue(urgent)
+    # A slot is free
+    scheduler._preempt()
+    assert not any(job.stop_reason for job in scheduler._active.values())
+
+    scheduler = running_scheduler(2, [0, 0])
+    scheduler._active[1].stop_reason = JobScheduler.PAUSE
+    scheduler._enqueue(urgent)
+    # The slot of the job being paused is about to be free
+    scheduler._preempt()
+    assert scheduler._active[0].stop_reason is None
+
+
+def test_preempt_leaves_jobs_of_the_same_priority_and_other_engines():
+    scheduler = running_scheduler(1, [5])
+    waiting = DownloadJob(1, "https://example.com/1")
+    waiting.priority = 5
+    scheduler._enqueue(waiting)
+    scheduler._preempt()
+    assert scheduler._active[0].stop_reason is None
+
+    scheduler = running_scheduler(1, [0], JobScheduler.INPROCESS)
+    waiting.priority = JobScheduler.URGENT
+    scheduler._enqueue(waiting)
+    scheduler._preempt()
+    assert scheduler._active[0].stop_reason is None
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = MediaServer(0, 0.0, RATE)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def command(tmp_path):
+    return [sys.executable, FAKE_YT_DLP, "-o", str(tmp_path / "%(title)s.%(ext)s"), "--newline",
+            "--progress-template", PROGRESS_TEMPLATE]
+
+
+def video_urls(server, count, first=0):
+    return [server.url(f"video/v{index}.mp4?size={VIDEO_SIZE}") for index in range(first, first + count)]
+
+
+def test_urgent_job_preempts_a_running_one(server, command):
+    listener = Recorder()
+    scheduler = JobScheduler(command, video_urls(server, 2), 1, listener=listener)
+    scheduler.start()
+    assert wait_for(lambda: listener.of("started") == [0])
+    jobs = scheduler.add(video_urls(server, 1, 2))
+    assert scheduler.wait(30)
+    assert jobs[0].index == 2
+    assert listener.of("paused") == [0]
+    # The urgent job ran first, the preempted one before the rest of the window
+    assert listener.of("started") == [0, 2, 0, 1]
+    assert scheduler.count(DownloadJob.DONE) == 3
+
+
+def test_pause_resume_and_cancel(server, command):
+    listener = Recorder()
+    scheduler = JobScheduler(command, video_urls(server, 3), 1, listener=listener)
+    scheduler.start()
+    assert wait_for(lambda: listener.of("started") == [0])
+    assert scheduler.cancel(2)
+    assert scheduler.pause(0)
+    assert wait_for(lambda: scheduler.job(0).state == DownloadJob.PAUSED)
+    assert not scheduler.resume(1)
+    assert scheduler.resume(0)
+    assert scheduler.wait(30)
+    assert scheduler.count(DownloadJob.DONE) == 2
+    assert scheduler.count(DownloadJob.FAILED) == 1
+    assert ("finished", 2, DownloadJob.FAILED) in listener.events
+    assert listener.of("started") == [0, 1, 0]
+
+
+def test_jobs_beyond_the_window_can_be_reached(server, command, monkeypatch):
+    monkeypatch.setattr(JobScheduler, "WINDOW", 2)
+    listener = Recorder()
+    scheduler = JobScheduler(command, video_urls(server, 6), 1, listener=listener)
+    scheduler.start()
+    assert wait_for(lambda: listener.of("started") == [0])
+    assert scheduler.set_priority(5, JobScheduler.URGENT)
+    assert scheduler.cancel(4)
+    assert scheduler.wait(30)
+    assert listener.of("started")[:3] == [0, 5, 0]
+    assert scheduler.count(DownloadJob.FAILED) == 1
+    assert scheduler.count(DownloadJob.DONE) == 5
+
+
+@pytest.mark.parametrize("engine", [JobScheduler.SUBPROCESS, JobScheduler.BATCH])
+def test_stop_pauses_running_jobs_and_wait_returns(server, command, engine):
+    listener = Recorder()
+    scheduler = JobScheduler(command, video_urls(server, 4), 2, engine, listener=listener)
+    scheduler.start()
+    # Batch mode runs the four URLs as one chunk, one at a time
+    assert wait_for(lambda: scheduler.count(DownloadJob.RUNNING) > 0)
+    scheduler.stop()
+    assert scheduler.wait(10)
+    assert scheduler.stopped and scheduler.finished
+    assert scheduler.count(DownloadJob.RUNNING) == 0
+    assert scheduler.count(DownloadJob.PAUSED) + scheduler.count(DownloadJob.PENDING) == 4
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="the stand-in ffmpeg is a script")
+def test_cancel_and_pause_during_postprocessing(server, command, tmp_path):
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    ffmpeg.chmod(0o755)
+    # Transcoded for compatibility, so the MP4 download is not just kept as it is
+    postprocessor = PostProcessor(str(ffmpeg), DownloadOptions(str(tmp_path), compatible_codecs=True))
+    moved = '{"status":"finished","postprocessor":"MoveFiles","files":{"0":"%s"}}' % (tmp_path / "%(title)s.%(ext)s")
+    command = command + ["--print", "after_move:" + POSTPROCESS_MARKER + moved]
+    listener = Recorder()
+    scheduler = JobScheduler(command, video_urls(server, 2), 2, listener=listener, postprocessor=postprocessor)
+    scheduler.start()
+    assert wait_for(lambda: all(scheduler.job(index) is not None and scheduler.job(index).postprocess_task
+                                for index in (0, 1)))
+    assert scheduler.cancel(0)
+    assert scheduler.pause(1)
+    # Well before the stand-in ffmpeg would end on its own
+    assert wait_for(lambda: scheduler.job(0) is None and scheduler.job(1).state == DownloadJob.PAUSED)
+    assert ("finished", 0, DownloadJob.FAILED) in listener.events
+    assert listener.of("paused") == [1]
+    assert scheduler.job(1).postprocess_task is None
+    scheduler.stop()
+    assert scheduler.wait(10)
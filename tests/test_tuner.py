@@ -0,0 +1,68 @@
+from fastwex_core import HostTuner
+
+URL = "https://www.example.com/video/1"
+
+
+def test_new_hosts_start_with_the_initial_count():
+    assert HostTuner().connections(URL) == HostTuner.INITIAL
+
+
+def test_connections_double_while_they_pay_off_then_settle_on_the_best():
+    tuner = HostTuner()
+    tuner.record(URL, 4, 1000)
+    assert tuner.connections(URL) == 8
+    tuner.record(URL, 8, 2000)
+    assert tuner.connections(URL) == 16
+    # No faster than with 8 connections
+    tuner.record(URL, 16, 2100)
+    assert tuner.connections(URL) == 8
+    tuner.record(URL, 8, 1900)
+    assert tuner.connections(URL) == 8
+    assert tuner.hosts["example.com"]["settled"]
+
+
+def test_connections_stop_at_the_maximum():
+    tuner = HostTuner()
+    tuner.record(URL, HostTuner.MAXIMUM, 1000)
+    assert tuner.connections(URL) == HostTuner.MAXIMUM
+
+
+def test_a_host_that_got_slower_is_probed_again():
+    tuner = HostTuner()
+    tuner.record(URL, 4, 1000)
+    tuner.record(URL, 8, 1050)
+    assert tuner.connections(URL) == 4
+    tuner.record(URL, 4, 400)
+    assert not tuner.hosts["example.com"]["settled"]
+    tuner.record(URL, 4, 500)
+    assert tuner.connections(URL) == 8
+
+
+def test_jobs_without_a_speed_are_not_recorded():
+    tuner = HostTuner()
+    tuner.record(URL, 4, 0)
+    tuner.record(URL, 4, None)
+    assert tuner.hosts == {}
+
+
+def test_state_survives_a_restart(tmp_path):
+    path = str(tmp_path / "host-tuning.json")
+    HostTuner(path).record(URL, 4, 1000)
+    # Hosts are keyed without www.
+    assert HostTuner(path).connections("example.com/other") == 8
+
+
+def test_broken_state_file_is_ignored(tmp_path):
+    path = tmp_path / "host-tuning.json"
+    path.write_text("{not json")
+    assert HostTuner(str(path)).connections(URL) == HostTuner.INITIAL
+
+
+def test_aria2c_arguments():
+    assert HostTuner().arguments(8) == ["--concurrent-fragments", "8"]
+    tuner = HostTuner(aria2c_path="/usr/bin/aria2c")
+    assert tuner.arguments(8)[2:4] == ["--downloader", "/usr/bin/aria2c"]
+    params = tuner.params(8)
+    assert params["concurrent_fragment_downloads"] == 8
+    assert params["external_downloader"] == {"default": "/usr/bin/aria2c"}
+    assert params["external_downloader_args"]["aria2c"][:4] == ["-x", "8", "-s", "8"]
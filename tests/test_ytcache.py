@@ -0,0 +1,117 @@
+import os
+import time
+
+from fastwex_ytcache import COOKIE_HEADER, CookieJar, YtDlpCache, parse_extractor, read_cookies
+
+FUTURE = str(int(time.time()) + 3600)
+PAST = str(int(time.time()) - 3600)
+
+
+def cookie(name, value, domain=".example.com", expires=FUTURE, http_only=False):
+    line = "\t".join([domain, "TRUE", "/", "FALSE", expires, name, value])
+    return "#HttpOnly_" + line if http_only else line
+
+
+def write_jar(path, *lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(COOKIE_HEADER + "".join(line + "\n" for line in lines))
+
+
+def values(path):
+    return {key[2]: line.split("\t")[6] for key, line in read_cookies(path).items()}
+
+
+def test_read_cookies_keys_http_only_cookies_by_their_domain(tmp_path):
+    path = tmp_path / "cookies.txt"
+    write_jar(path, "# a comment", cookie("a", "1"), cookie("b", "2", http_only=True), "broken line")
+    assert set(read_cookies(str(path))) == {(".example.com", "/", "a"), (".example.com", "/", "b")}
+    assert read_cookies(str(tmp_path / "missing.txt")) == {}
+
+
+def test_checkout_without_a_jar_has_the_header(tmp_path):
+    jar = CookieJar(str(tmp_path / "cookies.txt"))
+    copy = jar.checkout()
+    with open(copy, encoding="utf-8") as f:
+        assert f.read() == COOKIE_HEADER
+    jar.checkin(copy)
+    assert not os.path.exists(copy)
+    # Nothing changed, no jar is written
+    assert not os.path.exists(jar.path)
+
+
+def test_checkin_merges_what_each_copy_changed(tmp_path):
+    path = str(tmp_path / "cookies.txt")
+    write_jar(path, cookie("keep", "1"), cookie("change", "1"), cookie("drop", "1"), cookie("other", "1"))
+    jar = CookieJar(path)
+    first, second = jar.checkout(), jar.checkout()
+    write_jar(first, cookie("keep", "1"), cookie("change", "2"), cookie("other", "1"), cookie("new", "1"))
+    # A concurrent process only touched "other"
+    write_jar(second, cookie("keep", "1"), cookie("change", "1"), cookie("drop", "1"), cookie("other", "3"))
+    jar.checkin(first)
+    jar.checkin(second)
+    assert values(path) == {"keep": "1", "change": "2", "other": "3", "new": "1"}
+
+
+def test_checkin_of_an_unchanged_copy_keeps_newer_cookies(tmp_path):
+    path = str(tmp_path / "cookies.txt")
+    write_jar(path, cookie("session", "old"))
+    jar = CookieJar(path)
+    idle, busy = jar.checkout(), jar.checkout()
+    write_jar(busy, cookie("session", "new"))
+    jar.checkin(busy)
+    # A process killed before it wrote its copy
+    jar.checkin(idle)
+    assert values(path) == {"session": "new"}
+
+
+def test_checkin_drops_expired_cookies(tmp_path):
+    path = str(tmp_path / "cookies.txt")
+    write_jar(path, cookie("stale", "1", expires=PAST), cookie("session", "1", expires="0"))
+    jar = CookieJar(path)
+    copy = jar.checkout()
+    write_jar(copy, cookie("stale", "1", expires=PAST), cookie("session", "1", expires="0"), cookie("new", "1"))
+    jar.checkin(copy)
+    assert values(path) == {"session": "1", "new": "1"}
+
+
+def test_old_copies_of_killed_processes_are_removed(tmp_path):
+    path = str(tmp_path / "cookies.txt")
+    CookieJar(path)
+    old = os.path.join(path + ".jobs", "job-old.txt")
+    recent = os.path.join(path + ".jobs", "job-recent.txt")
+    for copy in (old, recent):
+        write_jar(copy)
+    os.utime(old, (time.time() - 2 * 24 * 3600,) * 2)
+    CookieJar(path)
+    assert not os.path.exists(old)
+    assert os.path.exists(recent)
+
+
+def test_parse_extractor():
+    assert parse_extractor("[youtube] Extracting URL: https://youtu.be/x") == "youtube"
+    assert parse_extractor("[youtube:tab] Extracting URL: https://youtube.com/@x") == "youtube"
+    assert parse_extractor("[download] Destination: x.mp4") is None
+
+
+def test_cache_hits_and_misses(tmp_path):
+    cache = YtDlpCache(str(tmp_path / "cache"))
+    assert cache.record("youtube", cache.sections()) is None
+    before = cache.sections()
+    os.makedirs(os.path.join(cache.cache_dir, "youtube-nsig"))
+    open(os.path.join(cache.cache_dir, "youtube-nsig", "abc.json"), "w").close()
+    assert cache.record("youtube", before) == "miss"
+    assert cache.record("youtube", cache.sections()) == "hit"
+    assert cache.record("vimeo", cache.sections()) is None
+    assert cache.record("", cache.sections()) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.start_batch()
+    assert cache.format_summary() == ""
+
+
+def test_cache_is_stale_until_prewarmed(tmp_path):
+    cache = YtDlpCache(str(tmp_path / "cache"))
+    assert cache.stale()
+    with open(cache.stamp_path, "w") as f:
+        f.write("url")
+    assert not cache.stale()
+    assert cache.stale(time.time() + 13 * 3600)